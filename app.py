@@ -5,10 +5,16 @@
 <>
 """
 # Standard library
+import collections
 import datetime as dt
+import functools
+import time
+import typing
 # Third party
+import numpy as np
 import pandas as pd
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 # Local imports
 import backend
 
@@ -39,9 +45,15 @@ def connect_strava(code: str) -> None:
                           expanded=True,
                           state="error")
             return
-        # RETREIVING THE ACCESS TOKEN
+        # RETREIVING THE ACCESS TOKEN, once per authorization code as the
+        # code expires when used and a rerun during the download reuses it
         status.write("Getting access token")
-        results = backend.get_access(code)
+        if (access := st.session_state.get("access")) is None or \
+                access[0] != code:
+            with backend.stage("get_access"):
+                access = (code, backend.get_access(code))
+            st.session_state["access"]: tuple = access
+        results = access[1]
         st.session_state["access_token"]: str = results[0]
         st.session_state["refresh_token"]: str = results[1]
         st.session_state["athlete_name"]: str = results[2]
@@ -54,18 +66,25 @@ def connect_strava(code: str) -> None:
                           expanded=True,
                           state="error")
             return
-        # RETREIVING AND PARSING THE DATA
+        # RETREIVING AND PARSING THE DATA in the background, the pages are
+        # shown as they arrive and the sessions of the same athlete share a
+        # running or a recent download
         status.write("Retrieving and parsing data")
-        data = backend.thread_get_and_parse(
-            st.session_state.get("access_token")
-                                            )
+        st.session_state["load"]: backend.ProgressiveLoad = \
+            backend.coalesced_load(results[4],
+                                   st.session_state.get("access_token"))
+        st.session_state["creation"]: str = results[3]
+        # the figures and filters of a previous dataset do not apply
+        if (handle := st.session_state.pop("dataset", None)) is not None:
+            backend.get_store().discard(handle)
+        for key in FILTER_INPUTS:
+            st.session_state.pop(key, None)
         # FINALIZE THE PROCESS
-        # signal that data has been loaded
+        # signal that data is being loaded
         st.session_state["loaded"]: bool = True
-        status.update(label="Done!",
+        status.update(label="Downloading your activities",
                       expanded=False,
                       state="complete")
-        wrap_up(data, results[3])
     return
 
 
@@ -86,8 +105,20 @@ def wrap_up(data, creation=None) -> None:
         DESCRIPTION.
 
     """
-    # store activities and creation date of profile
-    st.session_state["dataframe"]: pd.DataFrame = data
+    # store activities in the shared store and keep a handle to them
+    store: backend.DatasetStore = backend.get_store()
+    if (handle := st.session_state.get("dataset")) is not None:
+        store.discard(handle)
+    st.session_state["dataset"]: str = store.put(data)
+    # a download in the background is replaced by the stored activities
+    st.session_state.pop("load", None)
+    # index the names and the filtered columns once when the dataset is
+    # loaded, the filters of the previous dataset do not apply
+    store.derive(st.session_state["dataset"], "names", backend.NameIndex)
+    store.derive(st.session_state["dataset"], "filters", backend.FilterIndex)
+    for key in FILTER_INPUTS:
+        st.session_state.pop(key, None)
+    # store creation date of profile
     st.session_state["creation"]: str = dt.datetime.strftime(data.date.min(),
                                                              backend.DT_FORMAT
                                                              ) \
@@ -98,6 +129,587 @@ def wrap_up(data, creation=None) -> None:
     st.rerun()
 
 
+def admitted(job: typing.Callable,
+             *args: typing.Any,
+             **kwargs: typing.Any) -> typing.Any:
+    """
+    Run a job on the shared executors, showing that it is queued while they
+    do not admit it.
+
+    Parameters
+    ----------
+    job : typing.Callable
+        The function submitting the tasks of the job.
+    *args : typing.Any
+        Arguments of the function.
+    **kwargs : typing.Any
+        Key word arguments of the function.
+
+    Returns
+    -------
+    typing.Any
+        The result of the job.
+
+    """
+    status = st.empty()
+    while True:
+        try:
+            result: typing.Any = job(*args, **kwargs)
+        except backend.Saturated as saturated:
+            status.info(f"Queued, {saturated.waiting} tasks of other users "
+                        "are waiting")
+            time.sleep(backend.ADMISSION_RETRY)
+        else:
+            status.empty()
+            return result
+
+
+# the session state of the filters of all figures and the table
+FILTER_INPUTS: tuple[str, ...] = ("filter_years",) + tuple(
+    f"filter_{column}" for column in backend.FILTER_COLS)
+# the session state the level of detail of the figures is planned with
+PLAN_INPUTS: tuple[str, ...] = ("dataset",
+                                "high_resolution",
+                                "heatmap",
+                                "unique_routes") + FILTER_INPUTS
+
+
+def timed_fragment(fragment: typing.Callable) -> typing.Callable:
+    """
+    Collect the stages of a fragment rerunning on its own apart from the
+    stages of the last full rerun, and keep them with the previous reruns of
+    the session if it has any.
+
+    Parameters
+    ----------
+    fragment : typing.Callable
+        The function of the fragment.
+
+    Returns
+    -------
+    typing.Callable
+        The function with the timings of its own reruns.
+
+    """
+    @functools.wraps(fragment)
+    def timed(*args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+        rerun = get_script_run_ctx(suppress_warning=True)
+        # a full rerun collects the stages of its fragments
+        if rerun is None or not rerun.fragment_ids_this_run:
+            return fragment(*args, **kwargs)
+        timings: backend.RerunTimings = backend.RerunTimings(
+            fragment.__name__)
+        backend.record_rerun(timings)
+        try:
+            return fragment(*args, **kwargs)
+        finally:
+            if timings.timings:
+                st.session_state.setdefault("timings", collections.deque(
+                    maxlen=backend.TIMINGS_HISTORY)).append(timings)
+    return timed
+
+
+def map_options() -> dict:
+    """
+    Collect the options of the map from the menu. The start points are
+    clustered, the routes are attributed to the countries and the repeated
+    routes are detected once per dataset.
+
+    Returns
+    -------
+    dict
+        Key word arguments for the locations plot.
+
+    """
+    handle: str = st.session_state.get("dataset", "")
+    store: backend.DatasetStore = backend.get_store()
+    region: str = st.session_state.get("region", "All")
+    return {"heatmap": st.session_state.get("heatmap", False),
+            "region": None if region == "All" else region,
+            "clusters": store.derive(handle,
+                                     "clusters",
+                                     backend.cluster_starts),
+            "visited": store.derive(handle,
+                                    "countries",
+                                    backend.visited_countries)
+            if st.session_state.get("visited") else None,
+            "routes": store.derive(handle,
+                                   "routes",
+                                   backend.frequent_routes)
+            if st.session_state.get("unique_routes") else None}
+
+
+def filtered(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Table of all the retrieved activities.
+
+    Returns
+    -------
+    pd.DataFrame
+        The activities passing the filters of the menu.
+
+    """
+    index = backend.get_store().derive(st.session_state.get("dataset", ""),
+                                       "filters",
+                                       backend.FilterIndex)
+    if index is None:
+        return df
+    return index.view(df,
+                      st.session_state.get("filter_years"),
+                      **{column: st.session_state.get(f"filter_{column}")
+                         for column in backend.FILTER_COLS})
+
+
+def search_matches(df: pd.DataFrame) -> np.ndarray | None:
+    """
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Table of all the retrieved activities.
+
+    Returns
+    -------
+    np.ndarray | None
+        The index labels of the activities found by their name or None
+        without a search.
+
+    """
+    if not (query := st.session_state.get("search", "")).strip():
+        return None
+    index = backend.get_store().derive(st.session_state.get("dataset", ""),
+                                       "names",
+                                       backend.NameIndex)
+    # the names of a download are indexed as its pages arrive
+    if index is None and (load := st.session_state.get("load")) is not None:
+        index = load.names
+    return (index or backend.NameIndex(df)).search(query)
+
+
+def high_resolution(df: pd.DataFrame,
+                    count: int,
+                    token: str) -> pd.DataFrame:
+    """
+    Replace the routes of the latest activities by the full resolution
+    streams. The streams are kept with the dataset, so only the streams of
+    activities not shown before are read from the disk or downloaded.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Table of all the retrieved activities.
+    count : int
+        The amount of the latest activities.
+    token : str
+        Strava access token.
+
+    Returns
+    -------
+    pd.DataFrame
+        The activities with the replaced routes.
+
+    """
+    activity_ids: list[int] = df["id"].iloc[-count:].tolist()
+    # the streams of the dataset by activity id, a download in progress has
+    # no dataset yet
+    streams: dict[int, np.ndarray] | None = backend.get_store().derive(
+        st.session_state.get("dataset", ""),
+        "streams",
+        lambda data: {})
+    if streams is None:
+        streams = {}
+    # the streams which could not be retrieved are tried again next time
+    if missing := [activity_id for activity_id in activity_ids
+                   if activity_id not in streams]:
+        with st.spinner("Downloading high resolution routes..."):
+            # a new dict so the store measures the added streams
+            streams = {**streams, **admitted(backend.thread_get_streams,
+                                             token,
+                                             missing)}
+        backend.get_store().replace(st.session_state.get("dataset", ""),
+                                    "streams",
+                                    streams)
+    return backend.apply_streams(df, {activity_id: streams[activity_id]
+                                      for activity_id in activity_ids
+                                      if activity_id in streams})
+
+
+def cached_figures(df: pd.DataFrame,
+                   creation: str,
+                   charts: tuple[str, ...],
+                   inputs: tuple[str, ...]) -> list:
+    """
+    Create the figures, or reuse the ones of the previous run of the session
+    if the state they depend on did not change.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Table of all the retrieved activities.
+    creation : str
+        Input for the vertical line in the days plot.
+    charts : tuple[str, ...]
+        The names of the figures.
+    inputs : tuple[str, ...]
+        The keys of the session state the figures depend on.
+
+    Returns
+    -------
+    list
+        The plotly figures in the order of the names.
+
+    """
+    # the activities grow while they are downloaded
+    key: tuple = (creation, df.shape[0]) + tuple(st.session_state.get(name)
+                                                 for name in inputs)
+    cache: dict = st.session_state.setdefault("figures", {})
+    if (cached := cache.get(charts)) is None or cached[0] != key:
+        view: pd.DataFrame = filtered(df)
+        options: dict = map_options()
+        # the start points of a part of the dataset are clustered anew
+        if view is not df:
+            options["clusters"] = None
+        # the figures are built as plain specs, which skips validating them
+        cache[charts] = (key, admitted(
+            backend.thread_create_figures,
+            view,
+            creation,
+            map_options=options,
+            spec=True,
+            charts=charts,
+            measure=bool(st.session_state.get("debug_timings"))))
+    return cache[charts][1]
+
+
+@st.fragment(key="connect_menu")
+@timed_fragment
+def connect_menu() -> None:
+    """
+    The menu to connect with Strava, which reruns on its own.
+
+    Returns
+    -------
+    None.
+
+    """
+    st.toggle(label="Look up countries",
+              value=False)
+    image_connect = backend.load_image(backend.PATH_CONNECT)
+    st.markdown(f"""
+            <a href="{backend.authorization_link}">
+            <img src='data:image/png;base64,{image_connect}' width='100%'>
+            </a>
+                    """,
+                unsafe_allow_html=True
+                )
+
+
+@st.fragment(key="map_menu")
+@timed_fragment
+def map_menu(countries: list[str]) -> None:
+    """
+    The options of the map, which only rerun the figures depending on them.
+
+    Parameters
+    ----------
+    countries : list[str]
+        The countries with activities.
+
+    Returns
+    -------
+    None.
+
+    """
+    # the heatmap and the repeated routes change the plan of all figures
+    st.toggle(label="Heatmap of the routes",
+              value=False,
+              key="heatmap",
+              on_change=st.rerun,
+              args=(["map_menu", "timeline_row", "middle_row"],))
+    # streamlit reports no zoom or pan of a chart, so the heatmap is drawn
+    # anew at a higher resolution for a country chosen here instead of for
+    # the viewport of the map
+    st.selectbox(label="Map region",
+                 options=["All"] + countries,
+                 key="region",
+                 help="Draw the heatmap in more detail for one country. "
+                      "Zooming into the map does not increase the detail.",
+                 disabled=not st.session_state.get("heatmap"),
+                 on_change=st.rerun,
+                 args=(["middle_row"],))
+    st.toggle(label="Count all countries passed through",
+              value=False,
+              key="visited",
+              on_change=st.rerun,
+              args=(["middle_row"],))
+    st.toggle(label="Draw repeated routes once",
+              value=False,
+              key="unique_routes",
+              on_change=st.rerun,
+              args=(["timeline_row", "middle_row"],))
+
+
+@st.fragment(key="filter_menu")
+@timed_fragment
+def filter_menu(index: backend.FilterIndex | None) -> None:
+    """
+    The filters of all figures and the table, which rerun those only.
+
+    Parameters
+    ----------
+    index : backend.FilterIndex | None
+        The filter index of the dataset or None without data.
+
+    Returns
+    -------
+    None.
+
+    """
+    if index is None or (years := index.years()) is None:
+        return
+    rerun: dict = {"on_change": st.rerun,
+                   "args": (["timeline_row", "middle_row", "activity_table"],)}
+    if years[0] < years[1]:
+        st.slider(label="Years",
+                  min_value=years[0],
+                  max_value=years[1],
+                  value=years,
+                  key="filter_years",
+                  **rerun)
+    labels: dict[str, str] = {"sport_type": "Sport types",
+                              "country": "Countries"}
+    for column in backend.FILTER_COLS:
+        st.multiselect(label=labels.get(column, column),
+                       options=index.values(column),
+                       key=f"filter_{column}",
+                       **rerun)
+
+
+@st.fragment(key="load_progress", run_every=backend.PROGRESS_SECONDS)
+@timed_fragment
+def load_progress(load: backend.ProgressiveLoad,
+                  shown: int,
+                  started: float) -> None:
+    """
+    The progress of the download in the background, which checks on its own
+    for new pages and reruns the page to show them.
+
+    Parameters
+    ----------
+    load : backend.ProgressiveLoad
+        The download of the session.
+    shown : int
+        The amount of pages shown.
+    started : float
+        The monotonic time the shown pages were taken.
+
+    Returns
+    -------
+    None.
+
+    """
+    # the figures are built at most once per interval
+    if time.monotonic() - started >= backend.PROGRESS_SECONDS and \
+            (load.done() or load.published() > shown):
+        st.rerun()
+    if load.waiting is not None:
+        st.info(f"Queued, {load.waiting} tasks of other users are waiting")
+    else:
+        st.caption("Downloading your activities, the most recent first")
+
+
+@st.fragment(key="header")
+@timed_fragment
+def header(welcome_text: str) -> None:
+    """
+    Parameters
+    ----------
+    welcome_text : str
+        The greeting of the athlete.
+
+    Returns
+    -------
+    None.
+
+    """
+    st.markdown(f"## {backend.TITLE}: {welcome_text}")
+    # the activities found are highlighted and listed in the table
+    st.text_input(label="Search the names of the activities",
+                  key="search",
+                  on_change=st.rerun,
+                  args=(["timeline_row", "middle_row", "activity_table"],))
+
+
+@st.fragment(key="timeline_row")
+@timed_fragment
+def timeline_row(df: pd.DataFrame, creation: str) -> None:
+    """
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Table of all the retrieved activities.
+    creation : str
+        Input for the vertical line in the days plot.
+
+    Returns
+    -------
+    None.
+
+    """
+    figures = cached_figures(df, creation, ("timeline",), PLAN_INPUTS)
+    if (matches := search_matches(df)) is not None:
+        view = filtered(df)
+        figures = [backend.highlight(figures[0],
+                                     "timeline",
+                                     view.loc[view.index.isin(matches)])]
+    with backend.stage("plotly_chart"):
+        st.plotly_chart(figure_or_data=figures[0],
+                        use_container_width=True,
+                        config=backend.CONFIG)
+
+
+@st.fragment(key="middle_row")
+@timed_fragment
+def middle_row(df: pd.DataFrame, creation: str) -> None:
+    """
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Table of all the retrieved activities.
+    creation : str
+        Input for the vertical line in the days plot.
+
+    Returns
+    -------
+    None.
+
+    """
+    figures = cached_figures(df,
+                             creation,
+                             ("days", "locations", "types", "hours"),
+                             PLAN_INPUTS + ("region", "visited"))
+    if (matches := search_matches(df)) is not None:
+        view = filtered(df)
+        figures = [*figures]
+        figures[1] = backend.highlight(figures[1],
+                                       "locations",
+                                       view.loc[view.index.isin(matches)])
+    cols = st.columns(spec=[6, 6],
+                      gap="small")
+    with backend.stage("plotly_chart"):
+        cols[0].plotly_chart(figure_or_data=figures[0],
+                             use_container_width=True,
+                             config=backend.CONFIG)
+        subcols = cols[0].columns(spec=[3, 3], gap="small")
+        subcols[0].plotly_chart(figure_or_data=figures[2],
+                                use_container_width=True,
+                                config=backend.CONFIG)
+        subcols[1].plotly_chart(figure_or_data=figures[3],
+                                use_container_width=True,
+                                config=backend.CONFIG)
+        # select places on the map to filter the table of activities, which
+        # only reruns the table
+        cols[1].plotly_chart(figure_or_data=figures[1],
+                             use_container_width=True,
+                             config=backend.CONFIG2,
+                             on_select=lambda: st.rerun("activity_table"),
+                             selection_mode=("points",
+                                             "box",
+                                             "lasso"),
+                             key="map")
+
+
+@st.fragment(key="activity_table")
+@timed_fragment
+def activity_table(df: pd.DataFrame) -> None:
+    """
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Table of all the retrieved activities.
+
+    Returns
+    -------
+    None.
+
+    """
+    handle: str = st.session_state.get("dataset", "")
+    store: backend.DatasetStore = backend.get_store()
+    # the links and the orders of the table are built once per dataset
+    table = store.derive(handle, "table", backend.ActivityTable)
+    if table is None:
+        table = backend.ActivityTable(df)
+    # keep the activities passing the selected places, the index of the
+    # routes is built once per dataset at the first selection
+    rows = None
+    event = st.session_state.get("map") or {}
+    if selected := [(point["lat"], point["lon"])
+                    for point in event.get("selection", {})
+                    .get("points", [])
+                    if "lat" in point and "lon" in point]:
+        index = store.derive(handle,
+                             "spatial_index",
+                             backend.SpatialIndex)
+        # the outline of a lasso selection by its longitudes and latitudes
+        lasso: list = [list(zip(outline["y"], outline["x"]))
+                       for outline in event.get("selection", {})
+                       .get("lasso", [])
+                       if outline.get("x") and outline.get("y")]
+        if index is not None:
+            rows = index.within_selection(selected,
+                                          polygon=lasso[0] if lasso
+                                          else None)
+    if (matches := search_matches(df)) is not None:
+        rows = matches if rows is None else \
+            np.intersect1d(np.asarray(rows), matches)
+    if (view := filtered(df)) is not df:
+        rows = view.index if rows is None else \
+            np.intersect1d(np.asarray(rows), view.index)
+    positions = table.select(st.session_state.get("table_sort",
+                                                  backend.TABLE_SORT_COLS[0]),
+                             st.session_state.get("table_descending", False),
+                             rows)
+    pages = max(1, -(-len(positions) // backend.TABLE_PAGE_ROWS))
+    # a smaller selection can have less pages than the current page
+    if st.session_state.get("table_page", 1) > pages:
+        st.session_state["table_page"] = pages
+    with st.expander(f"See your {len(positions)} unique events",
+                     expanded=False):
+        # only the rows of the page are sent, sorted on the server
+        cols = st.columns(spec=[4, 3, 3],
+                          gap="small",
+                          vertical_alignment="bottom")
+        cols[0].selectbox(label="Sort by",
+                          options=backend.TABLE_SORT_COLS,
+                          key="table_sort")
+        cols[1].toggle(label="Descending",
+                       value=False,
+                       key="table_descending")
+        page = cols[2].number_input(label=f"Page of {pages}",
+                                    min_value=1,
+                                    max_value=pages,
+                                    value=1,
+                                    step=1,
+                                    key="table_page")
+        st.dataframe(table.page(positions, page - 1),
+                     use_container_width=True,
+                     hide_index=True,
+                     column_order=backend.DISPLAY_COLS,
+                     column_config={"id":
+                                    st.column_config.LinkColumn(
+                                        label="view on Strava",
+                                        help=backend.HELP_TEXT
+                                                                ),
+                                    "date":
+                                    st.column_config.DateColumn(
+                                        format="YYYY-MM-DD"
+                                                                )
+                                    }
+                     )
+
+
 def main() -> None:
     """
     <>
@@ -107,17 +719,49 @@ def main() -> None:
     None.
 
     """
+    # time the stages of this rerun, kept with the previous reruns of the
+    # session for the debug panel
+    timings: backend.RerunTimings = backend.RerunTimings()
+    backend.record_rerun(timings)
+    st.session_state.setdefault("timings", collections.deque(
+        maxlen=backend.TIMINGS_HISTORY)).append(timings)
+    backend.METRICS.inc("reruns_total")
+    # a download in the background is stored once it is done, after an error
+    # the athlete is asked to authorize again
+    if (load := st.session_state.get("load")) is not None and load.done():
+        if load.exception() is None:
+            wrap_up(load.result(), st.session_state.get("creation"))
+        # storing the activities reruns the page, only a failure gets here
+        st.session_state.pop("load")
+        st.session_state["loaded"]: bool = False
+        st.query_params.pop("code", None)
+        load = None
+        st.error(backend.ERROR_MESSAGE2)
     params: dict = st.query_params.to_dict()
     code = params.get("code")
     st.session_state["scope"] = params.get("scope")
     if code and not st.session_state.get("loaded", False):
         connect_strava(code)
+    # until a download in the background is done the activities of the pages
+    # which arrived are shown
+    load = st.session_state.get("load")
     welcome_text = "Welcome"\
         if not (n := st.session_state.get('athlete_name'))\
         else f"Welcome, {n}"
-    df = st.session_state.get("dataframe",
-                              pd.DataFrame(columns=backend.STRAVA_COLS)
-                              ).loc[:, backend.STRAVA_COLS]
+    # retrieve the activities from the shared store by the handle
+    started: float = time.monotonic()
+    shown: int = 0 if load is None else load.published()
+    df = backend.get_store().get(st.session_state.get("dataset", "")) \
+        if load is None else load.partial()
+    if df is None:
+        df = pd.DataFrame(columns=backend.STRAVA_COLS)
+    df = df.loc[:, backend.STRAVA_COLS]
+    # replace the routes of the latest activities by the full resolution
+    # streams, which are only downloaded if they are not cached yet
+    if (count := st.session_state.get("high_resolution", 0)) and \
+            (token := st.session_state.get("access_token")) and \
+            not df.empty:
+        df = high_resolution(df, count, token)
     creation = st.session_state.get("creation",
                                     "" if df.empty
                                     else dt.datetime.strftime(
@@ -125,7 +769,9 @@ def main() -> None:
                                         backend.DT_FORMAT
                                                               )
                                     )
-    figures = backend.thread_create_figures(df, creation)
+    # the page is split in fragments which rerun on their own when a widget
+    # in them changes, the figures are kept until the state they depend on
+    # changes
     with st.spinner("Making visualizations..."):
         # SIDEBAR
         with st.sidebar:
@@ -137,66 +783,81 @@ def main() -> None:
                         )
             st.header("Menu")
             if not st.session_state.get("loaded"):
-                st.toggle(label="Look up countries",
-                          value=False)
-                image_connect = backend.load_image(backend.PATH_CONNECT)
-                st.markdown(f"""
-            <a href="{backend.authorization_link}">
-            <img src='data:image/png;base64,{image_connect}' width='100%'>
-            </a>
-                    """,
-                            unsafe_allow_html=True
-                            )
+                connect_menu()
             else:
                 st.error("connected")
+                st.number_input(label="High resolution routes for the latest "
+                                      "activities",
+                                min_value=0,
+                                max_value=backend.STREAMS_MAX_ACTIVITIES,
+                                value=0,
+                                step=10,
+                                key="high_resolution")
+            map_menu(sorted(df["country"].dropna().astype(str).unique()))
+            filter_menu(backend.get_store().derive(
+                st.session_state.get("dataset", ""),
+                "filters",
+                backend.FilterIndex))
+            st.toggle(label="Show the timings of the stages",
+                      value=False,
+                      key="debug_timings")
+            # filled in at the end of the rerun when all stages are timed
+            panel = st.container()
             st.divider()
             st.markdown(backend.EXPLANATION)
             if st.button("Show with demo data"):
-                wrap_up(backend.parse(backend.load_test_data()))
+                wrap_up(backend.load_demo_data())
+            # save the parsed activities to reload them quickly later on
+            # the file is only written when the button is clicked
+            if (handle := st.session_state.get("dataset")) is not None:
+                st.download_button(label="Save your data",
+                                   data=functools.partial(
+                                       backend.get_store().export,
+                                       handle),
+                                   file_name="activities.arrow")
+            upload = st.file_uploader(label="Load saved data or a Strava "
+                                      "export",
+                                      type=["arrow", "zip"])
+            # load an uploaded file only once as it persists over reruns
+            if upload is not None and \
+                    upload.file_id != st.session_state.get("upload"):
+                st.session_state["upload"]: str = upload.file_id
+                if upload.name.endswith(".zip"):
+                    with st.spinner("Reading the Strava export..."):
+                        wrap_up(admitted(backend.thread_read_archive,
+                                         upload.getvalue()))
+                else:
+                    try:
+                        saved: pd.DataFrame = backend.load_dataset(
+                            upload.getvalue())
+                        backend.validate_dataset(saved)
+                    except ValueError as error:
+                        st.error(f"{backend.ERROR_MESSAGE3} {error}")
+                    else:
+                        wrap_up(saved)
 
         # MAIN PAGE
         # TOP ROW
         with st.container():
-            st.markdown(f"## {backend.TITLE}: {welcome_text}")
-            st.plotly_chart(figure_or_data=figures[0],
-                            use_container_width=True,
-                            config=backend.CONFIG)
+            header(welcome_text)
+            if load is not None:
+                load_progress(load, shown, started)
+            timeline_row(df, creation)
         # MIDDLE ROW
         with st.container():
-            cols = st.columns(spec=[6, 6],
-                              gap="small")
-            cols[0].plotly_chart(figure_or_data=figures[1],
-                                 use_container_width=True,
-                                 config=backend.CONFIG)
-            subcols = cols[0].columns(spec=[3, 3], gap="small")
-            subcols[0].plotly_chart(figure_or_data=figures[3],
-                                    use_container_width=True,
-                                    config=backend.CONFIG)
-            subcols[1].plotly_chart(figure_or_data=figures[4],
-                                    use_container_width=True,
-                                    config=backend.CONFIG)
-            cols[1].plotly_chart(figure_or_data=figures[2],
-                                 use_container_width=True,
-                                 config=backend.CONFIG2)
+            middle_row(df, creation)
         # BOTTOM ROW
-        data = df.loc[:, backend.DISPLAY_COLS]
-        data["id"] = data["id"].apply(
-            lambda id_: f"{backend.ACTIVITIES_URL}{id_}"
-                                      )
-        with st.expander(f"See your {data.shape[0]} unique events",
-                         expanded=False):
-            st.dataframe(data,
-                         use_container_width=True,
-                         hide_index=True,
-                         column_order=backend.DISPLAY_COLS,
-                         column_config={"id":
-                                        st.column_config.LinkColumn(
-                                            label="view on Strava",
-                                            help=backend.HELP_TEXT
-                                                                    )
-                                        }
-                         )
+        activity_table(df)
         st.caption(backend.CAPTION)
+        if st.session_state.get("debug_timings"):
+            with panel:
+                st.caption("Stages of this rerun in seconds")
+                st.dataframe(timings.summary(),
+                             use_container_width=True)
+                st.caption("Wall time of the stages of the last reruns")
+                st.dataframe(backend.history_frame(
+                    st.session_state.get("timings")),
+                             use_container_width=True)
 
 
 if __name__ == "__main__":
@@ -209,4 +870,17 @@ if __name__ == "__main__":
         layout="wide",
         initial_sidebar_state=st.session_state.get("sidebar_state")
                        )
-    main()
+    # profile this rerun when asked for, otherwise run it unchanged
+    if profiles := backend.profiling_requested(st.query_params.to_dict()):
+        # the url asks for a profile of this rerun only
+        st.query_params.pop("profile", None)
+        with backend.profile_rerun(profiles):
+            main()
+    else:
+        main()
+    # expose the metrics of the process after every rerun, a failure to write
+    # them must not break the app
+    try:
+        backend.METRICS.write(backend.PATH_METRICS)
+    except OSError as error:
+        print(f"metrics not written: {error}")
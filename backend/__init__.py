@@ -1,10 +1,12 @@
 from backend.utils import (
+    count_request,
     get_request,
     hr2ang,
     load_category_mapper,
     load_country_code_mapper,
     load_geojson,
     load_image,
+    memory_per_row,
     min2ang,
     post_request,
     )
@@ -12,12 +14,18 @@ from backend.utils import (
 from backend.resources import (
     ACTIVITIES_LINK,
     ACTIVITIES_URL,
+    ADMISSION_RETRY,
     ATHLETE_URL,
     APP_URL,
     authorization_link,
     AUTH_LINK,
+    BORDER_PRECISION,
     BOTTOM_ROW_HEIGHT,
     CAPTION,
+    CLOCK_MAX_POINTS,
+    CLUSTER_NAMES,
+    CLUSTER_PIXELS,
+    CLUSTER_ZOOMS,
     COLOR_MAP,
     CONFIG,
     CONFIG2,
@@ -25,48 +33,229 @@ from backend.resources import (
     DISCRETE_COLOR_R,
     DISPLAY_COLS,
     DT_FORMAT,
+    EXECUTOR_BACKLOG,
+    EXECUTOR_WORKERS,
     EXPLANATION,
     ERROR_MESSAGE1,
     ERROR_MESSAGE2,
+    ERROR_MESSAGE3,
+    FILTER_COLS,
     HELP_TEXT,
+    HIGHLIGHT_COLOR,
+    HIGHLIGHT_MAX,
+    INDEX_CELL,
     LEFT_RIGHT_MARGIN,
+    LOAD_TTL,
+    MAP_PRECISION,
+    MAX_ROUTE_POINTS,
+    METRICS_BUCKETS,
+    NEAR_DISTANCE,
     NOMINATIM_LINK,
+    PAGES_IN_FLIGHT,
     PATH_CODES,
     PATH_CONNECT,
+    PATH_DEMO,
     PATH_GEOJSON,
     PATH_LOGO,
     PATH_MAPPER,
+    PATH_METRICS,
+    PATH_PROFILES,
+    PATH_STORE,
+    PATH_STREAMS,
+    PROFILE_FRAMES,
+    PROFILE_INTERVAL,
+    PROFILE_QUERY,
+    PROFILE_TOP,
+    PROGRESS_SECONDS,
+    RASTER_SIZE,
+    RENDER_BYTES,
+    RENDER_SECONDS,
+    ROUTE_CELL,
+    ROUTE_ENDPOINT_CELL,
+    ROUTE_SIMILARITY,
+    SIMPLIFY_MAX_STEP,
     STRAVA_CLIENT_ID,
     STRAVA_CLIENT_SECRET,
     STRAVA_COLS,
+    STRAVA_SCHEMA,
+    STORE_BUDGET,
+    STORE_SPILL_AGE,
+    STORE_SPILL_BUDGET,
+    STREAMS_LINK,
+    STREAMS_CACHE_AGE,
+    STREAMS_CACHE_BYTES,
+    STREAMS_MAX_ACTIVITIES,
+    STREAMS_RATE_LIMIT,
+    STREAMS_RATE_WINDOW,
+    STREAMS_WORKERS,
+    TABLE_PAGE_ROWS,
+    TABLE_SORT_COLS,
     TEMPLATE,
+    TIMELINE_MAX_BYTES,
+    TIMINGS_HISTORY,
     TITLE,
     TOKEN_LINK,
     TOP_BOTTOM_MARGIN,
-    TOP_ROW_HEIGHT
+    TOP_ROW_HEIGHT,
+    WEEKDAYS
+    )
+
+from backend.metrics import (
+    DESCRIPTIONS,
+    METRICS,
+    Metrics
+    )
+
+from backend.executors import (
+    executor_threads,
+    get_executor,
+    Saturated,
+    SharedExecutor
+    )
+
+from backend.timings import (
+    history_frame,
+    record_rerun,
+    RerunTimings,
+    stage,
+    Timing
     )
 
 from backend.strava import (
+    enforce_schema,
     get_access,
     parse,
-    refresh_access
+    refresh_access,
+    StravaError
+    )
+
+from backend.coalescing import (
+    coalesced_load,
+    Coalescer,
+    LOADS
+    )
+
+from backend.storage import (
+    dataset_size,
+    DatasetStore,
+    derived_size,
+    get_store,
+    load_dataset,
+    save_dataset,
+    validate_dataset
+    )
+
+from backend.bulk_export import (
+    open_archive,
+    read_activities_csv,
+    read_fit,
+    read_gpx,
+    read_tcx,
+    read_track,
+    read_tracks,
+    thin_out,
+    to_activity
+    )
+
+from backend.streams import (
+    acquire_request,
+    apply_streams,
+    get_stream,
+    load_stream,
+    prune_streams,
+    save_stream,
+    stream_path
+    )
+
+from backend.spatial import (
+    cluster_starts,
+    colorize,
+    country_polygons,
+    flatten_coords,
+    grid_cells,
+    heatmap_layer,
+    image_layer,
+    locate_points,
+    mercator_y,
+    rasterize,
+    route_bounds,
+    SpatialIndex,
+    start_countries,
+    view_of,
+    visited_countries
+    )
+
+from backend.routes import (
+    frequent_routes,
+    route_cells,
+    unique_routes
+    )
+
+from backend.filters import (
+    FilterIndex
+    )
+
+from backend.search import (
+    NameIndex,
+    tokenize
+    )
+
+from backend.table import (
+    ActivityTable
     )
 
 from backend.plotly_charts import (
     days,
+    first_day_of_week,
     hours,
     locations,
     timeline,
     types
     )
 
+from backend.figure_specs import (
+    clock_bins_spec,
+    clock_spec,
+    empty_spec,
+    FigureSpec,
+    highlight,
+    payload_size,
+    sunburst_spec,
+    timeline_spec,
+    weekdays_spec,
+    worldmap_spec
+    )
+
+from backend.planner import (
+    allowed,
+    COSTS,
+    dataset_stats,
+    estimate,
+    plan_figures
+    )
+
 from backend.threadpools import (
     get_activities_page,
     parse_page,
     thread_create_figures,
-    thread_get_and_parse
+    thread_get_and_parse,
+    thread_get_streams,
+    thread_read_archive,
+    timed_figure
+    )
+
+from backend.progressive import (
+    ProgressiveLoad
+    )
+
+from backend.profiling import (
+    allocation_sites,
+    profile_rerun,
+    profiling_requested,
+    SamplingProfiler
     )
 
 from backend.test import (
+    load_demo_data,
     load_test_data
     )
@@ -0,0 +1,367 @@
+# -*- coding: utf-8 -*-
+"""
+@author: QtyPython2020
+
+Read the activities from a Strava bulk export, the ZIP archive that can be
+requested under "Download or Delete Your Account", without using the API.
+
+The archive is read in memory without extracting it to disk. The track files
+are GPX, TCX or FIT files, optionally gzipped, which are decompressed one at a
+time and scanned for the coordinates only instead of building a document. Each
+track file is read whole before it is scanned, and the scanning in Python
+holds the GIL, so threads reading the files at the same time are not faster
+than one.
+"""
+# Standard library
+import csv
+import datetime as dt
+import gzip
+import io
+import math
+import re
+import struct
+import typing
+import zipfile
+# Third party
+import pandas as pd
+
+# the conversion from the FIT semicircles to degrees
+SEMICIRCLE: float = 180 / 2**31
+# the value of a FIT sint32 field without data
+FIT_INVALID: int = 0x7FFFFFFF
+# the global message number of a FIT record message with the position
+FIT_RECORD: int = 20
+# the coordinates of a GPX file, patterns starting with a literal are scanned
+# much faster than patterns matching the element names
+GPX_LAT_LON: re.Pattern = re.compile(rb'lat="([^"]+)"\s+lon="([^"]+)"')
+GPX_LON_LAT: re.Pattern = re.compile(rb'lon="([^"]+)"\s+lat="([^"]+)"')
+# the coordinates of a TCX file, each position has both elements
+TCX_LAT: re.Pattern = re.compile(rb"LatitudeDegrees>([^<]+)<")
+TCX_LON: re.Pattern = re.compile(rb"LongitudeDegrees>([^<]+)<")
+
+
+def open_archive(archive: typing.Union[bytes | str]) -> zipfile.ZipFile:
+    """
+    Open the archive from memory or from disk.
+
+    Parameters
+    ----------
+    archive : typing.Union[bytes | str]
+        The contents or the filepath of the archive.
+
+    Returns
+    -------
+    zipfile.ZipFile
+        The opened archive.
+
+    """
+    return zipfile.ZipFile(io.BytesIO(archive)
+                           if isinstance(archive, bytes) else archive)
+
+
+def read_activities_csv(archive: zipfile.ZipFile) -> list[dict]:
+    """
+    Read the overview of all activities in the archive.
+
+    Parameters
+    ----------
+    archive : zipfile.ZipFile
+        The opened archive.
+
+    Returns
+    -------
+    rows : list[dict]
+        One row per activity with the columns of activities.csv.
+
+    """
+    with archive.open("activities.csv") as file:
+        rows: list[dict] = list(csv.DictReader(io.TextIOWrapper(
+            file,
+            encoding="utf-8-sig")
+                                               )
+                                )
+    return rows
+
+
+def thin_out(points: list,
+             max_points: int) -> list:
+    """
+    Keep every n-th point of a route, and the last point, so that no more than
+    the maximum amount of points remains.
+
+    Parameters
+    ----------
+    points : list
+        The points of the route.
+    max_points : int
+        The maximum amount of points of the route.
+
+    Returns
+    -------
+    points : list
+        The remaining points.
+
+    """
+    if len(points) > max_points:
+        step: int = math.ceil(len(points) / max_points)
+        points = points[::step] + ([points[-1]]
+                                   if (len(points) - 1) % step else [])
+    return points
+
+
+def read_gpx(content: bytes,
+             max_points: int) -> list[tuple[float, float]]:
+    """
+    Read the coordinates of the track points in a GPX file.
+
+    Parameters
+    ----------
+    content : bytes
+        The GPX file.
+    max_points : int
+        The maximum amount of points of the route.
+
+    Returns
+    -------
+    points : list[tuple[float, float]]
+        The (lat, lon) coordinates.
+
+    """
+    pairs: list = GPX_LAT_LON.findall(content)
+    # the attributes of the track points can be in either order
+    if not pairs:
+        pairs = [(lat, lon) for lon, lat in GPX_LON_LAT.findall(content)]
+    points: list = [(float(lat), float(lon))
+                    # thin out before converting the text to numbers
+                    for lat, lon in thin_out(pairs, max_points)]
+    return points
+
+
+def read_tcx(content: bytes,
+             max_points: int) -> list[tuple[float, float]]:
+    """
+    Read the coordinates of the track points in a TCX file.
+
+    Parameters
+    ----------
+    content : bytes
+        The TCX file.
+    max_points : int
+        The maximum amount of points of the route.
+
+    Returns
+    -------
+    points : list[tuple[float, float]]
+        The (lat, lon) coordinates.
+
+    """
+    pairs: list = list(zip(TCX_LAT.findall(content),
+                           TCX_LON.findall(content)))
+    points: list = [(float(lat), float(lon))
+                    # thin out before converting the text to numbers
+                    for lat, lon in thin_out(pairs, max_points)]
+    return points
+
+
+def read_fit(content: bytes,
+             max_points: int) -> list[tuple[float, float]]:
+    """
+    Read the coordinates of the record messages in a FIT file. Only the
+    message layout is interpreted, so no FIT profile is required.
+
+    Parameters
+    ----------
+    content : bytes
+        The FIT file.
+    max_points : int
+        The maximum amount of points of the route.
+
+    Returns
+    -------
+    points : list[tuple[float, float]]
+        The (lat, lon) coordinates.
+
+    """
+    pairs: list = []
+    header_size: int = content[0]
+    end: int = header_size + struct.unpack_from("<I", content, 4)[0]
+    # the layout of the data messages per record header byte
+    layouts: list = [None] * 256
+    position: int = header_size
+    while position < end:
+        record_header: int = content[position]
+        position += 1
+        # data message with a normal or a compressed timestamp header
+        if (entry := layouts[record_header]) is not None:
+            layout, swapped, size = entry
+            if layout is not None:
+                pair: tuple = layout.unpack_from(content, position)
+                pairs.append(pair[::-1] if swapped else pair)
+            position += size
+            continue
+        # stop at a data message without a definition as the file is corrupt
+        if record_header & 0xC0 != 0x40:
+            break
+        # definition message
+        endian: str = ">" if content[position+1] else "<"
+        number: int = struct.unpack_from(f"{endian}H",
+                                         content,
+                                         position+2)[0]
+        fields: bytes = content[position+5:
+                                position+5+3*content[position+4]]
+        position += 5 + len(fields)
+        size: int = 0
+        offsets: dict = {}
+        for index in range(0, len(fields), 3):
+            # position_lat and position_long are fields 0 and 1
+            if fields[index] in (0, 1) and fields[index+1] == 4:
+                offsets[fields[index]] = size
+            size += fields[index+1]
+        # developer data fields
+        if record_header & 0x20:
+            developer: bytes = content[position+1:
+                                       position+1+3*content[position]]
+            position += 1 + len(developer)
+            size += sum(developer[1::3])
+        # only the record messages with a position are unpacked
+        layout: struct.Struct | None = None
+        if number == FIT_RECORD and offsets.keys() == {0, 1}:
+            first, second = sorted(offsets.values())
+            layout = struct.Struct(f"{endian}{first}xi{second-first-4}xi")
+        entry = (layout, offsets.get(0, 0) > offsets.get(1, 0), size)
+        local: int = record_header & 0x0F
+        layouts[local] = entry
+        # compressed timestamp headers refer to the local types 0 to 3
+        if local < 4:
+            for time_offset in range(32):
+                layouts[0x80 | local << 5 | time_offset] = entry
+    points: list = [(lat * SEMICIRCLE, lon * SEMICIRCLE)
+                    # thin out before converting the semicircles to degrees
+                    for lat, lon in thin_out([pair for pair in pairs
+                                              if FIT_INVALID not in pair],
+                                             max_points)]
+    return points
+
+
+READERS: dict[str, typing.Callable] = {".gpx": read_gpx,
+                                       ".tcx": read_tcx,
+                                       ".fit": read_fit}
+
+
+def read_track(archive: zipfile.ZipFile,
+               filename: str,
+               max_points: int) -> list[tuple[float, float]]:
+    """
+    Read the route of one activity thinned out to a maximum number of points,
+    which keeps the memory of long histories bounded. The decompressed file is
+    held in memory while it is scanned.
+
+    Parameters
+    ----------
+    archive : zipfile.ZipFile
+        The opened archive.
+    filename : str
+        The path of the track file in the archive.
+    max_points : int
+        The maximum amount of points of the route.
+
+    Returns
+    -------
+    points : list[tuple[float, float]]
+        The (lat, lon) coordinates or an empty list for unknown files.
+
+    """
+    name: str = filename.removesuffix(".gz")
+    reader: typing.Callable | None = READERS.get(name[name.rfind("."):]
+                                                 .lower())
+    if not filename or reader is None:
+        return []
+    try:
+        member: zipfile.ZipExtFile = archive.open(filename)
+    # the track file is missing from the archive
+    except KeyError:
+        return []
+    with member:
+        # decompress a gzipped track file while reading it
+        points: list = reader(gzip.GzipFile(fileobj=member).read()
+                              if filename.endswith(".gz") else member.read(),
+                              max_points)
+    return points
+
+
+def read_tracks(archive: typing.Union[bytes | str],
+                filenames: list[str],
+                max_points: int) -> list[list[tuple[float, float]]]:
+    """
+    Read the routes of a group of activities with one opened archive.
+
+    Parameters
+    ----------
+    archive : typing.Union[bytes | str]
+        The contents or the filepath of the archive.
+    filenames : list[str]
+        The paths of the track files in the archive.
+    max_points : int
+        The maximum amount of points per route.
+
+    Returns
+    -------
+    list[list[tuple[float, float]]]
+        The route per track file.
+
+    """
+    with open_archive(archive) as opened:
+        return [read_track(opened, filename, max_points)
+                for filename in filenames]
+
+
+def to_activity(row: dict,
+                points: list[tuple[float, float]]) -> dict:
+    """
+    Convert a row of activities.csv and its route to the shape of an activity
+    from the Strava API, so it can be parsed like the downloaded activities.
+    The export has the start date only in UTC, without the time zone of the
+    activity, so unlike for the downloaded activities the start date and the
+    hours are in UTC and not in local time.
+
+    Parameters
+    ----------
+    row : dict
+        The row of activities.csv.
+    points : list[tuple[float, float]]
+        The (lat, lon) coordinates of the route.
+
+    Returns
+    -------
+    activity : dict
+        The activity in the shape of the API response.
+
+    """
+    # the export contains the start date in UTC in a written out format, it
+    # takes the place of the local start date as the time zone is unknown
+    try:
+        timestamp: dt.datetime = dt.datetime.strptime(
+            row.get("Activity Date"),
+            "%b %d, %Y, %I:%M:%S %p"
+                                                      )
+    # fall back to inferring the format of other locales
+    except ValueError:
+        timestamp = pd.to_datetime(row.get("Activity Date"))
+    activity: dict = {"id": int(row.get("Activity ID")),
+                      "name": row.get("Activity Name"),
+                      # the types in the export are written with spaces
+                      "sport_type": row.get("Activity Type",
+                                            "").replace(" ", ""),
+                      "start_date_local":
+                          timestamp.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                      "map": {"summary_polyline": None},
+                      # skip encoding and decoding a polyline
+                      "coords": points
+                      }
+    if points:
+        activity["start_latlng"] = list(points[0])
+    return activity
+
+
+if __name__ == "__main__":
+    pass
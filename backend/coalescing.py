@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+@author: QtyPython2020
+
+Coalesce the concurrent loads of the activities of the same athlete.
+
+The first session loading the activities of an athlete starts the download
+in the background, the sessions asking for the same athlete while it runs or
+shortly after it finished, like a second tab or a rerun during the download,
+follow the same download and receive the same result. A short time after the
+download finished the activities are retrieved anew.
+"""
+# Standard library
+import concurrent.futures as c_futures
+import operator
+import threading
+import time
+import typing
+# Local imports
+import backend
+
+
+class Coalescer:
+    """
+    Run a function once per key at a time, sharing its result with the
+    callers of the same key and reusing it until it expires.
+    """
+
+    def __init__(self,
+                 name: str,
+                 ttl: float,
+                 finished: typing.Callable[[typing.Any], float | None] = None
+                 ) -> None:
+        """
+        Parameters
+        ----------
+        name : str
+            The name of the coalescer, the label of its metrics.
+        ttl : float
+            The seconds a result is reused after it finished.
+        finished : typing.Callable[[typing.Any], float | None], optional
+            The monotonic time a result finished, or None while it is still
+            running in the background and reused in any case. The default is
+            None for the time the function returned.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.name: str = name
+        self.ttl: float = ttl
+        self.finished: typing.Callable | None = finished
+        # the futures of the running calls and the results with the time the
+        # function returned, per key
+        self._running: dict[typing.Hashable, c_futures.Future] = {}
+        self._finished: dict[typing.Hashable, tuple[float, typing.Any]] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def _expired(self,
+                 returned: float,
+                 result: typing.Any,
+                 now: float) -> bool:
+        """
+        Parameters
+        ----------
+        returned : float
+            The monotonic time the function returned the result.
+        result : typing.Any
+            The result of the function.
+        now : float
+            The current monotonic time.
+
+        Returns
+        -------
+        bool
+            Whether the result finished more than the ttl ago.
+
+        """
+        finished: float | None = returned if self.finished is None \
+            else self.finished(result)
+        return finished is not None and finished + self.ttl <= now
+
+    def run(self,
+            key: typing.Hashable,
+            func: typing.Callable,
+            *args: typing.Any,
+            **kwargs: typing.Any) -> typing.Any:
+        """
+        Parameters
+        ----------
+        key : typing.Hashable
+            The key of the call.
+        func : typing.Callable
+            The function, which is only run if no call of the key is running
+            and no result of the key is running or finished within the
+            ttl.
+        *args : typing.Any
+            Arguments of the function.
+        **kwargs : typing.Any
+            Key word arguments of the function.
+
+        Returns
+        -------
+        typing.Any
+            The result of the function, also if it was run by another caller.
+
+        """
+        backend.METRICS.inc("cache_requests_total", cache=self.name)
+        now: float = time.monotonic()
+        with self._lock:
+            # forget the expired results
+            self._finished = {other: (returned, result)
+                              for other, (returned, result)
+                              in self._finished.items()
+                              if not self._expired(returned, result, now)}
+            if key in self._finished:
+                return self._finished[key][1]
+            future: c_futures.Future | None = self._running.get(key)
+            leading: bool = future is None
+            if leading:
+                future = self._running[key] = c_futures.Future()
+        # wait for the caller running the function, its errors are raised as
+        # well
+        if not leading:
+            return future.result()
+        backend.METRICS.inc("cache_misses_total", cache=self.name)
+        try:
+            result: typing.Any = func(*args, **kwargs)
+        except BaseException as error:
+            with self._lock:
+                del self._running[key]
+            future.set_exception(error)
+            raise
+        with self._lock:
+            del self._running[key]
+            self._finished[key] = (time.monotonic(), result)
+        future.set_result(result)
+        return result
+
+    def forget(self,
+               key: typing.Hashable,
+               result: typing.Any) -> None:
+        """
+        Stop reusing a result, unless the key has a newer result meanwhile.
+
+        Parameters
+        ----------
+        key : typing.Hashable
+            The key of the call.
+        result : typing.Any
+            The result to forget.
+
+        Returns
+        -------
+        None.
+
+        """
+        with self._lock:
+            if key in self._finished and self._finished[key][1] is result:
+                del self._finished[key]
+
+
+# the loads of the activities per athlete, shared by all sessions while they
+# run and for a while after they finished
+LOADS: Coalescer = Coalescer("loads",
+                             backend.LOAD_TTL,
+                             operator.attrgetter("finished"))
+
+
+def coalesced_load(athlete_id: int | None,
+                   token: str) -> "backend.ProgressiveLoad":
+    """
+    Start the download of the activities of an athlete in the background,
+    once for the sessions of the athlete while it runs and LOAD_TTL seconds
+    after it finished.
+
+    Parameters
+    ----------
+    athlete_id : int | None
+        The Strava id of the athlete, None to always start a download.
+    token : str
+        Strava access token.
+
+    Returns
+    -------
+    backend.ProgressiveLoad
+        The download, whose activities are shared and should not be changed.
+
+    """
+    if athlete_id is None:
+        return backend.ProgressiveLoad(token)
+    load: backend.ProgressiveLoad = LOADS.run(athlete_id,
+                                              backend.ProgressiveLoad,
+                                              token)
+    # a failed download is not shared, the athlete starts a new one
+    if load.exception() is not None:
+        LOADS.forget(athlete_id, load)
+        load = LOADS.run(athlete_id, backend.ProgressiveLoad, token)
+    return load
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+@author: QtyPython2020
+
+The executors shared by all sessions of the server, instead of thread pools
+created for each call.
+
+Each executor has a fixed amount of long lived workers, sized to the machine.
+The waiting tasks are queued per session and the workers take them from the
+sessions in turn, so a session with many tasks does not delay the others. A
+job is admitted only while few enough tasks are waiting, otherwise it is
+queued by the caller and submitted again later. The workers run the tasks in
+the context they were submitted in, so the stages are timed in the rerun
+which submitted them. A task should not wait on another task of the same
+executor.
+"""
+# Standard library
+import collections
+import concurrent.futures as c_futures
+import contextvars
+import threading
+import time
+import typing
+# Third party
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+# Local imports
+import backend
+
+
+# the attribute of a thread holding the context of the rerun
+_CONTEXT_ATTR: str = "streamlit_script_run_ctx"
+_LOCK: threading.Lock = threading.Lock()
+_EXECUTORS: dict[str, "SharedExecutor"] = {}
+
+
+class Saturated(RuntimeError):
+    """
+    The executor has too many tasks waiting to admit a new job.
+    """
+
+    def __init__(self, pool: str, waiting: int) -> None:
+        """
+        Parameters
+        ----------
+        pool : str
+            The name of the executor.
+        waiting : int
+            The amount of tasks waiting.
+
+        Returns
+        -------
+        None.
+
+        """
+        super().__init__(f"{waiting} tasks are waiting for the {pool} "
+                         "executor")
+        self.pool: str = pool
+        self.waiting: int = waiting
+
+
+class SharedExecutor:
+    """
+    A fixed amount of workers taking the tasks of the sessions in turn.
+    """
+
+    def __init__(self,
+                 name: str,
+                 workers: int,
+                 capacity: int) -> None:
+        """
+        Parameters
+        ----------
+        name : str
+            The name of the executor, the label of its metrics.
+        workers : int
+            The amount of worker threads.
+        capacity : int
+            The amount of waiting tasks from which new jobs are not admitted.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.name: str = name
+        self.workers: int = workers
+        self.capacity: int = capacity
+        # the waiting tasks per session, the next session to serve first
+        self._queues: collections.OrderedDict[str, collections.deque] = \
+            collections.OrderedDict()
+        self._waiting: int = 0
+        self._busy: int = 0
+        self._condition: threading.Condition = threading.Condition()
+        self.threads: list[threading.Thread] = [
+            threading.Thread(target=self._work,
+                             name=f"{name}-{number}",
+                             daemon=True)
+            for number in range(workers)]
+        for thread in self.threads:
+            thread.start()
+        backend.METRICS.set("executor_workers", workers, pool=name)
+
+    def waiting(self) -> int:
+        """
+        Returns
+        -------
+        int
+            The amount of tasks waiting for a worker.
+
+        """
+        with self._condition:
+            return self._waiting
+
+    def admit(self) -> None:
+        """
+        Check whether a new job can be submitted.
+
+        Raises
+        ------
+        Saturated
+            If the capacity of waiting tasks is reached.
+
+        Returns
+        -------
+        None.
+
+        """
+        if (waiting := self.waiting()) >= self.capacity:
+            backend.METRICS.inc("executor_rejected_total", pool=self.name)
+            raise Saturated(self.name, waiting)
+
+    def submit(self,
+               func: typing.Callable,
+               *args: typing.Any,
+               **kwargs: typing.Any) -> c_futures.Future:
+        """
+        Queue a task of the session of the calling thread.
+
+        Parameters
+        ----------
+        func : typing.Callable
+            The function of the task.
+        *args : typing.Any
+            Arguments of the function.
+        **kwargs : typing.Any
+            Key word arguments of the function.
+
+        Returns
+        -------
+        c_futures.Future
+            The future of the result of the function.
+
+        """
+        future: c_futures.Future = c_futures.Future()
+        rerun = get_script_run_ctx(suppress_warning=True)
+        session: str = "" if rerun is None else rerun.session_id
+        task: tuple = (future, contextvars.copy_context(), rerun,
+                       time.perf_counter(), func, args, kwargs)
+        with self._condition:
+            self._queues.setdefault(session, collections.deque()).append(task)
+            self._waiting += 1
+            backend.METRICS.set("executor_waiting", self._waiting,
+                                pool=self.name)
+            self._condition.notify()
+        return future
+
+    def _next(self) -> tuple:
+        """
+        Wait for a task, from the session which was served the longest ago.
+
+        Returns
+        -------
+        tuple
+            The future, the contexts, the time of submission, the function
+            and its arguments of the task.
+
+        """
+        with self._condition:
+            while not self._queues:
+                self._condition.wait()
+            session, tasks = next(iter(self._queues.items()))
+            task: tuple = tasks.popleft()
+            # the session goes to the back of the line
+            if tasks:
+                self._queues.move_to_end(session)
+            else:
+                del self._queues[session]
+            self._waiting -= 1
+            self._busy += 1
+            backend.METRICS.set("executor_waiting", self._waiting,
+                                pool=self.name)
+            backend.METRICS.set("threads_active", self._busy, pool=self.name)
+        return task
+
+    def _work(self) -> None:
+        """
+        Run the tasks until the process ends.
+
+        Returns
+        -------
+        None.
+
+        """
+        thread: threading.Thread = threading.current_thread()
+        while True:
+            future, context, rerun, submitted, func, args, kwargs = \
+                self._next()
+            started: float = time.perf_counter()
+            backend.METRICS.observe("executor_wait_seconds",
+                                    started - submitted,
+                                    pool=self.name)
+            if future.set_running_or_notify_cancel():
+                # the cached functions of streamlit look up the rerun
+                setattr(thread, _CONTEXT_ATTR, rerun)
+                try:
+                    result: typing.Any = context.run(func, *args, **kwargs)
+                except BaseException as error:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+                finally:
+                    setattr(thread, _CONTEXT_ATTR, None)
+            backend.METRICS.inc("executor_busy_seconds_total",
+                                time.perf_counter() - started,
+                                pool=self.name)
+            with self._condition:
+                self._busy -= 1
+                backend.METRICS.set("threads_active", self._busy,
+                                    pool=self.name)
+
+
+def executor_threads() -> list[threading.Thread]:
+    """
+    Returns
+    -------
+    list[threading.Thread]
+        The workers of the executors created so far.
+
+    """
+    with _LOCK:
+        return [thread
+                for executor in _EXECUTORS.values()
+                for thread in executor.threads]
+
+
+def get_executor(pool: str) -> SharedExecutor:
+    """
+    Create the executor on first use, shared by all sessions of the server.
+
+    Parameters
+    ----------
+    pool : str
+        The name of the executor, "io" for the requests and "cpu" for the
+        parsing and the figures.
+
+    Returns
+    -------
+    SharedExecutor
+        The executor.
+
+    """
+    with _LOCK:
+        if pool not in _EXECUTORS:
+            workers: int = backend.EXECUTOR_WORKERS[pool]
+            _EXECUTORS[pool] = SharedExecutor(pool,
+                                              workers,
+                                              workers *
+                                              backend.EXECUTOR_BACKLOG)
+        return _EXECUTORS[pool]
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,804 @@
+# -*- coding: utf-8 -*-
+"""
+@author: QtyPython2020
+
+The figures as plain plotly JSON specs, built without plotly express and the
+validation of every property by the graph objects.
+
+The layouts start from a base made once per process, with the template, the
+margins and the fixed axes of _update_layout baked in. The spec functions take
+the same preprocessed data as the figure functions in plotly_charts. The
+coordinates of the map are sent as binary typed arrays instead of numbers.
+
+spec functions:
+    empty_spec
+    timeline_spec
+    weekdays_spec
+    clock_spec
+    clock_bins_spec
+    sunburst_spec
+    worldmap_spec
+
+helper functions:
+    payload_size
+
+Run this module to compare the time to build the figures both ways:
+    python -m backend.figure_specs
+
+"""
+# Standard library
+import base64
+import datetime as dt
+import functools
+import time
+import typing
+# Third party
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+# Local imports
+import backend
+
+
+class FigureSpec(go.Figure):
+    """
+    A figure given as its plain JSON spec.
+
+    plotly and Streamlit take the dict of a go.Figure as validated already, so
+    the spec is passed on as it is.
+    """
+
+    def __init__(self, spec: dict) -> None:
+        """
+        Parameters
+        ----------
+        spec : dict
+            The data and the layout of the figure.
+
+        Returns
+        -------
+        None.
+
+        """
+        # skip the validating constructor of go.Figure
+        self._spec: dict = spec
+
+    def __repr__(self) -> str:
+        return f"FigureSpec({len(self._spec.get('data', []))} traces)"
+
+    def to_dict(self) -> dict:
+        return self._spec
+
+    def to_plotly_json(self) -> dict:
+        return self._spec
+
+    def to_json(self, *args: typing.Any, **kwargs: typing.Any) -> str:
+        return pio.to_json(self._spec, *args, validate=False, **kwargs)
+
+    def add_annotation(self, **kwargs: typing.Any) -> "FigureSpec":
+        """
+        Add an annotation to the layout without validating it.
+
+        Parameters
+        ----------
+        **kwargs : typing.Any
+            The properties of the annotation.
+
+        Returns
+        -------
+        FigureSpec
+            The figure itself.
+
+        """
+        self._spec.setdefault("layout", {}).setdefault("annotations",
+                                                       []).append(kwargs)
+        return self
+
+
+@functools.lru_cache(maxsize=None)
+def _template(name: str) -> dict:
+    """
+    Convert a plotly template to a dict once per process.
+
+    Parameters
+    ----------
+    name : str
+        The name of the plotly template.
+
+    Returns
+    -------
+    dict
+        The data and the layout of the template.
+
+    """
+    return pio.templates[name].to_plotly_json()
+
+
+@functools.lru_cache(maxsize=None)
+def _base_layout() -> dict:
+    """
+    Returns
+    -------
+    dict
+        The layout shared by all figures, the same as _update_layout with the
+        template of the app.
+
+    """
+    return {"template": _template(backend.TEMPLATE),
+            "showlegend": False,
+            # set the margins of the graph to optimize visable area
+            "margin": {"l": backend.LEFT_RIGHT_MARGIN,
+                       "r": backend.LEFT_RIGHT_MARGIN,
+                       "t": backend.TOP_BOTTOM_MARGIN,
+                       "b": backend.TOP_BOTTOM_MARGIN},
+            # prevent scrolling on the graphs
+            "xaxis": {"fixedrange": True},
+            "yaxis": {"fixedrange": True}}
+
+
+def _layout(title: str,
+            height: int,
+            **kwargs: typing.Any) -> dict:
+    """
+    Parameters
+    ----------
+    title : str
+        The title of the plot.
+    height : int
+        The height of the plot.
+    **kwargs : typing.Any
+        The properties of the layout, the dicts are merged with the dicts of
+        the base layout.
+
+    Returns
+    -------
+    layout : dict
+        The layout of the figure.
+
+    """
+    layout: dict = {**_base_layout(),
+                    "title": {"text": title},
+                    "height": height}
+    for key, value in kwargs.items():
+        layout[key] = {**layout[key], **value} \
+            if isinstance(value, dict) and isinstance(layout.get(key), dict) \
+            else value
+    return layout
+
+
+def _angular_axis() -> dict:
+    """
+    Returns
+    -------
+    dict
+        The angular axis of the clock with the hours starting at due north.
+
+    """
+    return {"direction": "clockwise",
+            "rotation": 90,
+            "tickvals": [backend.hr2ang(hr) for hr in range(24)],
+            "ticktext": [str(24 if hr == 0 else hr) for hr in range(24)]}
+
+
+def _vline(x_pos: dt.date) -> dict:
+    """
+    Parameters
+    ----------
+    x_pos : dt.date
+        The position of the line.
+
+    Returns
+    -------
+    dict
+        A vertical line over the height of the plot.
+
+    """
+    return {"type": "line",
+            "x0": x_pos,
+            "x1": x_pos,
+            "xref": "x",
+            "y0": 0,
+            "y1": 1,
+            "yref": "y domain",
+            "line": {"color": backend.COLOR_MAP.get("Strava"),
+                     "width": 1}}
+
+
+def _annotation_color(x_pos: dt.date,
+                      ax: int,
+                      text: str) -> dict:
+    """
+    Parameters
+    ----------
+    x_pos : dt.date
+        The position of the arrow.
+    ax : int
+        The horizontal offset of the text.
+    text : str
+        The text of the annotation.
+
+    Returns
+    -------
+    dict
+        The annotation of _add_annotation_color.
+
+    """
+    return {"x": x_pos,
+            "ax": ax,
+            "y": 5,
+            "text": text,
+            "font": {"color": backend.COLOR_MAP.get("Strava"),
+                     "family": "Arial",
+                     "size": 12},
+            "showarrow": True,
+            "arrowcolor": backend.COLOR_MAP.get("Strava")}
+
+
+def _typed_array(values: np.ndarray,
+                 precision: int) -> dict:
+    """
+    Round the coordinates and encode them as a base64 typed array, which
+    plotly.js reads without parsing a number per value.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        The coordinates, with NaN as the gaps of lines.
+    precision : int
+        The decimals of the coordinates.
+
+    Returns
+    -------
+    dict
+        The type of the numbers and their bytes.
+
+    """
+    values = np.round(np.asarray(values, dtype=np.float64), precision)
+    single: np.ndarray = values.astype("<f4")
+    # single precision halves the bytes unless it moves a coordinate by more
+    # than its last decimal
+    exact: bool = np.max(np.abs(single - values),
+                         initial=0,
+                         where=~np.isnan(values)) <= 10.**-precision
+    return {"dtype": "f4" if exact else "f8",
+            "bdata": base64.b64encode((single if exact
+                                       else values.astype("<f8")).tobytes()
+                                      ).decode("ascii")}
+
+
+def payload_size(figure: go.Figure) -> int:
+    """
+    Measure the size of a figure as sent to the browser.
+
+    Parameters
+    ----------
+    figure : go.Figure
+        The figure or the spec of the figure.
+
+    Returns
+    -------
+    int
+        The amount of bytes of the JSON.
+
+    """
+    return len(pio.to_json(figure.to_dict(), validate=False))
+
+
+def highlight(figure: go.Figure,
+              chart: str,
+              data: pd.DataFrame) -> go.Figure:
+    """
+    Overlay the highlighted activities on a copy of a figure, so the figure
+    itself can be reused without them.
+
+    Parameters
+    ----------
+    figure : go.Figure
+        The figure or the spec of the figure.
+    chart : str
+        The name of the figure, the timeline and the locations are
+        highlighted.
+    data : pd.DataFrame
+        The highlighted activities, of which the latest HIGHLIGHT_MAX are
+        drawn.
+
+    Returns
+    -------
+    go.Figure
+        The spec with the highlighted activities or the figure itself.
+
+    """
+    data = data.iloc[-backend.HIGHLIGHT_MAX:]
+    marker: dict = {"color": backend.HIGHLIGHT_COLOR, "size": 8}
+    if chart == "timeline":
+        # on the axis below the activities of the week, which the x axis
+        # shows by its first day
+        trace: dict = {"type": "scattergl",
+                       "x": backend.first_day_of_week(data).to_numpy(),
+                       "y": np.zeros(data.shape[0]),
+                       "text": data["name"].astype(str).to_numpy(),
+                       "customdata": data["date"].astype(str).to_numpy(),
+                       "hovertemplate": "<b>%{text}</b><br>%{customdata}",
+                       "marker": {**marker, "symbol": "triangle-up"},
+                       "mode": "markers",
+                       "name": ""}
+    elif chart == "locations":
+        trace = {"type": "scattermapbox",
+                 "lat": data["lat"].to_numpy(),
+                 "lon": data["lon"].to_numpy(),
+                 "text": data["name"].astype(str).to_numpy(),
+                 "hovertemplate": "<b>%{text}</b>",
+                 "marker": marker,
+                 "mode": "markers",
+                 "name": "",
+                 "subplot": "mapbox"}
+    else:
+        return figure
+    spec: dict = figure.to_dict()
+    return FigureSpec({**spec, "data": [*spec.get("data", []), trace]})
+
+
+def empty_spec(title: str,
+               height: int = None,
+               **kwargs: typing.Any) -> FigureSpec:
+    """
+    Create an empty figure with the title and a text label to show that no data
+    is available to display.
+
+    Parameters
+    ----------
+    title : str
+        The title of the replaced figure.
+    height : int, optional
+        The desired height of the figure. The default is None.
+    **kwargs : typing.Any
+        Key word arguments.
+
+    Returns
+    -------
+    FigureSpec
+        An empty figure with the title of the original plot and an annotation.
+
+    """
+    figure: FigureSpec = FigureSpec({
+        "data": [],
+        "layout": {"template": _template(pio.templates.default),
+                   "title": {"text": title},
+                   "height": height}
+                                     })
+    return backend.plotly_charts._add_annotation(figure, **kwargs)
+
+
+def timeline_spec(aggregated_data: pd.DataFrame,
+                  data: pd.DataFrame,
+                  title: str,
+                  height: int = None,
+                  **kwargs: typing.Any) -> FigureSpec:
+    """
+    Create an area plot to display the training intensity per calender week and
+    overlay the data of the actual activities.
+
+    Parameters
+    ----------
+    aggregated_data : pd.DataFrame
+        The dataframe containing the grouped data for the plots.
+    data : pd.DataFrame
+        The dataframe containing the data for the plots.
+    title : str
+        The title of the plot.
+    height : int, optional
+        The height of the plot. The default is None.
+    **kwargs : typing.Any
+        Key word arguments.
+
+    Returns
+    -------
+    FigureSpec
+        The area figure with an overlayed scatter plot.
+
+    """
+    xaxis = kwargs.get("x")
+    yaxis = kwargs.get("y")
+    app = kwargs.get("group")
+    traces: list[dict] = [{"type": "scatter",
+                           "x": group[xaxis].to_numpy(),
+                           "y": group[yaxis].to_numpy(),
+                           "customdata": np.full((group.shape[0], 1), name),
+                           "hovertemplate": "Activity on %{customdata[0]}",
+                           "legendgroup": name,
+                           "line": {"color": backend.COLOR_MAP.get(name),
+                                    "shape": "spline"},  # smooth the line
+                           "mode": "lines",
+                           "name": name,
+                           "orientation": "v",
+                           "stackgroup": "1"}
+                          for name, group in aggregated_data.groupby(
+                              app, observed=True, sort=False)]
+    # draw the markers with WebGL as there can be thousands of them
+    traces.append({"type": "scattergl",
+                   "customdata": data.loc[:, ["name", "date"]].to_numpy(),
+                   "hovertemplate":
+                       "<b>%{customdata[0]}</b><br>%{customdata[1]}",
+                   "marker": {"size": 3},
+                   "mode": "markers",
+                   "name": "",
+                   "opacity": 1,
+                   # position the dots by week
+                   "x": data[kwargs.get("scatter_x")].to_numpy(),
+                   "y": data[kwargs.get("scatter_y")].to_numpy(),
+                   **kwargs.get("scatter", {})})
+    creation_date: dt.date = kwargs.get("creation_date")
+    today: dt.date = dt.datetime.now().date()
+    layout: dict = _layout(
+        title,
+        height,
+        xaxis={"title": {"text": "Year"},
+               "range": [creation_date - dt.timedelta(days=2),
+                         today + dt.timedelta(days=2)]},
+        yaxis={"title": {"text": yaxis}},
+        shapes=[_vline(creation_date), _vline(today)],
+        annotations=[_annotation_color(creation_date,
+                                       100,
+                                       "Strava profile created"),
+                     _annotation_color(today, -100, "Today")]
+                           )
+    return FigureSpec({"data": traces, "layout": layout})
+
+
+def weekdays_spec(aggregated_data: pd.DataFrame,
+                  title: str,
+                  height: int = None,
+                  **kwargs: typing.Any) -> FigureSpec:
+    """
+    Create a bar plot of the share of the activities per weekday.
+
+    Parameters
+    ----------
+    aggregated_data : pd.DataFrame
+        The dataframe containing the grouped data for the plots.
+    title : str
+        The title of the plot.
+    height : int, optional
+        The height of the plot. The default is None.
+    **kwargs : typing.Any
+        Key word arguments.
+
+    Returns
+    -------
+    FigureSpec
+        The bar figure.
+
+    """
+    traces: list[dict] = [{"type": "bar",
+                           "x": group["weekday"].to_numpy(),
+                           "y": group["percentage"].to_numpy(),
+                           "customdata": [[backend.WEEKDAYS[day]]
+                                          for day in group["weekday"]],
+                           "hovertemplate": "<b>%{customdata[0]}</b><br>%{y}",
+                           "marker": {"color": backend.COLOR_MAP.get(name)},
+                           "name": name,
+                           "texttemplate": "%{y:.0%}",
+                           "textposition": "auto"}
+                          for name, group in aggregated_data.groupby(
+                              "app", observed=True, sort=False)]
+    layout: dict = _layout(title,
+                           height,
+                           barmode="relative",
+                           xaxis={"title": {"text": "weekday"},
+                                  "tickmode": "array",
+                                  "tickvals": list(range(7)),
+                                  # relabel the xaxis ticks
+                                  "ticktext":
+                                      ["M", "T", "W", "T", "F", "S", "S"],
+                                  # show all labels even if the column is
+                                  # empty
+                                  "range": [-.5, 6.5]},
+                           yaxis={"title": {"text": "percentage"},
+                                  "tickmode": "linear",
+                                  "tick0": 0,
+                                  "dtick": 0.05,
+                                  "tickformat": ".0%"})
+    return FigureSpec({"data": traces, "layout": layout})
+
+
+def clock_spec(preprocessed_data: pd.DataFrame,
+               title: str,
+               height: int = None,
+               **kwargs: typing.Any) -> FigureSpec:
+    """
+    Create a polar scatter plot with a marker per activity at its start time.
+
+    Parameters
+    ----------
+    preprocessed_data : pd.DataFrame
+        The dataframe containing the grouped data for the plots.
+    title : str
+        The title of the plot.
+    height : int, optional
+        The height of the plot. The default is None.
+    **kwargs : typing.Any
+        Key word arguments.
+
+    Returns
+    -------
+    FigureSpec
+        The polar scatter figure.
+
+    """
+    traces: list[dict] = [{"type": "scatterpolar",
+                           "r": group["pos"].to_numpy(),
+                           "theta": group["timestep"].to_numpy(),
+                           "customdata":
+                               group.loc[:, ["name", "time"]].to_numpy(),
+                           "hovertext": group["name"].to_numpy(),
+                           "hovertemplate":
+                               "<b>%{customdata[0]}</b><br>%{customdata[1]}",
+                           "marker": {"color": backend.COLOR_MAP.get(name),
+                                      "symbol": "circle"},
+                           "mode": "markers",
+                           "name": name}
+                          for name, group in preprocessed_data.groupby(
+                              "app", observed=True, sort=False)]
+    max_axis = 0 if preprocessed_data.empty \
+        else int(preprocessed_data["pos"].max())
+    layout: dict = _layout(title,
+                           height,
+                           polar={"radialaxis":
+                                  {"tickvals": list(range(0, max_axis+1, 5))},
+                                  "angularaxis": _angular_axis()})
+    return FigureSpec({"data": traces, "layout": layout})
+
+
+def clock_bins_spec(binned_data: pd.DataFrame,
+                    title: str,
+                    height: int = None,
+                    **kwargs: typing.Any) -> FigureSpec:
+    """
+    Create a polar bar plot of the activities per time step with the weekdays
+    stacked.
+
+    Parameters
+    ----------
+    binned_data : pd.DataFrame
+        The dataframe containing the counts per weekday and time step.
+    title : str
+        The title of the plot.
+    height : int, optional
+        The height of the plot. The default is None.
+    **kwargs : typing.Any
+        Key word arguments.
+
+    Returns
+    -------
+    FigureSpec
+        The polar bar figure.
+
+    """
+    traces: list[dict] = [{"type": "barpolar",
+                           "r": group["count"].to_numpy(),
+                           "theta": group["timestep"].to_numpy(),
+                           "width": 2.5,
+                           "name": backend.WEEKDAYS[weekday],
+                           "marker": {"color":
+                                      backend.DISCRETE_COLOR_R[weekday]},
+                           "customdata": group.loc[:, ["time"]].to_numpy(),
+                           "hovertemplate": "<b>%{fullData.name}</b><br>"
+                                            "%{customdata[0]}<br>%{r}"
+                                            "<extra></extra>"}
+                          for weekday, group in binned_data.groupby("weekday")]
+    layout: dict = _layout(title,
+                           height,
+                           polar={"barmode": "stack",
+                                  "angularaxis": _angular_axis()})
+    return FigureSpec({"data": traces, "layout": layout})
+
+
+def sunburst_spec(aggregated_data: pd.DataFrame,
+                  title: str,
+                  height: int = None,
+                  **kwargs: typing.Any) -> FigureSpec:
+    """
+    Create a sunburst plot of the amount of activities per type and sport
+    type.
+
+    Parameters
+    ----------
+    aggregated_data : pd.DataFrame
+        The dataframe containing the type, the sport type and the counts.
+    title : str
+        The title of the plot.
+    height : int, optional
+        The height of the plot. The default is None.
+    **kwargs : typing.Any
+        Key word arguments.
+
+    Returns
+    -------
+    FigureSpec
+        The sunburst figure.
+
+    """
+    # the sport types inside their types, the same nodes as plotly express
+    leaves: pd.DataFrame = aggregated_data.groupby(["type", "sport_type"]
+                                                   )["counts"].sum() \
+        .reset_index()
+    parents: pd.Series = leaves.groupby("type")["counts"].sum()
+    trace: dict = {"type": "sunburst",
+                   "ids": np.concatenate([(leaves["type"] + "/" +
+                                           leaves["sport_type"]).to_numpy(),
+                                          parents.index.to_numpy()]),
+                   "labels": np.concatenate([leaves["sport_type"].to_numpy(),
+                                             parents.index.to_numpy()]),
+                   "parents": np.concatenate([leaves["type"].to_numpy(),
+                                              [""] * len(parents)]),
+                   "values": np.concatenate([leaves["counts"].to_numpy(),
+                                             parents.to_numpy()]),
+                   "branchvalues": "total",
+                   "hovertemplate": "<b>%{label}</b><br>%{value}",
+                   "name": ""}
+    layout: dict = _layout(title,
+                           height,
+                           sunburstcolorway=backend.DISCRETE_COLOR_R)
+    return FigureSpec({"data": [trace], "layout": layout})
+
+
+def worldmap_spec(data: pd.DataFrame,
+                  countries: pd.DataFrame,
+                  geojson: dict,
+                  title: str,
+                  height: int = None,
+                  **kwargs: typing.Any) -> FigureSpec:
+    """
+    Create the map of the countries colored by the amount of activities with
+    the routes and the start points.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        The dataframe containing the data for the plots.
+    countries: pd.DataFrame
+        The country and the (log of the) count of the activities.
+    geojson: dict
+        The GeoJSON feature collection of the countries.
+    title : str
+        The title of the plot.
+    height : int, optional
+        The height of the plot. The default is None.
+    **kwargs : typing.Any
+        Key word arguments.
+
+    Returns
+    -------
+    FigureSpec
+        The map figure.
+
+    """
+    colors: list[str] = backend.DISCRETE_COLOR
+    precision: int = kwargs.get("precision", backend.MAP_PRECISION)
+    # color the countries by (log of) the amount of activities
+    traces: list[dict] = [{"type": "choroplethmapbox",
+                           "geojson": geojson,
+                           "featureidkey": "properties.ADMIN",
+                           "locations": countries["country"].to_numpy(),
+                           "z": countries["count"].to_numpy(),
+                           "coloraxis": "coloraxis",
+                           "customdata":
+                               countries.loc[:, ["country"]].to_numpy(),
+                           "marker": {"opacity": .5},
+                           "name": "",
+                           "subplot": "mapbox"}]
+    # show the routes as a density image or as lines
+    mapbox: dict = {"style": "carto-darkmatter",
+                    "zoom": kwargs.get("zoom", 1),
+                    # center map on coordinates of activities
+                    "center": kwargs.get("center",
+                                         {"lat": data["lat"].mean(),
+                                          "lon": data["lon"].mean()}
+                                         if not data.empty
+                                         else {"lat": 0, "lon": 0})}
+    if "layers" in kwargs:
+        mapbox["layers"] = kwargs.get("layers")
+    else:
+        traces.append({"type": "scattermapbox",
+                       "below": "",  # put trace above all others
+                       "lat": kwargs.get("lat", []),
+                       "lon": kwargs.get("lon", []),
+                       "marker": {"size": 1,
+                                  "color": backend.COLOR_MAP.get("Strava"),
+                                  "symbol": "circle"},
+                       "mode": "lines",
+                       "customdata": kwargs.get("name", []),
+                       "name": "Strava"})
+    # add the start points, clustered per zoom level or one marker each
+    menus: list[dict] = []
+    if "clusters" in kwargs:
+        cluster_traces, menu = backend.plotly_charts._cluster_traces(
+            kwargs.get("clusters"),
+            mapbox["zoom"],
+            len(traces),
+            precision)
+        traces.extend(cluster_traces)
+        menus.extend([menu] if menu is not None else [])
+    else:
+        traces.append({"type": "scattermapbox",
+                       "below": "",  # put trace above all others
+                       "lat": data["lat"].to_numpy(),
+                       "lon": data["lon"].to_numpy(),
+                       "marker": {"size": 5,
+                                  "color": backend.COLOR_MAP.get("Strava"),
+                                  "symbol": "circle"},
+                       "mode": "markers",
+                       "customdata": data["name"].to_numpy(),
+                       "name": "Strava"})
+    for trace in traces:
+        trace["hovertemplate"] = "%{customdata}"
+        # the routes and the start points, the countries have no coordinates
+        for axis in ("lat", "lon"):
+            if axis in trace:
+                trace[axis] = _typed_array(trace[axis], precision)
+    layout: dict = _layout(
+        title,
+        height,
+        # the map keeps the default template like plotly express
+        template=_template(pio.templates.default),
+        mapbox=mapbox,
+        updatemenus=menus,
+        coloraxis={"colorscale": [[step / (len(colors) - 1), color]
+                                  for step, color in enumerate(colors)],
+                   "cmin": 0,
+                   "cmax": countries["count"].max()
+                   if not countries.empty else 1,
+                   "showscale": False}
+                            )
+    return FigureSpec({"data": traces, "layout": layout})
+
+
+def benchmark(dataframe: pd.DataFrame,
+              repeat: int = 5) -> pd.DataFrame:
+    """
+    Compare the time to build the figures with the graph objects and as
+    specs, including the conversion to JSON done by Streamlit.
+
+    Parameters
+    ----------
+    dataframe : pd.DataFrame
+        The activities to build the figures of.
+    repeat : int, optional
+        The amount of builds to take the fastest of. The default is 5.
+
+    Returns
+    -------
+    pd.DataFrame
+        The seconds per chart and way of building.
+
+    """
+    creation: str = dt.datetime.strftime(dataframe["date"].min(),
+                                         backend.DT_FORMAT)
+    charts: dict[str, tuple[typing.Callable, dict]] = {
+        "timeline": (backend.timeline, {"creation": creation}),
+        "days": (backend.days, {}),
+        "hours": (backend.hours, {}),
+        "types": (backend.types, {}),
+        "locations": (backend.locations, {})}
+    timings: dict[tuple[str, str], float] = {}
+    for name, (func, kwargs) in charts.items():
+        for spec in (False, True):
+            durations: list[float] = []
+            for _ in range(repeat):
+                start: float = time.perf_counter()
+                figure = func(dataframe,
+                              plot_height=backend.TOP_ROW_HEIGHT,
+                              spec=spec,
+                              **kwargs)
+                pio.to_json(figure.to_dict(), validate=False)
+                durations.append(time.perf_counter() - start)
+            timings[(name, "spec" if spec else "figure")] = min(durations)
+    return pd.Series(timings).unstack()
+
+
+if __name__ == "__main__":
+    demo: pd.DataFrame = backend.load_demo_data().loc[:, backend.STRAVA_COLS]
+    print(benchmark(demo))
+    # the same activities repeated, to see how both ways scale
+    print(benchmark(pd.concat([demo] * 100, ignore_index=True)))
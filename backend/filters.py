@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+@author: QtyPython2020
+
+Filter the activities by a range of dates and by their values of some columns.
+
+The positions of the activities are sorted by date once per dataset, so a
+range of dates is a slice found by binary search. Per value of the filtered
+columns the positions of its activities are kept, so choosing values is a
+union of these positions. Each filter takes time in proportion to the
+activities it keeps instead of to the whole history.
+"""
+# Third party
+import numpy as np
+import pandas as pd
+# Local imports
+import backend
+
+
+class FilterIndex:
+    """
+    The positions of the activities sorted by date and per value of the
+    filtered columns.
+    """
+
+    def __init__(self,
+                 data: pd.DataFrame,
+                 columns: list[str] = backend.FILTER_COLS) -> None:
+        """
+        Parameters
+        ----------
+        data : pd.DataFrame
+            The dataframe containing the parsed activities.
+        columns : list[str], optional
+            The columns to filter by their values. The default is
+            FILTER_COLS.
+
+        Returns
+        -------
+        None.
+
+        """
+        dates: np.ndarray = data["date"].to_numpy(dtype="datetime64[ns]")
+        self._order: np.ndarray = np.argsort(dates, kind="stable")
+        self._dates: np.ndarray = dates[self._order]
+        # the sorted positions per value, without the empty values
+        self._positions: dict[str, dict[str, np.ndarray]] = {
+            column: {str(value): positions for value, positions
+                     in pd.Series(data[column].to_numpy())
+                     .groupby(data[column].to_numpy(), sort=True)
+                     .indices.items()}
+            for column in columns}
+
+    def values(self, column: str) -> list[str]:
+        """
+        Parameters
+        ----------
+        column : str
+            A filtered column.
+
+        Returns
+        -------
+        list[str]
+            The values of the column in the dataset.
+
+        """
+        return sorted(self._positions[column])
+
+    def years(self) -> tuple[int, int] | None:
+        """
+        Returns
+        -------
+        tuple[int, int] | None
+            The first and the last year of the dataset or None if it is
+            empty.
+
+        """
+        valid: np.ndarray = self._dates[~np.isnat(self._dates)]
+        if not valid.size:
+            return None
+        return (pd.Timestamp(valid[0]).year, pd.Timestamp(valid[-1]).year)
+
+    def positions(self,
+                  start: pd.Timestamp = None,
+                  end: pd.Timestamp = None,
+                  **values: list[str]) -> np.ndarray | None:
+        """
+        Parameters
+        ----------
+        start : pd.Timestamp, optional
+            The first date to keep. The default is None.
+        end : pd.Timestamp, optional
+            The first date after the dates to keep. The default is None.
+        **values : list[str]
+            The values to keep per filtered column, all values are kept for
+            an empty list.
+
+        Returns
+        -------
+        np.ndarray | None
+            The sorted positions of the activities passing all filters, or
+            None without any filter.
+
+        """
+        kept: list[np.ndarray] = []
+        if start is not None or end is not None:
+            first: int = 0 if start is None else int(np.searchsorted(
+                self._dates, np.datetime64(start, "ns"), side="left"))
+            last: int = len(self._dates) if end is None else int(
+                np.searchsorted(self._dates, np.datetime64(end, "ns"),
+                                side="left"))
+            kept.append(np.sort(self._order[first:last]))
+        for column, chosen in values.items():
+            if not chosen:
+                continue
+            postings: dict[str, np.ndarray] = self._positions[column]
+            # the activities of different values do not overlap
+            kept.append(np.sort(np.concatenate(
+                [postings.get(value, np.empty(0, dtype=np.intp))
+                 for value in chosen])))
+        if not kept:
+            return None
+        # intersect the smallest filters first
+        kept.sort(key=len)
+        positions: np.ndarray = kept[0]
+        for other in kept[1:]:
+            positions = np.intersect1d(positions, other, assume_unique=True)
+        return positions
+
+    def view(self,
+             data: pd.DataFrame,
+             years: tuple[int, int] = None,
+             **values: list[str]) -> pd.DataFrame:
+        """
+        Parameters
+        ----------
+        data : pd.DataFrame
+            The dataset of the index or a dataframe with the same rows.
+        years : tuple[int, int], optional
+            The first and the last year to keep. The default is None.
+        **values : list[str]
+            The values to keep per filtered column.
+
+        Returns
+        -------
+        pd.DataFrame
+            The activities passing the filters, or the dataframe itself
+            without any filter, which all figures accept.
+
+        """
+        start = end = None
+        if years is not None and years != self.years():
+            start = pd.Timestamp(year=years[0], month=1, day=1)
+            end = pd.Timestamp(year=years[1] + 1, month=1, day=1)
+        positions: np.ndarray | None = self.positions(start, end, **values)
+        if positions is None:
+            return data
+        return data.iloc[positions]
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+"""
+@author: QtyPython2020
+
+The metrics of the whole process, across the sessions, in the text format of
+Prometheus.
+
+The backend updates the counters, gauges and histograms of METRICS from any
+thread. The stages of the reruns are observed as well, so the latencies of the
+figures and the throughput of the parsing follow from the stage metrics. After
+each rerun the app writes the metrics to PATH_METRICS, which can be collected
+with the textfile collector of the node exporter.
+"""
+# Standard library
+import math
+import os
+import tempfile
+import threading
+# Local imports
+import backend
+
+
+# the type and the help text of each metric, without the prefix
+DESCRIPTIONS: dict[str, tuple[str, str]] = {
+    "reruns_total": ("counter", "Reruns of the app script."),
+    "stage_seconds": ("histogram", "Wall seconds of the stages of a rerun."),
+    "stage_rows_total": ("counter", "Rows handled by the stages of a rerun."),
+    "http_requests_total": ("counter", "HTTP requests by host and status."),
+    "http_request_seconds": ("histogram", "Seconds of the HTTP requests."),
+    "strava_pages_total": ("counter", "Pages of activities retrieved."),
+    "threads_active": ("gauge", "Workers running a task per executor."),
+    "executor_workers": ("gauge", "Worker threads per executor."),
+    "executor_waiting": ("gauge", "Tasks waiting per executor."),
+    "executor_wait_seconds": ("histogram",
+                              "Seconds the tasks waited for a worker."),
+    "executor_busy_seconds_total": ("counter",
+                                    "Seconds the workers ran tasks."),
+    "executor_rejected_total": ("counter",
+                                "Jobs queued as the executor was full."),
+    "cache_requests_total": ("counter", "Requests to a cache."),
+    "cache_misses_total": ("counter", "Requests missing a cache."),
+    "store_bytes": ("gauge",
+                    "Bytes of the datasets and derived structures in memory."),
+    "store_spilled_bytes": ("gauge", "Bytes of the spilled datasets on disk."),
+    "figure_seconds": ("histogram",
+                       "Wall seconds to build a figure per planned level."),
+    "figure_estimated_seconds": ("histogram",
+                                 "Planned seconds of a figure per level."),
+    "figure_estimated_bytes": ("gauge",
+                               "Planned bytes of the last figure per level.")
+    }
+
+
+def _labels(labels: dict[str, str]) -> str:
+    """
+    Parameters
+    ----------
+    labels : dict[str, str]
+        The labels of a series.
+
+    Returns
+    -------
+    str
+        The labels in braces, with the backslashes, quotes and newlines of the
+        values escaped.
+
+    """
+    if not labels:
+        return ""
+    pairs: list[str] = [
+        f'{key}="' + str(value).replace("\\", "\\\\")
+        .replace('"', '\\"').replace("\n", "\\n") + '"'
+        for key, value in labels.items()]
+    return "{" + ",".join(pairs) + "}"
+
+
+def _number(value: float) -> str:
+    """
+    Parameters
+    ----------
+    value : float
+        A sample or a bucket bound.
+
+    Returns
+    -------
+    str
+        The value as Prometheus writes it.
+
+    """
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metrics:
+    """
+    A registry of counters, gauges and histograms, updated from any thread.
+    """
+
+    def __init__(self,
+                 prefix: str = "activity_mapper_",
+                 buckets: tuple[float, ...] = backend.METRICS_BUCKETS,
+                 descriptions: dict[str, tuple[str, str]] = DESCRIPTIONS
+                 ) -> None:
+        """
+        Parameters
+        ----------
+        prefix : str, optional
+            The prefix of the metric names. The default is "activity_mapper_".
+        buckets : tuple[float, ...], optional
+            The upper bounds of the buckets of the histograms. The default is
+            METRICS_BUCKETS.
+        descriptions : dict[str, tuple[str, str]], optional
+            The type and the help text per metric. The default is
+            DESCRIPTIONS.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.prefix: str = prefix
+        self.buckets: tuple[float, ...] = tuple(sorted(buckets)) + (math.inf,)
+        self.descriptions: dict[str, tuple[str, str]] = descriptions
+        # the values of the counters and gauges and the bucket counts, the sum
+        # and the count of the histograms, per metric and labels
+        self._values: dict[str, dict[tuple, float]] = {}
+        self._histograms: dict[str, dict[tuple, list[float]]] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def inc(self,
+            name: str,
+            value: float = 1,
+            **labels: str) -> None:
+        """
+        Increase a counter, or a gauge which is decreased with a negative
+        value.
+
+        Parameters
+        ----------
+        name : str
+            The name of the metric.
+        value : float, optional
+            The increase. The default is 1.
+        **labels : str
+            The labels of the series.
+
+        Returns
+        -------
+        None.
+
+        """
+        key: tuple = tuple(labels.items())
+        with self._lock:
+            series: dict = self._values.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self,
+            name: str,
+            value: float,
+            **labels: str) -> None:
+        """
+        Parameters
+        ----------
+        name : str
+            The name of the gauge.
+        value : float
+            The current value.
+        **labels : str
+            The labels of the series.
+
+        Returns
+        -------
+        None.
+
+        """
+        with self._lock:
+            self._values.setdefault(name, {})[tuple(labels.items())] = value
+
+    def observe(self,
+                name: str,
+                value: float,
+                **labels: str) -> None:
+        """
+        Parameters
+        ----------
+        name : str
+            The name of the histogram.
+        value : float
+            The observed value.
+        **labels : str
+            The labels of the series.
+
+        Returns
+        -------
+        None.
+
+        """
+        key: tuple = tuple(labels.items())
+        with self._lock:
+            series: dict = self._histograms.setdefault(name, {})
+            counts: list[float] = series.setdefault(
+                key, [0] * (len(self.buckets) + 2))
+            # the first bucket the value fits in, the buckets are made
+            # cumulative when exposed
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            counts[-2] += value
+            counts[-1] += 1
+
+    def exposition(self) -> str:
+        """
+        Returns
+        -------
+        str
+            The metrics in the text format of Prometheus.
+
+        """
+        with self._lock:
+            values: dict = {name: dict(series)
+                            for name, series in self._values.items()}
+            histograms: dict = {name: {key: list(counts)
+                                       for key, counts in series.items()}
+                                for name, series in self._histograms.items()}
+        lines: list[str] = []
+        for name in sorted(values.keys() | histograms.keys()):
+            kind, text = self.descriptions.get(name, ("untyped", ""))
+            full_name: str = self.prefix + name
+            lines.append(f"# HELP {full_name} {text}")
+            lines.append(f"# TYPE {full_name} {kind}")
+            for key, value in values.get(name, {}).items():
+                lines.append(f"{full_name}{_labels(dict(key))} "
+                             f"{_number(value)}")
+            for key, counts in histograms.get(name, {}).items():
+                cumulative: float = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    bucket: dict = {**dict(key), "le": _number(bound)}
+                    lines.append(f"{full_name}_bucket{_labels(bucket)} "
+                                 f"{_number(cumulative)}")
+                lines.append(f"{full_name}_sum{_labels(dict(key))} "
+                             f"{_number(counts[-2])}")
+                lines.append(f"{full_name}_count{_labels(dict(key))} "
+                             f"{_number(counts[-1])}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """
+        Replace the file with the current metrics at once, so a collector
+        never reads a partly written file.
+
+        Parameters
+        ----------
+        path : str
+            The filepath of the metrics.
+
+        Returns
+        -------
+        None.
+
+        """
+        directory: str = os.path.dirname(os.path.abspath(path))
+        descriptor, temporary = tempfile.mkstemp(dir=directory,
+                                                 suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "w", encoding="utf-8") as file:
+                file.write(self.exposition())
+            os.replace(temporary, path)
+        except OSError:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+
+# the registry of the process, shared by all sessions
+METRICS: Metrics = Metrics()
+
+
+if __name__ == "__main__":
+    pass
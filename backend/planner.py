@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+@author: QtyPython2020
+
+Plan the level of detail of each figure so a rerun stays within a budget of
+seconds to build the figures and bytes to send them to the browser.
+
+The cost of each level is estimated from the statistics of the dataset the
+figure scales with, using costs per unit measured on synthetic datasets. The
+planner starts with every figure at its most detailed level and lowers the
+level of the most expensive figure until the estimates fit the budget.
+
+levels per figure:
+    timeline: raw -> aggregated
+    days: raw
+    locations: raw -> simplified -> aggregated
+    types: raw
+    hours: raw -> aggregated
+
+"""
+# Standard library
+import math
+import typing
+# Third party
+import numpy as np
+import pandas as pd
+# Local imports
+import backend
+
+
+class Cost(typing.NamedTuple):
+    """
+    The seconds to build a figure and the bytes of its JSON, as a fixed part
+    and a part per unit of a statistic of the dataset.
+    """
+    unit: str
+    seconds: float
+    seconds_per_unit: float
+    size: float
+    size_per_unit: float
+
+
+# measured with the figures built as specs, including the conversion to JSON
+COSTS: dict[str, dict[str, Cost]] = {
+    "timeline": {"raw": Cost("activities", .01, 25e-6, 8e3, 65),
+                 "aggregated": Cost("activities", .01, 25e-6, 1e4, 1)},
+    "days": {"raw": Cost("activities", .005, 1e-7, 8e3, 0)},
+    "locations": {"raw": Cost("vertices", .01, .9e-6, 4e4, 25),
+                  "simplified": Cost("vertices", .01, .9e-6, 4e4, 25),
+                  "aggregated": Cost("vertices", .04, .35e-6, 1.6e5, 0)},
+    "types": {"raw": Cost("activities", .005, .6e-6, 8e3, 0)},
+    "hours": {"raw": Cost("activities", .01, 12e-6, 8e3, 50),
+              "aggregated": Cost("activities", .01, 0, 2.8e4, 0)}
+    }
+# the average size of the feature of a country in the GeoJSON file
+COUNTRY_SIZE: int = 90_000
+
+
+def dataset_stats(data: pd.DataFrame,
+                  routes: pd.Series = None) -> dict[str, int]:
+    """
+    Count what the costs of the figures scale with.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        The dataframe containing the parsed activities.
+    routes : pd.Series, optional
+        The groups of the repeated routes if they are drawn once. The default
+        is None.
+
+    Returns
+    -------
+    dict[str, int]
+        The amount of activities, of points on the map and of countries.
+
+    """
+    lengths: np.ndarray = np.fromiter(
+        (len(route) if isinstance(route, (list, tuple, np.ndarray)) else 0
+         for route in data["coords"]),
+        dtype=np.int64,
+        count=data.shape[0])
+    # only the first activity of a group of repeated routes is drawn
+    if routes is not None:
+        lengths = lengths[(routes.reindex(data.index) == data.index)
+                          .to_numpy()]
+    return {"activities": data.shape[0],
+            # the routes and their start points
+            "vertices": int(lengths.sum()) + len(lengths),
+            "countries": data["country"].nunique()}
+
+
+def estimate(chart: str,
+             level: str,
+             stats: dict[str, int],
+             step: int = 1) -> tuple[float, float]:
+    """
+    Parameters
+    ----------
+    chart : str
+        The name of the figure.
+    level : str
+        The level of detail.
+    stats : dict[str, int]
+        The statistics of the dataset.
+    step : int, optional
+        The step between the points kept of the simplified routes. The
+        default is 1.
+
+    Returns
+    -------
+    seconds : float
+        The estimated time to build the figure.
+    size : float
+        The estimated amount of bytes of the figure.
+
+    """
+    cost: Cost = COSTS[chart][level]
+    units: int = stats[cost.unit]
+    seconds: float = cost.seconds + cost.seconds_per_unit * units
+    # only the points kept of the simplified routes are sent
+    size: float = cost.size + cost.size_per_unit * units / \
+        (step if level == "simplified" else 1)
+    # the map sends the shapes of the countries with activities
+    if chart == "locations":
+        size += COUNTRY_SIZE * stats["countries"]
+    return seconds, size
+
+
+def allowed(chart: str,
+            level: str,
+            stats: dict[str, int]) -> bool:
+    """
+    Parameters
+    ----------
+    chart : str
+        The name of the figure.
+    level : str
+        The level of detail.
+    stats : dict[str, int]
+        The statistics of the dataset.
+
+    Returns
+    -------
+    bool
+        Whether the figure function keeps the level, as the clock bins more
+        than CLOCK_MAX_POINTS activities and the timeline aggregates markers
+        larger than TIMELINE_MAX_BYTES.
+
+    """
+    if level != "raw":
+        return True
+    if chart == "hours":
+        return stats["activities"] <= backend.CLOCK_MAX_POINTS
+    if chart == "timeline":
+        return COSTS[chart][level].size_per_unit * stats["activities"] <= \
+            backend.TIMELINE_MAX_BYTES
+    return True
+
+
+def plan_figures(stats: dict[str, int],
+                 seconds: float = backend.RENDER_SECONDS,
+                 size: int = backend.RENDER_BYTES,
+                 fixed: dict[str, str] = None) -> dict[str, dict]:
+    """
+    Choose the level of detail of each figure within the budget.
+
+    Parameters
+    ----------
+    stats : dict[str, int]
+        The statistics of the dataset.
+    seconds : float, optional
+        The time to build all figures. The default is RENDER_SECONDS.
+    size : int, optional
+        The bytes of all figures. The default is RENDER_BYTES.
+    fixed : dict[str, str], optional
+        The levels chosen by the user per figure. The default is None.
+
+    Returns
+    -------
+    plan : dict[str, dict]
+        The level, the key word arguments of the figure function and the
+        estimated seconds and bytes per figure.
+
+    """
+    fixed = fixed or {}
+    # the most detailed level the figure functions keep
+    levels: dict[str, str] = {chart: fixed.get(chart, next(
+        level for level in costs if allowed(chart, level, stats)))
+                              for chart, costs in COSTS.items()}
+    step: int = 1
+    while True:
+        estimates: dict[str, tuple[float, float]] = {
+            chart: estimate(chart, level, stats, step)
+            for chart, level in levels.items()}
+        total_seconds: float = sum(item[0] for item in estimates.values())
+        total_size: float = sum(item[1] for item in estimates.values())
+        if total_seconds <= seconds and total_size <= size:
+            break
+        # lower the figure taking the largest share of the budget
+        lower: list[str] = [chart for chart, level in levels.items()
+                            if chart not in fixed and
+                            level != list(COSTS[chart])[-1]]
+        if not lower:
+            break
+        chart: str = max(lower,
+                         key=lambda chart: estimates[chart][0] / seconds +
+                         estimates[chart][1] / size)
+        levels[chart] = list(COSTS[chart])[list(COSTS[chart])
+                                           .index(levels[chart]) + 1]
+        if levels[chart] == "simplified":
+            # keep every so many points of the routes to fit what is left of
+            # the budget, or draw a heatmap if the routes would lose too much
+            map_seconds, map_size = estimate(chart, "raw", stats)
+            spare_seconds: float = seconds - total_seconds + map_seconds
+            spare_size: float = size - total_size + map_size - \
+                COUNTRY_SIZE * stats["countries"] - COSTS[chart]["raw"].size
+            step = math.ceil(COSTS[chart]["raw"].size_per_unit *
+                             stats["vertices"] / max(spare_size, 1))
+            if step > backend.SIMPLIFY_MAX_STEP or \
+                    map_seconds > spare_seconds:
+                levels[chart] = "aggregated"
+    options: dict[str, dict[str, dict]] = {
+        "timeline": {"raw": {},
+                     "aggregated": {"max_bytes": 0}},
+        "days": {"raw": {}},
+        "locations": {"raw": {},
+                      "simplified": {"step": step},
+                      "aggregated": {"heatmap": True}},
+        "types": {"raw": {}},
+        "hours": {"raw": {},
+                  "aggregated": {"max_points": 0}}
+        }
+    plan: dict[str, dict] = {chart: {"level": level,
+                                     "options": options[chart][level],
+                                     "seconds": estimates[chart][0],
+                                     "bytes": estimates[chart][1]}
+                             for chart, level in levels.items()}
+    return plan
+
+
+if __name__ == "__main__":
+    pass
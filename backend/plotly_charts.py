@@ -7,22 +7,32 @@ All the plotly graph functions with the preprocessing and helper functions.
 helper functions:
     _add_annotation
     _add_annotation_color
+    _add_clusters
+    _builder
+    _cluster_traces
+    _format_hover
+    _json_size
     _update_layout
     empty_figure
 
 preprocessing and graph functions:
-    timeline -> timeline_figure
+    timeline -> aggregate_weeks -> timeline_figure
     days -> weekdays_figure
     hours -> clock_figure
+    hours -> bin_clock -> clock_bins_figure
     types -> sunburst_figure
     locations -> process_data -> worldmap_figure
 
+The preprocessing functions take spec=True to build the figures as plain specs
+with the functions of figure_specs instead.
+
 """
 # Standard library
 import datetime as dt
 import math
 import typing
 # Third party
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
@@ -94,6 +104,161 @@ def _add_annotation_color(fig: go.Figure,
     return fig
 
 
+def _builder(figure: typing.Callable,
+             spec: bool) -> typing.Callable:
+    """
+    Pick the function building a figure as a graph object or as a plain spec.
+
+    Parameters
+    ----------
+    figure : typing.Callable
+        The graph function of the figure.
+    spec : bool
+        Whether to use the spec function of the same figure instead.
+
+    Returns
+    -------
+    typing.Callable
+        The graph function or the spec function, named after the figure.
+
+    """
+    if not spec:
+        return figure
+    return getattr(backend, figure.__name__.replace("_figure", "_spec"))
+
+
+def _cluster_traces(clusters: dict[str, pd.DataFrame],
+                    zoom: float,
+                    traces: int,
+                    precision: int = backend.MAP_PRECISION
+                    ) -> tuple[list[dict], dict | None]:
+    """
+    Create the clustered start points as one trace per zoom level, with
+    buttons to switch between the levels.
+
+    Parameters
+    ----------
+    clusters : dict[str, pd.DataFrame]
+        The clusters per name of the zoom level.
+    zoom : float
+        The initial zoom level of the map.
+    traces : int
+        The amount of traces of the figure before the clusters.
+    precision : int, optional
+        The decimals of the coordinates. The default is MAP_PRECISION.
+
+    Returns
+    -------
+    cluster_traces : list[dict]
+        The scattermapbox traces.
+    menu : dict | None
+        The menu with the buttons or None if there are no clusters.
+
+    """
+    if not any(len(table) for table in clusters.values()):
+        return [], None
+    zooms: dict[str, int] = backend.CLUSTER_ZOOMS
+    # show the most detailed level that fits the initial zoom of the map
+    shown: str = max((level for level in clusters
+                      if zooms.get(level, 0) <= zoom),
+                     key=zooms.get,
+                     default=next(iter(clusters)))
+    cluster_traces: list[dict] = [
+        {"type": "scattermapbox",
+         "below": "",  # put trace above all others
+         "lat": np.round(table["lat"].to_numpy(), precision),
+         "lon": np.round(table["lon"].to_numpy(), precision),
+         # scale the area of the marker with the count
+         "marker": {"size": (5 + 20 * np.sqrt(table["count"] /
+                                              table["count"].max())
+                             ).to_numpy(),
+                    "color": backend.COLOR_MAP.get("Strava"),
+                    "symbol": "circle",
+                    },
+         "mode": "markers",
+         "customdata": table["text"].to_numpy(),
+         "name": "Strava",
+         "visible": level == shown
+         } for level, table in clusters.items()]
+    buttons: list[dict] = [{"label": level,
+                            "method": "update",
+                            "args": [{"visible": [True] * traces +
+                                      [other == level for other in clusters]},
+                                     {"mapbox.zoom": zooms.get(level)}]
+                            } for level in clusters]
+    menu: dict = {"type": "buttons",
+                  "direction": "right",
+                  "buttons": buttons,
+                  "active": list(clusters).index(shown),
+                  "x": 0,
+                  "y": 1,
+                  "xanchor": "left",
+                  "yanchor": "top"}
+    return cluster_traces, menu
+
+
+def _add_clusters(fig: go.Figure,
+                  clusters: dict[str, pd.DataFrame],
+                  zoom: float,
+                  precision: int = backend.MAP_PRECISION) -> go.Figure:
+    """
+    Add the clustered start points as one trace per zoom level, with buttons
+    to switch between the levels.
+
+    Parameters
+    ----------
+    fig : go.Figure
+        The plotly mapbox figure.
+    clusters : dict[str, pd.DataFrame]
+        The clusters per name of the zoom level.
+    zoom : float
+        The initial zoom level of the map.
+    precision : int, optional
+        The decimals of the coordinates. The default is MAP_PRECISION.
+
+    Returns
+    -------
+    fig : go.Figure
+        The plotly figure with the clusters.
+
+    """
+    cluster_traces, menu = _cluster_traces(clusters,
+                                           zoom,
+                                           len(fig.data),
+                                           precision)
+    if menu is None:
+        return fig
+    fig.add_traces(cluster_traces)
+    fig.update_layout(updatemenus=[menu])
+    return fig
+
+
+def _json_size(data: pd.DataFrame,
+               sample: int = 256) -> int:
+    """
+    Measure the size of the data of a trace encoded as JSON, extrapolated
+    from the first rows.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        The columns of the trace.
+    sample : int, optional
+        The amount of rows to encode. The default is 256.
+
+    Returns
+    -------
+    int
+        The estimated amount of bytes.
+
+    """
+    if data.empty:
+        return 0
+    head: pd.DataFrame = data.head(sample)
+    return int(len(head.to_json(orient="values", date_format="iso")) /
+               head.shape[0] * data.shape[0])
+
+
 def _update_layout(fig: go.Figure,
                    **kwargs: typing.Any) -> go.Figure:
     """
@@ -129,6 +294,33 @@ def _update_layout(fig: go.Figure,
     return fig
 
 
+def _format_hover(column: pd.Series,
+                  fmt: str) -> pd.Series:
+    """
+    Format a native date or duration column to text for use in the hover
+    labels, as these dtypes are not serialized in a readable way.
+
+    Parameters
+    ----------
+    column : pd.Series
+        The column with datetimes or durations since midnight.
+    fmt : str
+        The strftime format of the text.
+
+    Returns
+    -------
+    column : pd.Series
+        The formatted column or the original column for other dtypes.
+
+    """
+    # a duration since midnight is formatted as the time of day
+    if pd.api.types.is_timedelta64_dtype(column):
+        column = pd.Timestamp(0) + column
+    if pd.api.types.is_datetime64_any_dtype(column):
+        column = column.dt.strftime(fmt)
+    return column
+
+
 def give_position(group):
     """
 
@@ -226,13 +418,14 @@ def timeline(original: pd.DataFrame,
     """
     # show empty figure if no data is provided
     plot_title = "Timeline"
+    spec: bool = kwargs.pop("spec", False)
     if original.empty:
-        return empty_figure(plot_title,
-                            plot_height)
+        return _builder(empty_figure, spec)(plot_title,
+                                            plot_height)
     # prepare data
     summarize_name = "Times per week"
     name = "calender-week"
-    data = original.groupby(["app", "year", "week"])["id"]\
+    data = original.groupby(["app", "year", "week"], observed=True)["id"]\
         .count().reset_index().rename({"id": summarize_name},
                                       axis=1)
     data[name] = first_day_of_week(data)
@@ -240,25 +433,63 @@ def timeline(original: pd.DataFrame,
     dataframe = original.groupby(["year", "week"])[["date", "time", "name"]]\
         .apply(give_position).reset_index()
     dataframe["cw"] = first_day_of_week(dataframe)
+    dataframe["date"] = _format_hover(dataframe["date"], "%Y-%m-%d")
+    # show one marker per week instead of per activity if the markers would
+    # become too large to draw and hover quickly
+    max_bytes: int = kwargs.pop("max_bytes", backend.TIMELINE_MAX_BYTES)
+    if _json_size(dataframe.loc[:, ["name", "date", "cw", "pos"]]) > \
+            max_bytes:
+        dataframe = aggregate_weeks(dataframe)
 
     # make creation_
     creation_date: dt.date = dt.datetime.strptime(kwargs.get("creation"),
                                                   backend.DT_FORMAT).date()
     # create figure
-    time_line = timeline_figure(aggregated_data=data,
-                                data=dataframe,
-                                title=plot_title,
-                                height=plot_height,
-                                x=name,
-                                y=summarize_name,
-                                group="app",
-                                creation_date=creation_date,
-                                scatter_x="cw",
-                                scatter_y="pos",
-                                **kwargs)
+    time_line = _builder(timeline_figure, spec)(aggregated_data=data,
+                                                data=dataframe,
+                                                title=plot_title,
+                                                height=plot_height,
+                                                x=name,
+                                                y=summarize_name,
+                                                group="app",
+                                                creation_date=creation_date,
+                                                scatter_x="cw",
+                                                scatter_y="pos",
+                                                **kwargs)
     return time_line
 
 
+def aggregate_weeks(dataframe: pd.DataFrame,
+                    names: int = 3) -> pd.DataFrame:
+    """
+    Combine the markers of the activities of a week into one marker on top of
+    the stack of the week.
+
+    Parameters
+    ----------
+    dataframe : pd.DataFrame
+        The activities with their position in the stack of their week.
+    names : int, optional
+        The amount of names of activities in the hover. The default is 3.
+
+    Returns
+    -------
+    weeks : pd.DataFrame
+        One row per week with the same columns for the overlay.
+
+    """
+    weeks: pd.DataFrame = dataframe.groupby("cw").agg(
+        pos=("pos", "max"),
+        count=("name", "size"),
+        first=("date", "min"),
+        names=("name", lambda column: "<br>".join(column.astype(str)
+                                                  .head(names)))
+                                                      ).reset_index()
+    weeks["name"] = weeks["count"].astype(str) + " activities"
+    weeks["date"] = "week of " + weeks["first"] + "<br>" + weeks["names"]
+    return weeks.loc[:, ["cw", "pos", "name", "date"]]
+
+
 def timeline_figure(aggregated_data: pd.DataFrame,
                     data: pd.DataFrame,
                     title: str,
@@ -311,19 +542,20 @@ def timeline_figure(aggregated_data: pd.DataFrame,
                      **kwargs.get("area", {})
                      )
     figure.update_traces(hovertemplate="Activity on %{customdata[0]}")
-    figure.add_scatter(customdata=data.loc[:, ["name", "date"]].values,
-                       hovertemplate="""
-                       <b>%{customdata[0]}</b><br>%{customdata[1]}
-                       """,
-                       marker={"size": 3},
-                       mode="markers",  # select drawing mode
-                       name="",  # set trace name to empty
-                       opacity=1,  # make points non-transparant
-                       # position the dots by week
-                       x=data[kwargs.get("scatter_x")],
-                       y=data[kwargs.get("scatter_y")],
-                       **kwargs.get("scatter", {})
-                       )
+    # draw the markers with WebGL as there can be thousands of them
+    figure.add_scattergl(customdata=data.loc[:, ["name", "date"]].values,
+                         hovertemplate="""
+                         <b>%{customdata[0]}</b><br>%{customdata[1]}
+                         """,
+                         marker={"size": 3},
+                         mode="markers",  # select drawing mode
+                         name="",  # set trace name to empty
+                         opacity=1,  # make points non-transparant
+                         # position the dots by week
+                         x=data[kwargs.get("scatter_x")],
+                         y=data[kwargs.get("scatter_y")],
+                         **kwargs.get("scatter", {})
+                         )
     figure.add_vline((creation_date := kwargs.get("creation_date")),
                      line_width=1,
                      line_color=backend.COLOR_MAP.get("Strava"))
@@ -370,14 +602,16 @@ def days(original: pd.DataFrame,
     """
 
     plot_title = "Weekdays"
+    spec: bool = kwargs.pop("spec", False)
     # prepare data
-    data = original.groupby(["app", "weekday"])["id"].count().reset_index()
+    data = original.groupby(["app", "weekday"],
+                            observed=True)["id"].count().reset_index()
     data["percentage"] = data["id"] / original.shape[0]
     # create figure
-    weekdays = weekdays_figure(data,
-                               title=plot_title,
-                               height=plot_height,
-                               **kwargs)
+    weekdays = _builder(weekdays_figure, spec)(data,
+                                               title=plot_title,
+                                               height=plot_height,
+                                               **kwargs)
     # show empty figure if no data is provided
     if original.empty:
         weekdays = _add_annotation(weekdays)
@@ -408,13 +642,7 @@ def weekdays_figure(aggregated_data: pd.DataFrame,
         The plotly bar figure.
 
     """
-    hover_data = [day for num, day in enumerate(["Monday",
-                                                 "Tuesday",
-                                                 "Wednesday",
-                                                 "Thursday",
-                                                 "Friday",
-                                                 "Saturday",
-                                                 "Sunday"])
+    hover_data = [day for num, day in enumerate(backend.WEEKDAYS)
                   if num in aggregated_data.weekday]
     figure = px.bar(data_frame=aggregated_data,
                     x="weekday",
@@ -470,30 +698,34 @@ def hours(original: pd.DataFrame,
 
     """
     plot_title = "Hours"
+    spec: bool = kwargs.pop("spec", False)
+    # draw a histogram instead of a marker per activity for many activities,
+    # so the size of the figure stops growing
+    max_points: int = kwargs.pop("max_points", backend.CLOCK_MAX_POINTS)
+    if original.shape[0] > max_points:
+        return _builder(clock_bins_figure, spec)(bin_clock(original),
+                                                 title=plot_title,
+                                                 height=plot_height,
+                                                 **kwargs)
     # prepare data
-    original["timestep"] = original["hour"]*60 + original["minutes"]//10
+    original = original.copy()
+    original["time"] = _format_hover(original["time"], "%H:%M:%S")
+    # cast the small integers to prevent an overflow
+    original["timestep"] = original["hour"].astype(int)*60 + \
+        original["minutes"].astype(int)//10
     original["timestep"] = original["timestep"].apply(backend.min2ang)
     # original = original.groupby(["app", "timestep"])[["date", "time", "name"]].apply(give_position).reset_index()
     # print(f"{original.columns=}")
     original.sort_values(by="timestep",
                           ascending=True,
                           inplace=True)
-    original["pos"] = 1
-    last = None
-    count = None
-    for index, row in original.loc[:].iterrows():
-        step = row["timestep"]
-        if step != last:
-            last = step
-            count = 1
-            continue
-        count += 1
-        original.loc[index, "pos"] = count
+    # stack the activities at the same time step
+    original["pos"] = original.groupby("timestep").cumcount() + 1
     # create figure
-    clock = clock_figure(original,
-                         title=plot_title,
-                         height=plot_height,
-                         **kwargs)
+    clock = _builder(clock_figure, spec)(original,
+                                         title=plot_title,
+                                         height=plot_height,
+                                         **kwargs)
     # show empty figure if no data is provided
     if original.empty:
         clock = _add_annotation(clock)
@@ -557,6 +789,95 @@ def clock_figure(preprocessed_data: pd.DataFrame,
     return figure
 
 
+def bin_clock(original: pd.DataFrame) -> pd.DataFrame:
+    """
+    Count the activities per weekday and time step of 10 minutes.
+
+    Parameters
+    ----------
+    original : pd.DataFrame
+        The entire dataframe.
+
+    Returns
+    -------
+    binned : pd.DataFrame
+        The weekday, the angle and the start time of the time step and the
+        amount of activities of the non-empty bins.
+
+    """
+    steps: np.ndarray = original["hour"].to_numpy(dtype=np.int64) * 6 + \
+        original["minutes"].to_numpy(dtype=np.int64) // 10
+    counts: np.ndarray = np.bincount(
+        original["weekday"].to_numpy(dtype=np.int64) * 144 + steps,
+        minlength=7 * 144
+                                     ).reshape(7, 144)
+    weekday, step = np.nonzero(counts)
+    binned: pd.DataFrame = pd.DataFrame({
+        "weekday": weekday,
+        # the same angle as min2ang of the hour and the tens of minutes
+        "timestep": step * 2.5,
+        "time": [f"{hour:02d}:{minutes:02d}"
+                 for hour, minutes in zip(step // 6, step % 6 * 10)],
+        "count": counts[weekday, step]
+                                         })
+    return binned
+
+
+def clock_bins_figure(binned_data: pd.DataFrame,
+                      title: str,
+                      height: int = None,
+                      **kwargs: typing.Any) -> go.Figure:
+    """
+
+
+    Parameters
+    ----------
+    binned_data : pd.DataFrame
+        The dataframe containing the counts per weekday and time step.
+    title : str
+        The title of the plot.
+    height : int, optional
+        The height of the plot. The default is None.
+    **kwargs : typing.Any
+        Key word arguments.
+
+    Returns
+    -------
+    figure : go.Figure
+        The plotly polar bar plot with the weekdays stacked.
+
+    """
+    figure = go.Figure()
+    for weekday, group in binned_data.groupby("weekday"):
+        figure.add_barpolar(r=group["count"],
+                            theta=group["timestep"],
+                            width=2.5,
+                            name=backend.WEEKDAYS[weekday],
+                            marker_color=backend.DISCRETE_COLOR_R[weekday],
+                            customdata=group[["time"]],
+                            hovertemplate="<b>%{fullData.name}</b><br>"
+                                          "%{customdata[0]}<br>%{r}"
+                                          "<extra></extra>",
+                            **kwargs
+                            )
+    figure = _update_layout(figure)
+    figure.update_layout(title=title,
+                         template=backend.TEMPLATE,
+                         height=height,
+                         polar={"barmode": "stack",
+                                "angularaxis": {"direction": "clockwise",
+                                                "rotation": 90,
+                                                "tickvals":
+                                                [backend.hr2ang(hr)
+                                                 for hr in range(24)],
+                                                "ticktext":
+                                                [str(24 if hr == 0 else hr)
+                                                 for hr in range(24)]}
+                                }
+                         )
+    return figure
+
+
 def types(original: pd.DataFrame,
           plot_height: int,
           **kwargs: typing.Any) -> go.Figure:
@@ -579,20 +900,22 @@ def types(original: pd.DataFrame,
 
     """
     plot_title = "Activity types"
+    spec: bool = kwargs.pop("spec", False)
     # show empty figure if no data is provided
     if original.empty:
-        return empty_figure(plot_title,
-                            plot_height)
+        return _builder(empty_figure, spec)(plot_title,
+                                            plot_height)
     # prepare data
     mapper = backend.load_category_mapper(backend.PATH_MAPPER)
-    data = original.loc[:, ["sport_type"]].copy()
+    # plotly express groups the path on the plain strings
+    data = original.loc[:, ["sport_type"]].astype(str)
     data["type"] = data["sport_type"].map(mapper)
     data["counts"] = 1
     # create figure
-    types_plot = sunburst_figure(data,
-                                 title=plot_title,
-                                 height=plot_height,
-                                 **kwargs)
+    types_plot = _builder(sunburst_figure, spec)(data,
+                                                 title=plot_title,
+                                                 height=plot_height,
+                                                 **kwargs)
     return types_plot
 
 
@@ -657,83 +980,133 @@ def locations(original: pd.DataFrame,
 
     # show empty figure if no data is provided
     plot_title = "Locations"
+    spec: bool = kwargs.pop("spec", False)
     # prepare data
     data = original.copy()
     countries_count = pd.DataFrame(columns=["country", "count"])
     data = data.loc[(~original["lat"].isna()) &
                     (~original["lon"].isna()),
                     :]
+    # count the countries passed through instead of the start countries
+    visited: pd.Series | None = kwargs.pop("visited", None)
     if not data.empty:
-        countries_count = data.country.value_counts().reset_index()
+        countries: pd.Series = data.country if visited is None else \
+            visited.loc[visited.index.isin(data.index)].explode() \
+            .rename("country")
+        countries_count = countries.value_counts().reset_index()
+        # drop the categories without any activities
+        countries_count = countries_count.loc[countries_count["count"] > 0, :]
         # get the colors closer together by taking the log of the value
         countries_count["count"] = countries_count["count"].apply(math.log) + 2
     geojson_file = backend.load_geojson(backend.PATH_GEOJSON)
+    # send only the shapes of the countries with activities, as the others
+    # are not drawn
+    shown: set = set(countries_count["country"])
+    geojson_file = {**geojson_file,
+                    "features": [feature for feature
+                                 in geojson_file.get("features", [])
+                                 if feature.get("properties", {})
+                                 .get("ADMIN") in shown]}
+    # rasterize the routes to an image instead of drawing them as lines
+    heatmap: bool = kwargs.pop("heatmap", False)
+    region: str | None = kwargs.pop("region", None)
+    # draw the repeated routes once if the groups of the routes are given
+    groups: pd.Series | None = kwargs.pop("routes", None)
+    # round the coordinates to the precision of the routes
+    precision: int = kwargs.pop("precision", backend.MAP_PRECISION)
+    # keep every so many points of the routes to simplify them
+    step: int = kwargs.pop("step", 1)
+    # cluster the start points unless the clusters of the dataset are given
+    clusters: dict = kwargs.pop("clusters", None) or \
+        backend.cluster_starts(data)
+    if heatmap and not data.empty:
+        layer, center, zoom = backend.heatmap_layer(data,
+                                                    plot_height,
+                                                    region)
+        routes: dict = {"layers": [layer] if layer else [],
+                        "center": center,
+                        "zoom": zoom}
+    else:
+        routes: dict = {**process_data(data if groups is None
+                                       else backend.unique_routes(data,
+                                                                  groups),
+                                       precision,
+                                       step),
+                        "zoom": 1}
     # create figure
-    worldmap = worldmap_figure(data,
-                               countries_count,
-                               geojson_file,
-                               title=plot_title,
-                               height=plot_height,
-                               **process_data(data),
-                               zoom=1,
-                               **kwargs)
+    worldmap = _builder(worldmap_figure, spec)(data,
+                                               countries_count,
+                                               geojson_file,
+                                               title=plot_title,
+                                               height=plot_height,
+                                               clusters=clusters,
+                                               precision=precision,
+                                               **routes,
+                                               **kwargs)
     if data.empty:
         worldmap = _add_annotation(worldmap)
     return worldmap
 
 
 def process_data(data: pd.DataFrame,
-                 **kwargs: typing.Any) -> dict[list]:
+                 precision: int = backend.MAP_PRECISION,
+                 step: int = 1,
+                 **kwargs: typing.Any) -> dict[str, np.ndarray]:
     """
-
+    Join the start point and the route of each activity into one line, with a
+    gap between the activities.
 
     Parameters
     ----------
     data : pd.DataFrame
         The dataframe containing rows with a lat and a lon coordinate.
+    precision : int, optional
+        The decimals of the coordinates. The default is MAP_PRECISION.
+    step : int, optional
+        Keep every so many points of a route and its last point to simplify
+        the routes. The default is 1.
     **kwargs : typing.Any
         Key word arguments.
 
     Returns
     -------
-    list: dict[list]
-        A dictionary with the lists of values for the line mapbox.
+    dict[str, np.ndarray]
+        The lat, the lon and the name per point for the line mapbox, with NaN
+        and None as the gaps.
 
     """
     _ = kwargs
-    lats = []
-    lons = []
-    colors = []
-    names = []
-    dates = []
-    times = []
-    for _, row in data.iterrows():
-        segment_length = len(coords := row["coords"])+1
-        lat, lon = zip(*coords)  # unpack a list of tuples to two lists
-        lat = [row["lat"]]+list(lat)
-        lon = [row["lon"]]+list(lon)
-        lats.extend(lat)
-        lons.extend(lon)
-
-        colors.extend([row["app"]]*segment_length)
-        names.extend([row["name"]]*segment_length)
-        dates.extend([row["date"]]*segment_length)
-        times.extend([row["time"]]*segment_length)
-        # make a seperation in the lists
-
-        lats.append(None)
-        lons.append(None)
-        colors.append(row["app"])
-        names.append(None)
-        dates.append(None)
-        times.append(None)
-    lists = {"lat": lats,
-             "lon": lons,
-             "color": colors,
-             "name": names,
-             "date": dates,
-             "time": times}
-    return lists
+    points, offsets = backend.flatten_coords(data["coords"])
+    lengths: np.ndarray = np.diff(offsets)
+    if step > 1:
+        position: np.ndarray = np.arange(offsets[-1]) - \
+            np.repeat(offsets[:-1], lengths)
+        kept: np.ndarray = (position % step == 0) | \
+            (position == np.repeat(lengths - 1, lengths))
+        points = points[kept]
+        owner: np.ndarray = np.repeat(np.arange(len(lengths)), lengths)
+        lengths = np.bincount(owner[kept], minlength=len(lengths))
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+    # each activity is its start point, its route and a gap
+    first: np.ndarray = np.cumsum(lengths + 2) - (lengths + 2)
+    route: np.ndarray = np.repeat(first + 1 - offsets[:-1], lengths) + \
+        np.arange(offsets[-1])
+    lats: np.ndarray = np.full(offsets[-1] + 2 * len(lengths), np.nan)
+    lons: np.ndarray = lats.copy()
+    lats[first], lons[first] = data["lat"].to_numpy(), data["lon"].to_numpy()
+    lats[route], lons[route] = points[:, 0], points[:, 1]
+    names: np.ndarray = np.repeat(data["name"].to_numpy(dtype=object),
+                                  lengths + 2)
+    names[first + lengths + 1] = None
+    # the coordinates of a polyline have 5 decimals, more only adds bytes
+    lats, lons = np.round(lats, precision), np.round(lons, precision)
+    # drop the points at the same place as the point before, the gaps are
+    # never equal to each other
+    keep: np.ndarray = np.ones(len(lats), dtype=bool)
+    keep[1:] = (lats[1:] != lats[:-1]) | (lons[1:] != lons[:-1])
+    return {"lat": lats[keep],
+            "lon": lons[keep],
+            "name": names[keep]}
 
 
 def worldmap_figure(data: pd.DataFrame,
@@ -770,6 +1143,7 @@ def worldmap_figure(data: pd.DataFrame,
     lats: list = kwargs.get("lat", [])
     lons: list = kwargs.get("lon", [])
     name: list = kwargs.get("name", [])
+    precision: int = kwargs.get("precision", backend.MAP_PRECISION)
     # color the countries by (log of) the amount of activities
     figure = px.choropleth_mapbox(data_frame=countries,
                                   geojson=geojson,
@@ -781,37 +1155,53 @@ def worldmap_figure(data: pd.DataFrame,
                                   color_continuous_scale=backend.DISCRETE_COLOR,
                                   range_color=[0, countries["count"].max()],
                                   opacity=.5,
-                                  zoom=1,
+                                  zoom=kwargs.get("zoom", 1),
                                   # center map on coordinates of activities
-                                  center={"lat": data["lat"].mean(),
-                                          "lon": data["lon"].mean()},
+                                  center=kwargs.get("center",
+                                                    {"lat": data["lat"].mean(),
+                                                     "lon": data["lon"].mean()}
+                                                    ),
                                   mapbox_style="carto-darkmatter",
                                   title=title,
                                   height=height
                                   )
-    # add the routes of the activities
-    figure.add_scattermapbox(below="",  # put trace above all others
-                             lat=lats,
-                             lon=lons,
-                             marker={"size": 1,
-                                     "color": backend.COLOR_MAP.get("Strava"),
-                                     "symbol": "circle",
-                                     },
-                             mode="lines",
-                             customdata=name,
-                             name="Strava"
-                             )
-    figure.add_scattermapbox(below="",   # put trace above all others
-                             lat=data["lat"],
-                             lon=data["lon"],
-                             marker={"size": 5,
-                                     "color": backend.COLOR_MAP.get("Strava"),
-                                     "symbol": "circle",
-                                     },
-                             mode="markers",
-                             customdata=data["name"],
-                             name="Strava"
-                             )
+    # show the routes as a density image, which does not grow with the amount
+    # of activities, instead of the lines
+    if "layers" in kwargs:
+        figure.update_layout(mapbox_layers=kwargs.get("layers"))
+    else:
+        # add the routes of the activities
+        figure.add_scattermapbox(below="",  # put trace above all others
+                                 lat=lats,
+                                 lon=lons,
+                                 marker={"size": 1,
+                                         "color":
+                                             backend.COLOR_MAP.get("Strava"),
+                                         "symbol": "circle",
+                                         },
+                                 mode="lines",
+                                 customdata=name,
+                                 name="Strava"
+                                 )
+    # add the start points, clustered per zoom level or one marker each
+    if "clusters" in kwargs:
+        figure = _add_clusters(figure,
+                               kwargs.get("clusters"),
+                               kwargs.get("zoom", 1),
+                               precision)
+    else:
+        figure.add_scattermapbox(below="",   # put trace above all others
+                                 lat=data["lat"].round(precision),
+                                 lon=data["lon"].round(precision),
+                                 marker={"size": 5,
+                                         "color":
+                                             backend.COLOR_MAP.get("Strava"),
+                                         "symbol": "circle",
+                                         },
+                                 mode="markers",
+                                 customdata=data["name"],
+                                 name="Strava"
+                                 )
     figure.update_traces(hovertemplate="%{customdata}")
     figure = _update_layout(figure)
     figure.update_layout(coloraxis_showscale=False)
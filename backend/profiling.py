@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+"""
+@author: QtyPython2020
+
+Profile a single rerun of the app on demand, for the CPU and the memory.
+
+Every rerun is profiled when the environment variable PROFILE_RERUN is set.
+If PROFILE_QUERY allows it, the url can ask for a profile of one rerun with the
+query parameter profile, which is removed from the url again. Otherwise the app
+runs unchanged. The value "cpu" or "memory" selects one profile, any other
+value both.
+
+The CPU profile samples the stacks of the rerun thread, of the threads started
+during the rerun and of the workers of the shared executors which used the CPU
+since the previous sample. The workers also run the tasks of other sessions,
+which are sampled as well. The profile is written as folded stacks, which
+flamegraph.pl and speedscope read. The memory allocated during the rerun is traced and written as the top allocation sites
+per module of the app. Tracing the allocations slows down the code allocating
+the most, so a CPU profile of the same rerun is only indicative.
+"""
+# Standard library
+import collections
+import contextlib
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import typing
+# Third party
+import pandas as pd
+# Local imports
+import backend
+
+
+class SamplingProfiler:
+    """
+    Sample the stacks of the profiled threads at a fixed interval from a
+    background thread.
+    """
+
+    def __init__(self, interval: float = backend.PROFILE_INTERVAL) -> None:
+        """
+        Parameters
+        ----------
+        interval : float, optional
+            The seconds between the samples. The default is PROFILE_INTERVAL.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.interval: float = interval
+        self.samples: collections.Counter = collections.Counter()
+        self._stop: threading.Event = threading.Event()
+        self._thread: threading.Thread | None = None
+        # the threads running before the profile, except the one starting it
+        # and the workers of the executors
+        self._excluded: set[int] = set()
+        self._cpu: dict[int, float] = {}
+
+    def _busy(self, ident: int) -> bool:
+        """
+        Parameters
+        ----------
+        ident : int
+            The identifier of a thread.
+
+        Returns
+        -------
+        bool
+            Whether the thread used the CPU since the previous sample, or
+            True where the CPU time of other threads cannot be read.
+
+        """
+        try:
+            cpu: float = time.clock_gettime(time.pthread_getcpuclockid(ident))
+        except (AttributeError, OSError):
+            return True
+        busy: bool = cpu > self._cpu.get(ident, 0)
+        self._cpu[ident] = cpu
+        return busy
+
+    def _sample(self) -> None:
+        """
+        Add the current stack of each profiled thread which is busy.
+
+        Returns
+        -------
+        None.
+
+        """
+        names: dict[int, str] = {thread.ident: thread.name
+                                 for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident in self._excluded or not self._busy(ident):
+                continue
+            stack: list[str] = []
+            while frame is not None:
+                stack.append(f"{frame.f_globals.get('__name__', '?')}."
+                             f"{frame.f_code.co_qualname}")
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            self.samples[";".join(reversed(stack))] += 1
+
+    def _run(self) -> None:
+        """
+        Returns
+        -------
+        None.
+
+        """
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self) -> None:
+        """
+        Start sampling the calling thread, the threads it starts and the
+        workers of the executors, which run the tasks it submits.
+
+        Returns
+        -------
+        None.
+
+        """
+        workers: set[int] = {thread.ident
+                             for thread in backend.executor_threads()}
+        self._excluded = {thread.ident for thread in threading.enumerate()
+                          if thread is not threading.current_thread() and
+                          thread.ident not in workers}
+        self._thread = threading.Thread(target=self._run,
+                                        name="SamplingProfiler",
+                                        daemon=True)
+        self._thread.start()
+        self._excluded.add(self._thread.ident)
+
+    def stop(self) -> None:
+        """
+        Returns
+        -------
+        None.
+
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def folded(self) -> str:
+        """
+        Returns
+        -------
+        str
+            One line per stack with the frames from the thread to the leaf,
+            separated by semicolons, and the amount of samples.
+
+        """
+        return "".join(f"{stack} {count}\n"
+                       for stack, count in self.samples.most_common())
+
+
+def _module_of(filename: str) -> str | None:
+    """
+    Parameters
+    ----------
+    filename : str
+        The filepath of a frame.
+
+    Returns
+    -------
+    str | None
+        The name of the module of the app or None for other code.
+
+    """
+    root: str = os.path.dirname(os.path.dirname(os.path.abspath(
+        backend.__file__)))
+    if filename.startswith("<"):
+        return None
+    path: str = os.path.abspath(filename)
+    if not path.startswith(root + os.sep) or "site-packages" in path:
+        return None
+    relative: str = os.path.relpath(path, root)
+    return os.path.splitext(relative)[0].replace(os.sep, ".")
+
+
+def allocation_sites(before: tracemalloc.Snapshot,
+                     after: tracemalloc.Snapshot,
+                     top: int = backend.PROFILE_TOP) -> pd.DataFrame:
+    """
+    Attribute the memory allocated between two snapshots to the innermost
+    line of the app in the traceback, so the allocations of the libraries are
+    counted at the line of the app calling them.
+
+    Parameters
+    ----------
+    before : tracemalloc.Snapshot
+        The snapshot at the start of the rerun.
+    after : tracemalloc.Snapshot
+        The snapshot at the end of the rerun.
+    top : int, optional
+        The amount of sites per module. The default is PROFILE_TOP.
+
+    Returns
+    -------
+    pd.DataFrame
+        The bytes and blocks still allocated per site, the largest sites of
+        each module first, the modules with the most bytes first.
+
+    """
+    # without the allocations of the profiler itself
+    filters: list[tracemalloc.Filter] = [
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, tracemalloc.__file__)]
+    before = before.filter_traces(filters)
+    after = after.filter_traces(filters)
+    rows: list[tuple] = []
+    for difference in after.compare_to(before, "traceback"):
+        if difference.size_diff <= 0:
+            continue
+        module, line = "other", difference.traceback[-1]
+        # the frames are ordered from the oldest to the most recent
+        for frame in reversed(difference.traceback):
+            if (name := _module_of(frame.filename)) is not None:
+                module, line = name, frame
+                break
+        rows.append((module,
+                     f"{line.filename}:{line.lineno}",
+                     difference.size_diff,
+                     difference.count_diff))
+    sites: pd.DataFrame = pd.DataFrame(rows,
+                                       columns=["module", "site",
+                                                "size", "blocks"])
+    sites = sites.groupby(["module", "site"], as_index=False).sum()
+    totals: pd.Series = sites.groupby("module")["size"].transform("sum")
+    sites = sites.assign(total=totals).sort_values(["total", "size"],
+                                                   ascending=False)
+    return sites.groupby("module", sort=False).head(top)\
+        .drop(columns="total").reset_index(drop=True)
+
+
+def profiling_requested(params: dict,
+                        query: bool = backend.PROFILE_QUERY) -> set[str]:
+    """
+    Parameters
+    ----------
+    params : dict
+        The query parameters of the url.
+    query : bool, optional
+        Whether the url can ask for a profile, otherwise only the environment
+        variable PROFILE_RERUN does. The default is PROFILE_QUERY.
+
+    Returns
+    -------
+    set[str]
+        The profiles of the rerun, "cpu" and or "memory", or an empty set to
+        run it unchanged.
+
+    """
+    value: str | None = params.get("profile") if query else None
+    if value is None:
+        value = os.environ.get("PROFILE_RERUN")
+    if value is None:
+        return set()
+    return {value} if value in ("cpu", "memory") else {"cpu", "memory"}
+
+
+@contextlib.contextmanager
+def profile_rerun(profiles: typing.Iterable[str] = ("cpu", "memory"),
+                  directory: str = backend.PATH_PROFILES,
+                  interval: float = backend.PROFILE_INTERVAL,
+                  frames: int = backend.PROFILE_FRAMES,
+                  top: int = backend.PROFILE_TOP) -> typing.Iterator[None]:
+    """
+    Profile the CPU and the memory of the block and write the profiles.
+
+    Parameters
+    ----------
+    profiles : typing.Iterable[str], optional
+        The profiles to take, "cpu" and or "memory". The default is both.
+    directory : str, optional
+        The directory for the profiles. The default is PATH_PROFILES.
+    interval : float, optional
+        The seconds between the CPU samples. The default is PROFILE_INTERVAL.
+    frames : int, optional
+        The depth of the tracebacks of the allocations. The default is
+        PROFILE_FRAMES.
+    top : int, optional
+        The amount of allocation sites per module. The default is PROFILE_TOP.
+
+    Yields
+    ------
+    None.
+
+    """
+    profiles = set(profiles)
+    memory: bool = "memory" in profiles
+    # a trace started elsewhere is kept running
+    tracing: bool = tracemalloc.is_tracing()
+    if memory:
+        if not tracing:
+            tracemalloc.start(frames)
+        tracemalloc.reset_peak()
+        before: tracemalloc.Snapshot = tracemalloc.take_snapshot()
+    profiler: SamplingProfiler = SamplingProfiler(interval)
+    started: float = time.perf_counter()
+    if "cpu" in profiles:
+        profiler.start()
+    try:
+        yield
+    finally:
+        profiler.stop()
+        wall: float = time.perf_counter() - started
+        os.makedirs(directory, exist_ok=True)
+        name: str = os.path.join(directory,
+                                 time.strftime("rerun-%Y%m%d-%H%M%S"))
+        written: list[str] = []
+        if "cpu" in profiles:
+            with open(f"{name}.folded", "w", encoding="utf-8") as file:
+                file.write(profiler.folded())
+            written.append(f"{name}.folded")
+        if memory:
+            after: tracemalloc.Snapshot = tracemalloc.take_snapshot()
+            peak: int = tracemalloc.get_traced_memory()[1]
+            if not tracing:
+                tracemalloc.stop()
+            sites: pd.DataFrame = allocation_sites(before, after, top)
+            with open(f"{name}-memory.txt", "w", encoding="utf-8") as file:
+                file.write(f"wall: {wall:.3f} s, "
+                           f"peak traced: {peak} bytes\n\n")
+                file.write(sites.to_string(index=False))
+                file.write("\n")
+            written.append(f"{name}-memory.txt")
+        print(f"profile of the rerun in {wall:.3f} s: {', '.join(written)}")
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+@author: QtyPython2020
+
+Download the activities in the background and publish them while the pages
+are still arriving.
+
+Strava returns the most recent activities first, so the pages are published
+in the order of their number as soon as they are parsed and the dashboard
+shows the latest activities after the first page, whatever the length of the
+history. Each published page is sorted once and added to the index of the
+names. The pages published since the dataset was last shown are put in front
+of it, as they hold older activities, so the dataset is neither cast nor
+sorted again as a whole.
+"""
+# Standard library
+import concurrent.futures as c_futures
+import contextvars
+import functools
+import threading
+import time
+# Third party
+import pandas as pd
+from streamlit.runtime.scriptrunner import add_script_run_ctx
+# Local imports
+import backend
+
+
+class ProgressiveLoad:
+    """
+    A download of the activities of an athlete running in the background,
+    with the activities of the pages parsed so far.
+    """
+
+    def __init__(self,
+                 token: str,
+                 in_flight: int = backend.PAGES_IN_FLIGHT,
+                 retry: float = backend.ADMISSION_RETRY) -> None:
+        """
+        Parameters
+        ----------
+        token : str
+            Strava access token.
+        in_flight : int, optional
+            The amount of pages requested at the same time. The default is
+            PAGES_IN_FLIGHT.
+        retry : float, optional
+            The seconds before a download which is not admitted is submitted
+            again. The default is ADMISSION_RETRY.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.names: backend.NameIndex = backend.NameIndex()
+        # the amount of tasks waiting for the executors while the download
+        # is not admitted
+        self.waiting: int | None = None
+        # the monotonic time the download finished or failed
+        self.finished: float | None = None
+        self._pages: list[pd.DataFrame] = []
+        self._rows: int = 0
+        # the dataset of the first pages and the amount of pages in it
+        self._partial: tuple[int, pd.DataFrame] = (0, backend.enforce_schema(
+            pd.DataFrame(columns=backend.STRAVA_COLS)))
+        self._result: c_futures.Future = c_futures.Future()
+        self._lock: threading.Lock = threading.Lock()
+        # the stages are timed in the rerun starting the download and its
+        # tasks are queued for the session of that rerun
+        thread: threading.Thread = threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(self._run, token, in_flight, retry),
+            name="ProgressiveLoad",
+            daemon=True)
+        add_script_run_ctx(thread)
+        thread.start()
+
+    def _run(self,
+             token: str,
+             in_flight: int,
+             retry: float) -> None:
+        """
+        Download the activities, waiting until the executors admit the job.
+
+        Parameters
+        ----------
+        token : str
+            Strava access token.
+        in_flight : int
+            The amount of pages requested at the same time.
+        retry : float
+            The seconds before the job is submitted again.
+
+        Returns
+        -------
+        None.
+
+        """
+        while True:
+            try:
+                data: pd.DataFrame = backend.thread_get_and_parse(
+                    token,
+                    in_flight,
+                    on_page=self._publish)
+            except backend.Saturated as saturated:
+                self.waiting = saturated.waiting
+                time.sleep(retry)
+                continue
+            except BaseException as error:
+                self.finished = time.monotonic()
+                self._result.set_exception(error)
+                return
+            self.waiting = None
+            self.finished = time.monotonic()
+            self._result.set_result(data)
+            return
+
+    def _publish(self, page: pd.DataFrame) -> None:
+        """
+        Append the next page to the activities downloaded so far, sorted by
+        their start.
+
+        Parameters
+        ----------
+        page : pd.DataFrame
+            The parsed activities of the page.
+
+        Returns
+        -------
+        None.
+
+        """
+        # the labels the activities get in the whole download, which the
+        # index of the names refers to
+        page = page.set_axis(pd.RangeIndex(self._rows,
+                                           self._rows + page.shape[0]))\
+            .sort_values("timestamp", kind="stable")
+        self._rows += page.shape[0]
+        self.waiting = None
+        self.names.add(page)
+        with self._lock:
+            self._pages.append(page)
+
+    def published(self) -> int:
+        """
+        Returns
+        -------
+        int
+            The amount of pages published.
+
+        """
+        with self._lock:
+            return len(self._pages)
+
+    def partial(self) -> pd.DataFrame:
+        """
+        Returns
+        -------
+        pd.DataFrame
+            The activities of the pages published so far, sorted by their
+            start, which is extended with the pages published since the
+            previous call.
+
+        """
+        with self._lock:
+            count, frame = self._partial
+            pages: list[pd.DataFrame] = self._pages[count:]
+        if not pages:
+            return frame
+        # the later pages hold the older activities
+        parts: list[pd.DataFrame] = pages[::-1] + ([frame] if count else [])
+        # the parts get the same categories, which concat would turn into
+        # objects otherwise
+        dtypes: dict[str, pd.CategoricalDtype] = {
+            column: pd.CategoricalDtype(functools.reduce(
+                pd.Index.union,
+                [part[column].cat.categories for part in parts]))
+            for column, dtype in backend.STRAVA_SCHEMA.items()
+            if dtype == "category"}
+        frame = pd.concat([part.astype(dtypes) for part in parts])
+        # only sorted again if the pages overlap in time, like when an
+        # activity was uploaded while the pages were requested
+        if not frame["timestamp"].is_monotonic_increasing:
+            frame = frame.sort_values("timestamp", kind="stable")
+        with self._lock:
+            if count + len(pages) > self._partial[0]:
+                self._partial = (count + len(pages), frame)
+        return frame
+
+    def done(self) -> bool:
+        """
+        Returns
+        -------
+        bool
+            Whether the download finished.
+
+        """
+        return self._result.done()
+
+    def exception(self) -> BaseException | None:
+        """
+        Returns
+        -------
+        BaseException | None
+            The error of the download, or None if it did not fail or is not
+            done yet.
+
+        """
+        if not self._result.done():
+            return None
+        return self._result.exception()
+
+    def result(self) -> pd.DataFrame:
+        """
+        Returns
+        -------
+        pd.DataFrame
+            Table of all the retrieved activities, raising the error of the
+            download if it failed.
+
+        """
+        return self._result.result()
+
+
+if __name__ == "__main__":
+    pass
@@ -6,6 +6,7 @@ All the variables used throughout the app.
 """
 #  Standard library
 import os
+import tempfile
 # Third party
 import plotly.express as px
 
@@ -34,6 +35,10 @@ ERROR_MESSAGE2: str =\
     """
 An error occurred while retrieving the data. Please try to authorize again.
 """
+ERROR_MESSAGE3: str =\
+    """
+The file does not contain saved activities of this app:
+"""
 HELP_TEXT: str = """See this activity on the Strava website"""
 TITLE: str = "Activity Mapper"
 DT_FORMAT: str = "%Y-%m-%dT%H:%M:%SZ"
@@ -63,6 +68,25 @@ STRAVA_COLS: list[str] = ["name",
                           "timestamp",
                           "coords"
                           ]
+# DTYPES OF THE STRAVA COLUMNS, ENFORCED AT THE END OF PARSING
+STRAVA_SCHEMA: dict[str, str] = {"name": "object",
+                                 "id": "int64",
+                                 "date": "datetime64[ns]",  # midnight
+                                 "sport_type": "category",
+                                 "country": "category",
+                                 "app": "category",
+                                 "weekday": "int8",
+                                 "time": "timedelta64[ns]",  # since midnight
+                                 "hour": "int8",
+                                 "minutes": "int8",
+                                 "lat": "float64",
+                                 "lon": "float64",
+                                 "calender-week": "category",
+                                 "year": "int16",
+                                 "week": "int8",
+                                 "timestamp": "datetime64[ns, UTC]",
+                                 "coords": "object"
+                                 }
 
 # DICT WITH CONFIGURATION FOR PLOTLY CHARTS
 CONFIG: dict = {"displaylogo": False,  # remove the plotly logo
@@ -78,14 +102,29 @@ CONFIG2: dict = {"displaylogo": False,  # remove the plotly logo
 # FILE PATHS
 PATH_CODES: str = "files/country_codes.txt"
 PATH_CONNECT: str = "logos/btn_strava_connectwith_orange@2x.png"
+PATH_DEMO: str = "files/api_test.arrow"
 PATH_LOGO: str = "logos/api_logo_pwrdBy_strava_horiz_light.png"
 PATH_GEOJSON: str = "files/countries.geojson"
 PATH_MAPPER: str = "files/strava_categories.txt"
+PATH_STORE: str = os.path.join(tempfile.gettempdir(), "activity_mapper")
+PATH_STREAMS: str = os.path.join(PATH_STORE, "streams")
+PATH_METRICS: str = os.environ.get("PATH_METRICS", "metrics.prom")
+PATH_PROFILES: str = os.path.join(PATH_STORE, "profiles")
+
+# NAMES OF THE DAYS OF THE WEEK, MONDAY IS 0
+WEEKDAYS: list[str] = ["Monday",
+                       "Tuesday",
+                       "Wednesday",
+                       "Thursday",
+                       "Friday",
+                       "Saturday",
+                       "Sunday"]
 
 # COLORS AND THEMES
 COLOR_MAP: dict = {"Strava": "#FC4C02"}  # the color of the Strava app
 DISCRETE_COLOR: list[str] = px.colors.sequential.Oranges
 DISCRETE_COLOR_R: list[str] = px.colors.sequential.Oranges_r
+HIGHLIGHT_COLOR: str = "#00BFFF"  # the activities found by their name
 TEMPLATE: str = "plotly_dark"
 
 # SIZES FOR PLOTS
@@ -93,6 +132,94 @@ LEFT_RIGHT_MARGIN: int = 20
 TOP_BOTTOM_MARGIN: int = 25
 TOP_ROW_HEIGHT: int = 200
 BOTTOM_ROW_HEIGHT: int = 600
+RASTER_SIZE: int = 512  # cells along the longest side of the heatmap
+CLOCK_MAX_POINTS: int = 1000  # activities in the clock before binning them
+TIMELINE_MAX_BYTES: int = 512 * 1024  # size of the markers before aggregating
+MAP_PRECISION: int = 5  # decimals of the coordinates, as in a polyline
+
+# CLUSTERING OF THE START POINTS ON THE MAP
+CLUSTER_ZOOMS: dict[str, int] = {"World": 1,
+                                 "Region": 5,
+                                 "City": 9,
+                                 "Streets": 13}
+CLUSTER_PIXELS: int = 40  # the size of a grid cell on the screen
+CLUSTER_NAMES: int = 3  # the most frequent activity names in the hover
+
+# SPATIAL INDEX OF THE ROUTES FOR SELECTING ACTIVITIES ON THE MAP
+INDEX_CELL: float = .002  # degrees, about 200 meters
+NEAR_DISTANCE: float = 1.  # kilometers around a selected point
+
+# ATTRIBUTING THE ROUTE POINTS TO COUNTRIES
+BORDER_PRECISION: float = 1e-3  # degrees, points closer together are merged
+
+# DETECTING THE REPEATED ROUTES
+ROUTE_CELL: float = .0025  # degrees, the cells of the fingerprint of a route
+ROUTE_ENDPOINT_CELL: float = .005  # degrees, the cells of the endpoints
+ROUTE_SIMILARITY: float = .8  # the share of common cells of the same route
+
+# BUDGET OF A RERUN TO BUILD THE FIGURES AND SEND THEM TO THE BROWSER
+RENDER_SECONDS: float = float(os.environ.get("RENDER_SECONDS", 2.))
+RENDER_BYTES: int = int(os.environ.get("RENDER_BYTES", 8 * 1024**2))
+SIMPLIFY_MAX_STEP: int = 8  # the most points of a route merged into one
+
+# TIMINGS OF THE STAGES OF THE PREVIOUS RERUNS KEPT PER SESSION
+TIMINGS_HISTORY: int = 20
+
+# UPPER BOUNDS OF THE BUCKETS OF THE LATENCY HISTOGRAMS IN SECONDS
+METRICS_BUCKETS: tuple[float, ...] = (.005, .01, .025, .05, .1, .25, .5, 1,
+                                      2.5, 5, 10)
+
+# PROFILING A RERUN ON DEMAND
+PROFILE_INTERVAL: float = .005  # seconds between the samples of the stacks
+PROFILE_FRAMES: int = 25  # the depth of the tracebacks of the allocations
+PROFILE_TOP: int = 10  # the allocation sites reported per module
+# whether the url can ask for a profile, as tracing slows down the server
+PROFILE_QUERY: bool = os.environ.get("PROFILE_QUERY", "") == "1"
+
+# THE MOST ACTIVITIES FOUND BY THEIR NAME HIGHLIGHTED ON THE FIGURES
+HIGHLIGHT_MAX: int = 1_000
+
+# COLUMNS TO FILTER THE ACTIVITIES BY, BESIDES THE DATE
+FILTER_COLS: list[str] = ["sport_type", "country"]
+
+# PAGES OF THE TABLE OF ACTIVITIES
+TABLE_PAGE_ROWS: int = 100
+TABLE_SORT_COLS: list[str] = ["date", "name", "sport_type", "country"]
+
+# MAXIMUM AMOUNT OF POINTS OF A ROUTE READ FROM A TRACK FILE
+MAX_ROUTE_POINTS: int = 500
+
+# DOWNLOADING THE GPS STREAMS, WITHIN THE RATE LIMIT OF THE STRAVA API
+STREAMS_WORKERS: int = 4
+STREAMS_RATE_LIMIT: int = 100  # requests per window
+STREAMS_RATE_WINDOW: int = 15 * 60  # seconds
+STREAMS_MAX_ACTIVITIES: int = 100  # the most recent activities to choose
+STREAMS_CACHE_AGE: float = 30 * 24 * 3600  # seconds a stream is kept unused
+STREAMS_CACHE_BYTES: int = int(os.environ.get("STREAMS_CACHE_BYTES",
+                                              1024**3))
+
+# EXECUTORS SHARED BY ALL SESSIONS, THE WORKERS PER EXECUTOR AND THE TASKS
+# WAITING PER WORKER BEFORE NEW JOBS ARE QUEUED
+EXECUTOR_WORKERS: dict[str, int] = {
+    "io": int(os.environ.get("IO_WORKERS",
+                             min(32, (os.cpu_count() or 1) + 4))),
+    "cpu": int(os.environ.get("CPU_WORKERS", os.cpu_count() or 1))
+    }
+EXECUTOR_BACKLOG: int = 8
+ADMISSION_RETRY: float = 1  # seconds before a queued job is submitted again
+PAGES_IN_FLIGHT: int = 5  # pages of activities requested at the same time
+
+# SECONDS A DOWNLOAD OF THE ACTIVITIES OF AN ATHLETE IS STILL SHARED AFTER IT
+# FINISHED, AND BETWEEN THE CHECKS FOR ITS NEW PAGES
+LOAD_TTL: float = 120
+PROGRESS_SECONDS: float = 1
+
+# MEMORY BUDGET OF THE DATASETS OF ALL SESSIONS IN BYTES
+STORE_BUDGET: int = int(os.environ.get("STORE_BUDGET", 512 * 1024**2))
+# SECONDS AND DISK BUDGET IN BYTES OF THE SPILLED DATASETS NOT USED ANYMORE
+STORE_SPILL_AGE: float = 24 * 3600
+STORE_SPILL_BUDGET: int = int(os.environ.get("STORE_SPILL_BUDGET",
+                                             4 * 1024**3))
 
 # URLS
 ACTIVITIES_LINK: str = "https://www.strava.com/api/v3/athlete/activities"
@@ -101,6 +228,7 @@ ATHLETE_URL: str = "https://www.strava.com/api/v3/athlete"
 APP_URL: str = "https://strava-activity-mapper.streamlit.app/"
 AUTH_LINK: str = "https://www.strava.com/oauth/authorize"
 NOMINATIM_LINK: str = "https://nominatim.openstreetmap.org/reverse"
+STREAMS_LINK: str = "https://www.strava.com/api/v3/activities/{}/streams"
 authorization_link = f"""
 {AUTH_LINK}?client_id={STRAVA_CLIENT_ID}&redirect_uri={APP_URL}&response_type=code&approval_prompt=force&scope=activity:read,activity:read_all
 """
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+@author: QtyPython2020
+
+Detect the routes that are repeated, like a daily commute or a favourite loop.
+
+Each route is fingerprinted by the set of grid cells it passes through. The
+routes are indexed by the cells of their start and end point, so a route is
+only compared to the earlier distinct routes starting and ending nearby
+instead of to every other route.
+"""
+# Standard library
+import itertools
+# Third party
+import numpy as np
+import pandas as pd
+# Local imports
+import backend
+
+
+def route_cells(points: np.ndarray,
+                offsets: np.ndarray,
+                cell: float = backend.ROUTE_CELL) -> list[set[int]]:
+    """
+    Determine the grid cells each route passes through, including the cells
+    between two far apart points of a route.
+
+    Parameters
+    ----------
+    points : np.ndarray
+        The (lat, lon) points of all routes.
+    offsets : np.ndarray
+        The start of each route in the points and the total amount of points.
+    cell : float, optional
+        The size of a grid cell in degrees. The default is ROUTE_CELL.
+
+    Returns
+    -------
+    list[set[int]]
+        The numbers of the cells per route.
+
+    """
+    routes: int = len(offsets) - 1
+    columns: int = int(np.ceil(360 / cell)) + 1
+    y: np.ndarray = (points[:, 0] + 90) / cell
+    x: np.ndarray = (points[:, 1] + 180) / cell
+    route: np.ndarray = np.repeat(np.arange(routes), np.diff(offsets))
+    # the segments between consecutive points of the same route
+    last: np.ndarray = np.zeros(len(points), dtype=bool)
+    last[offsets[1:][offsets[1:] > 0] - 1] = True
+    start: np.ndarray = np.flatnonzero(~last[:-1]) if len(points) \
+        else np.empty(0, dtype=np.int64)
+    dx: np.ndarray = x[start + 1] - x[start]
+    dy: np.ndarray = y[start + 1] - y[start]
+    # sample each segment about once per cell it crosses
+    samples: np.ndarray = np.ceil(np.maximum(np.abs(dx), np.abs(dy))
+                                  ).astype(np.int64) + 1
+    segment: np.ndarray = np.repeat(np.arange(len(start)), samples)
+    fraction: np.ndarray = (np.arange(len(segment)) -
+                            np.repeat(np.cumsum(samples) - samples, samples)
+                            ) / np.repeat(samples, samples)
+    rows: np.ndarray = np.concatenate([
+        np.floor(y[start][segment] + fraction * dy[segment]),
+        np.floor(y)]).astype(np.int64)
+    cols: np.ndarray = np.concatenate([
+        np.floor(x[start][segment] + fraction * dx[segment]),
+        np.floor(x)]).astype(np.int64)
+    owners: np.ndarray = np.concatenate([route[start][segment], route])
+    # the distinct cells per route, sorted by the route
+    pairs: np.ndarray = np.unique(owners * (columns * columns) +
+                                  rows * columns + cols)
+    counts: np.ndarray = np.bincount(pairs // (columns * columns),
+                                     minlength=routes)
+    cells: list = [set(group.tolist())
+                   for group in np.split(pairs % (columns * columns),
+                                         np.cumsum(counts)[:-1])]
+    return cells
+
+
+def _endpoint_cells(points: np.ndarray,
+                    cell: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Parameters
+    ----------
+    points : np.ndarray
+        The (lat, lon) points.
+    cell : float
+        The size of a grid cell in degrees.
+
+    Returns
+    -------
+    cells : np.ndarray
+        The row and column of the cell of each point.
+    nearest : np.ndarray
+        The row and column of the neighbouring cells closest to each point,
+        across the nearest corner of its cell, so points close to each other
+        in neighbouring cells are found as well.
+
+    """
+    scaled: np.ndarray = points / cell
+    cells: np.ndarray = np.floor(scaled).astype(np.int64)
+    nearest: np.ndarray = np.where(scaled - cells < .5, cells - 1, cells + 1)
+    return cells, nearest
+
+
+def frequent_routes(data: pd.DataFrame,
+                    similarity: float = backend.ROUTE_SIMILARITY,
+                    cell: float = backend.ROUTE_CELL,
+                    endpoint: float = backend.ROUTE_ENDPOINT_CELL
+                    ) -> pd.Series:
+    """
+    Group the activities with near identical routes.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        The dataframe containing the parsed activities.
+    similarity : float, optional
+        The minimum share of common cells, the Jaccard similarity, of routes
+        in the same group. The default is ROUTE_SIMILARITY.
+    cell : float, optional
+        The size of a grid cell of the fingerprints in degrees. The default
+        is ROUTE_CELL.
+    endpoint : float, optional
+        The size of a grid cell of the start and end points in degrees. The
+        default is ROUTE_ENDPOINT_CELL.
+
+    Returns
+    -------
+    pd.Series
+        The index label of the first activity of the group per activity, or
+        its own label for activities without a route.
+
+    """
+    points, offsets = backend.flatten_coords(data["coords"])
+    cells: list[set[int]] = route_cells(points, offsets, cell)
+    labels: np.ndarray = data.index.to_numpy()
+    groups: np.ndarray = labels.copy()
+    sizes: list[int] = [len(signature) for signature in cells]
+    routes: np.ndarray = np.flatnonzero(np.diff(offsets) > 0)
+    starts, starts_nearest = _endpoint_cells(points[offsets[routes]],
+                                             endpoint)
+    ends, ends_nearest = _endpoint_cells(points[offsets[routes + 1] - 1],
+                                         endpoint)
+    # the first route of each group by the cells of its start and end point
+    index: dict[tuple, list[int]] = {}
+    for route, start, start_nearest, end, end_nearest in zip(
+            routes.tolist(),
+            starts.tolist(),
+            starts_nearest.tolist(),
+            ends.tolist(),
+            ends_nearest.tolist()):
+        keys: itertools.product = itertools.product(
+            *zip(start, start_nearest),
+            *zip(end, end_nearest))
+        signature: set[int] = cells[route]
+        size: int = sizes[route]
+        for candidate in itertools.chain.from_iterable(index.get(key, ())
+                                                       for key in keys):
+            # the similarity can not be reached by routes of another size
+            if not similarity * size <= sizes[candidate] <= size / similarity:
+                continue
+            shared: int = len(signature & cells[candidate])
+            if shared / (size + sizes[candidate] - shared) >= similarity:
+                groups[route] = labels[candidate]
+                break
+        # a new distinct route is indexed by the cells of its endpoints
+        else:
+            index.setdefault((*start, *end), []).append(route)
+    return pd.Series(groups, index=data.index, name="route")
+
+
+def unique_routes(data: pd.DataFrame,
+                  groups: pd.Series) -> pd.DataFrame:
+    """
+    Keep the first activity of each group of repeated routes and add the
+    amount of repeats to its name.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        The dataframe containing the parsed activities.
+    groups : pd.Series
+        The group per activity as returned by frequent_routes.
+
+    Returns
+    -------
+    unique : pd.DataFrame
+        The first activity per group.
+
+    """
+    groups = groups.loc[groups.index.isin(data.index)]
+    counts: pd.Series = groups.value_counts()
+    first: pd.Series = groups.drop_duplicates()
+    unique: pd.DataFrame = data.loc[first.index, :].copy()
+    unique["name"] = [name if repeats == 1 else f"{name} ({repeats} times)"
+                      for name, repeats in zip(unique["name"],
+                                               first.map(counts))]
+    return unique
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+@author: QtyPython2020
+
+Search the activities by the words of their names.
+
+The names are split in lowercase tokens, each pointing to the sorted index
+labels of the activities containing it. The tokens are kept sorted, so the
+tokens starting with a prefix are a contiguous range found by bisection. A
+query matches the activities containing every word of the query as the start
+of one of the tokens of their name.
+"""
+# Standard library
+import bisect
+import re
+import threading
+# Third party
+import numpy as np
+import pandas as pd
+
+
+# the characters of a token
+TOKEN: re.Pattern = re.compile(r"\w+")
+
+
+def tokenize(names: pd.Series) -> pd.Series:
+    """
+    Parameters
+    ----------
+    names : pd.Series
+        The names of the activities.
+
+    Returns
+    -------
+    pd.Series
+        One token per row with the index label of its activity, without the
+        repeated tokens of a name.
+
+    """
+    tokens: pd.Series = names.astype(str).str.casefold()\
+        .str.findall(TOKEN).explode().dropna()
+    return tokens[~pd.MultiIndex.from_arrays([tokens.index, tokens])
+                  .duplicated()]
+
+
+class NameIndex:
+    """
+    An inverted index of the tokens of the names of the activities.
+    """
+
+    def __init__(self, data: pd.DataFrame = None) -> None:
+        """
+        Parameters
+        ----------
+        data : pd.DataFrame, optional
+            The dataframe containing the parsed activities. The default is
+            None for an empty index.
+
+        Returns
+        -------
+        None.
+
+        """
+        self._postings: dict[str, np.ndarray] = {}
+        self._tokens: list[str] = []
+        self._lock: threading.Lock = threading.Lock()
+        if data is not None:
+            self.add(data)
+
+    def __len__(self) -> int:
+        """
+        Returns
+        -------
+        int
+            The amount of distinct tokens.
+
+        """
+        return len(self._tokens)
+
+    def add(self, data: pd.DataFrame) -> None:
+        """
+        Add the names of appended activities to the index.
+
+        Parameters
+        ----------
+        data : pd.DataFrame
+            The appended activities, with index labels which are not in the
+            index yet.
+
+        Returns
+        -------
+        None.
+
+        """
+        tokens: pd.Series = tokenize(data["name"])
+        labels: np.ndarray = tokens.index.to_numpy()
+        with self._lock:
+            for token, positions in tokens.groupby(tokens.to_numpy())\
+                    .indices.items():
+                added: np.ndarray = labels[positions]
+                if token in self._postings:
+                    added = np.union1d(self._postings[token], added)
+                self._postings[token] = np.sort(added)
+            # replaced at once so a search never sees a partly sorted list
+            self._tokens = sorted(self._postings)
+
+    def search(self, query: str) -> np.ndarray | None:
+        """
+        Parameters
+        ----------
+        query : str
+            The words to search for, each as the start of a token.
+
+        Returns
+        -------
+        np.ndarray | None
+            The sorted index labels of the matching activities, or None if
+            the query has no words.
+
+        """
+        tokens: list[str] = self._tokens
+        matches: np.ndarray | None = None
+        for word in TOKEN.findall(query.casefold()):
+            # the tokens starting with the word follow each other
+            start: int = bisect.bisect_left(tokens, word)
+            stop: int = bisect.bisect_left(tokens, word + "\U0010ffff",
+                                           lo=start)
+            postings: list[np.ndarray] = [self._postings[token]
+                                          for token in tokens[start:stop]]
+            if not postings:
+                return np.empty(0, dtype=np.int64)
+            labels: np.ndarray = postings[0] if len(postings) == 1 \
+                else np.unique(np.concatenate(postings))
+            matches = labels if matches is None else \
+                np.intersect1d(matches, labels, assume_unique=True)
+        return matches
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,920 @@
+# -*- coding: utf-8 -*-
+"""
+@author: QtyPython2020
+
+Spatial helper functions on the decoded routes of the activities.
+
+The ragged coordinates of the activities are flattened to one array of points
+with the offsets of each activity into it, so the spatial operations can be
+done with NumPy on all points at once.
+"""
+# Standard library
+import base64
+import io
+import itertools
+import math
+import typing
+# Third party
+import numpy as np
+import pandas as pd
+from PIL import Image
+# Local imports
+import backend
+
+# the latitude limit of the web mercator projection used by mapbox
+MAX_LATITUDE: float = 85.0511
+# the mean radius of the earth in kilometers
+EARTH_RADIUS: float = 6371.0088
+# the most pairs of points and polygon edges tested at once
+MAX_PAIRS: int = 2**22
+
+
+def flatten_coords(coords: typing.Iterable) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Flatten the ragged coordinates of the activities.
+
+    Parameters
+    ----------
+    coords : typing.Iterable
+        The (lat, lon) points or None per activity.
+
+    Returns
+    -------
+    points : np.ndarray
+        The (lat, lon) points of all activities, of shape (points, 2).
+    offsets : np.ndarray
+        The start of each activity in the points and the total amount of
+        points, of length activities + 1.
+
+    """
+    routes: list = [route if isinstance(route, (list, tuple, np.ndarray))
+                    else () for route in coords]
+    lengths: np.ndarray = np.fromiter(map(len, routes),
+                                      dtype=np.int64,
+                                      count=len(routes))
+    offsets: np.ndarray = np.concatenate([[0], np.cumsum(lengths)])
+    # the arrays of a loaded dataset are joined, the tuples of a parsed
+    # dataset are read as one stream of numbers
+    if any(isinstance(route, np.ndarray) for route in routes):
+        points: np.ndarray = np.concatenate(
+            [np.asarray(route, dtype=np.float64).reshape(-1, 2)
+             for route in routes] or [np.empty((0, 2))]
+                                            )
+    else:
+        points = np.fromiter(itertools.chain.from_iterable(
+            itertools.chain.from_iterable(routes)),
+                             dtype=np.float64,
+                             count=2 * offsets[-1]
+                             ).reshape(-1, 2)
+    return points, offsets
+
+
+def mercator_y(lat: np.ndarray) -> np.ndarray:
+    """
+    Project latitudes to the vertical axis of the web mercator projection.
+
+    Parameters
+    ----------
+    lat : np.ndarray
+        The latitudes in degrees.
+
+    Returns
+    -------
+    np.ndarray
+        The projected latitudes in degrees.
+
+    """
+    lat = np.radians(np.clip(lat, -MAX_LATITUDE, MAX_LATITUDE))
+    return np.degrees(np.log(np.tan(np.pi / 4 + lat / 2)))
+
+
+def route_bounds(points: np.ndarray,
+                 padding: float = .05) -> tuple[float, float, float, float]:
+    """
+    Determine the bounding box around the points with some padding.
+
+    Parameters
+    ----------
+    points : np.ndarray
+        The (lat, lon) points.
+    padding : float, optional
+        The padding as a fraction of the size of the box. The default is .05.
+
+    Returns
+    -------
+    tuple[float, float, float, float]
+        The minimum and maximum latitude and the minimum and maximum
+        longitude.
+
+    """
+    lat_min, lon_min = points.min(axis=0)
+    lat_max, lon_max = points.max(axis=0)
+    # prevent an empty box for a single point
+    lat_pad: float = max((lat_max - lat_min) * padding, 1e-3)
+    lon_pad: float = max((lon_max - lon_min) * padding, 1e-3)
+    return (max(lat_min - lat_pad, -MAX_LATITUDE),
+            min(lat_max + lat_pad, MAX_LATITUDE),
+            max(lon_min - lon_pad, -180.),
+            min(lon_max + lon_pad, 180.))
+
+
+def rasterize(points: np.ndarray,
+              offsets: np.ndarray,
+              bounds: tuple[float, float, float, float],
+              size: int = backend.RASTER_SIZE) -> np.ndarray:
+    """
+    Draw all routes as lines on a grid and count how many samples of the
+    lines fall in each cell, in the way of datashader.
+
+    Parameters
+    ----------
+    points : np.ndarray
+        The (lat, lon) points of all routes.
+    offsets : np.ndarray
+        The start of each route in the points.
+    bounds : tuple[float, float, float, float]
+        The minimum and maximum latitude and the minimum and maximum
+        longitude of the grid.
+    size : int, optional
+        The amount of cells along the longest side of the grid. The default is
+        RASTER_SIZE.
+
+    Returns
+    -------
+    counts : np.ndarray
+        The density grid with the northern most row first.
+
+    """
+    lat_min, lat_max, lon_min, lon_max = bounds
+    y_min, y_max = mercator_y(np.array([lat_min, lat_max]))
+    # keep the aspect ratio of the projected bounds
+    scale: float = size / max(lon_max - lon_min, y_max - y_min)
+    width: int = max(int(round((lon_max - lon_min) * scale)), 1)
+    height: int = max(int(round((y_max - y_min) * scale)), 1)
+    if not len(points):
+        return np.zeros((height, width), dtype=np.int64)
+    x: np.ndarray = (points[:, 1] - lon_min) * scale
+    y: np.ndarray = (y_max - mercator_y(points[:, 0])) * scale
+    # the segments between consecutive points of the same route
+    last: np.ndarray = np.zeros(len(points), dtype=bool)
+    last[offsets[1:] - 1] = True
+    start: np.ndarray = np.flatnonzero(~last[:-1])
+    dx: np.ndarray = x[start + 1] - x[start]
+    dy: np.ndarray = y[start + 1] - y[start]
+    # sample each segment about once per cell it crosses
+    samples: np.ndarray = np.minimum(np.ceil(np.maximum(np.abs(dx),
+                                                        np.abs(dy))),
+                                     width + height).astype(np.int64) + 1
+    segment: np.ndarray = np.repeat(np.arange(len(start)), samples)
+    step: np.ndarray = np.arange(len(segment)) - \
+        np.repeat(np.cumsum(samples) - samples, samples)
+    fraction: np.ndarray = step / np.repeat(np.maximum(samples - 1, 1),
+                                            samples)
+    columns: np.ndarray = np.floor(x[start][segment] +
+                                   fraction * dx[segment]).astype(np.int64)
+    rows: np.ndarray = np.floor(y[start][segment] +
+                                fraction * dy[segment]).astype(np.int64)
+    # add the single point routes
+    lonely: np.ndarray = offsets[:-1][np.diff(offsets) == 1]
+    columns = np.concatenate([columns, np.floor(x[lonely]).astype(np.int64)])
+    rows = np.concatenate([rows, np.floor(y[lonely]).astype(np.int64)])
+    inside: np.ndarray = (columns >= 0) & (columns < width) & \
+        (rows >= 0) & (rows < height)
+    counts: np.ndarray = np.bincount(rows[inside] * width + columns[inside],
+                                     minlength=height * width
+                                     ).reshape(height, width)
+    return counts
+
+
+def colorize(counts: np.ndarray,
+             colors: list[str] = backend.DISCRETE_COLOR_R) -> np.ndarray:
+    """
+    Color the density grid on a logarithmic scale, leaving the empty cells
+    transparent.
+
+    Parameters
+    ----------
+    counts : np.ndarray
+        The density grid.
+    colors : list[str], optional
+        The color scale as 'rgb(r,g,b)' strings. The default is
+        DISCRETE_COLOR_R.
+
+    Returns
+    -------
+    image : np.ndarray
+        The RGBA image of shape (height, width, 4).
+
+    """
+    stops: np.ndarray = np.array([[int(value)
+                                   for value in color[4:-1].split(",")]
+                                  for color in colors], dtype=np.float64)
+    # interpolate the color scale to a lookup table of 256 colors
+    positions: np.ndarray = np.linspace(0, 1, len(stops))
+    table: np.ndarray = np.stack([np.interp(np.linspace(0, 1, 256),
+                                            positions,
+                                            stops[:, channel])
+                                  for channel in range(3)],
+                                 axis=1).astype(np.uint8)
+    # start the occupied cells at a third of the scale to stand out on the map
+    density: np.ndarray = np.log1p(counts)
+    density = np.where(counts > 0,
+                       1 / 3 + 2 / 3 * density / max(density.max(), 1e-9),
+                       0)
+    image: np.ndarray = np.zeros(counts.shape + (4,), dtype=np.uint8)
+    image[..., :3] = table[(density * 255).astype(np.uint8)]
+    image[..., 3] = np.where(counts > 0, 128 + density * 127, 0)
+    return image
+
+
+def image_layer(image: np.ndarray,
+                bounds: tuple[float, float, float, float]) -> dict:
+    """
+    Create a mapbox layer to show an image over the bounds on the map.
+
+    Parameters
+    ----------
+    image : np.ndarray
+        The RGBA image.
+    bounds : tuple[float, float, float, float]
+        The minimum and maximum latitude and the minimum and maximum
+        longitude of the image.
+
+    Returns
+    -------
+    layer : dict
+        The layer for the mapbox layout.
+
+    """
+    buffer: io.BytesIO = io.BytesIO()
+    Image.fromarray(image).save(buffer, format="PNG")
+    source: str = base64.b64encode(buffer.getvalue()).decode("utf-8")
+    lat_min, lat_max, lon_min, lon_max = bounds
+    layer: dict = {"sourcetype": "image",
+                   "source": f"data:image/png;base64,{source}",
+                   "below": "traces",
+                   # the corners from the top left going clockwise
+                   "coordinates": [[lon_min, lat_max],
+                                   [lon_max, lat_max],
+                                   [lon_max, lat_min],
+                                   [lon_min, lat_min]]
+                   }
+    return layer
+
+
+def view_of(bounds: tuple[float, float, float, float],
+            height: int) -> tuple[dict, float]:
+    """
+    Determine the center and zoom level of the map to show the bounds.
+
+    Parameters
+    ----------
+    bounds : tuple[float, float, float, float]
+        The minimum and maximum latitude and the minimum and maximum
+        longitude.
+    height : int
+        The height of the map in pixels.
+
+    Returns
+    -------
+    center : dict
+        The center of the map.
+    zoom : float
+        The zoom level of the map.
+
+    """
+    lat_min, lat_max, lon_min, lon_max = bounds
+    y_min, y_max = mercator_y(np.array([lat_min, lat_max]))
+    center: dict = {"lat": (lat_min + lat_max) / 2,
+                    "lon": (lon_min + lon_max) / 2}
+    # a tile of 512 pixels shows 360 degrees at zoom level 0
+    span: float = max(lon_max - lon_min, y_max - y_min, 1e-6)
+    zoom: float = min(max(math.log2(360 / span * height / 512), 0), 18)
+    return center, zoom
+
+
+def grid_cells(lat: np.ndarray,
+               lon: np.ndarray,
+               zoom: float,
+               pixels: int = backend.CLUSTER_PIXELS) -> np.ndarray:
+    """
+    Index the points by the cell of a square grid on the web mercator map,
+    with cells of a fixed size on the screen at the zoom level.
+
+    Parameters
+    ----------
+    lat : np.ndarray
+        The latitudes in degrees.
+    lon : np.ndarray
+        The longitudes in degrees.
+    zoom : float
+        The zoom level of the map.
+    pixels : int, optional
+        The size of a cell in pixels. The default is CLUSTER_PIXELS.
+
+    Returns
+    -------
+    np.ndarray
+        The number of the cell of each point.
+
+    """
+    # a tile of 512 pixels shows 360 degrees at zoom level 0
+    cell: float = 360 * pixels / (512 * 2**zoom)
+    columns: np.ndarray = np.floor((np.asarray(lon) + 180) / cell)
+    rows: np.ndarray = np.floor((mercator_y(MAX_LATITUDE) -
+                                 mercator_y(np.asarray(lat))) / cell)
+    return (rows * math.ceil(360 / cell + 1) + columns).astype(np.int64)
+
+
+def cluster_starts(data: pd.DataFrame,
+                   zooms: dict[str, int] = backend.CLUSTER_ZOOMS,
+                   top: int = backend.CLUSTER_NAMES
+                   ) -> dict[str, pd.DataFrame]:
+    """
+    Aggregate the start points of the activities into one weighted marker
+    per grid cell for each of the zoom levels.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        The dataframe containing rows with a lat and a lon coordinate.
+    zooms : dict[str, int], optional
+        The zoom level per name of the level. The default is CLUSTER_ZOOMS.
+    top : int, optional
+        The amount of most frequent names per cluster. The default is
+        CLUSTER_NAMES.
+
+    Returns
+    -------
+    levels : dict[str, pd.DataFrame]
+        The clusters with their mean lat and lon, count and hover text per
+        name of the level.
+
+    """
+    starts: pd.DataFrame = data.loc[data["lat"].notna() &
+                                    data["lon"].notna(),
+                                    ["lat", "lon", "name"]]
+    starts = starts.assign(name=starts["name"].fillna("").astype(str))
+    levels: dict[str, pd.DataFrame] = {}
+    for level, zoom in zooms.items():
+        cells: pd.Series = pd.Series(grid_cells(starts["lat"].to_numpy(),
+                                                starts["lon"].to_numpy(),
+                                                zoom),
+                                     index=starts.index,
+                                     name="cell")
+        clusters: pd.DataFrame = starts.groupby(cells).agg(
+            lat=("lat", "mean"),
+            lon=("lon", "mean"),
+            count=("name", "size")
+                                                           )
+        # the most frequent names per cluster with their counts
+        names: pd.DataFrame = starts.groupby([cells, starts["name"]]).size() \
+            .rename("times").reset_index() \
+            .sort_values(["cell", "times"], ascending=[True, False]) \
+            .groupby("cell").head(top)
+        names["text"] = names["name"] + " (" + names["times"].astype(str) + ")"
+        clusters["text"] = "<b>" + clusters["count"].astype(str) + \
+            " activities</b><br>" + \
+            names.groupby("cell")["text"].agg("<br>".join)
+        levels[level] = clusters.reset_index(drop=True)
+    return levels
+
+
+class SpatialIndex:
+    """
+    A grid index over the route and start points of all activities.
+
+    The points are sorted by the number of their grid cell, so the points in a
+    range of cells along one row of the grid are found with a binary search.
+    A query scans the cells overlapping its bounding box and tests the exact
+    condition on the points in them only.
+    """
+
+    def __init__(self,
+                 data: pd.DataFrame,
+                 cell: float = backend.INDEX_CELL) -> None:
+        """
+        Parameters
+        ----------
+        data : pd.DataFrame
+            The dataframe containing the parsed activities.
+        cell : float, optional
+            The size of a grid cell in degrees. The default is INDEX_CELL.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.cell: float = cell
+        self.columns: int = math.ceil(360 / cell) + 1
+        self.labels: np.ndarray = data.index.to_numpy()
+        points, offsets = flatten_coords(data["coords"])
+        activities: np.ndarray = np.repeat(np.arange(len(data)),
+                                           np.diff(offsets))
+        # the start points, which are the only points without a route
+        starts: np.ndarray = data.loc[:, ["lat", "lon"]].to_numpy(
+            dtype=np.float64)
+        valid: np.ndarray = ~np.isnan(starts).any(axis=1)
+        points = np.concatenate([points, starts[valid]])
+        activities = np.concatenate([activities, np.flatnonzero(valid)])
+        keys: np.ndarray = self._keys(points[:, 0], points[:, 1])
+        order: np.ndarray = np.argsort(keys, kind="stable")
+        self.keys: np.ndarray = keys[order]
+        self.points: np.ndarray = points[order]
+        self.activities: np.ndarray = activities[order]
+
+    def _keys(self,
+              lat: np.ndarray,
+              lon: np.ndarray) -> np.ndarray:
+        """
+        Parameters
+        ----------
+        lat : np.ndarray
+            The latitudes in degrees.
+        lon : np.ndarray
+            The longitudes in degrees.
+
+        Returns
+        -------
+        np.ndarray
+            The number of the grid cell of each point.
+
+        """
+        rows: np.ndarray = np.floor((np.clip(lat, -90, 90) + 90) / self.cell)
+        columns: np.ndarray = np.floor((np.clip(lon, -180, 180) + 180) /
+                                       self.cell)
+        return (rows * self.columns + columns).astype(np.int64)
+
+    def _candidates(self,
+                    bounds: tuple[float, float, float, float]) -> np.ndarray:
+        """
+        Find the points in the grid cells overlapping the bounds.
+
+        Parameters
+        ----------
+        bounds : tuple[float, float, float, float]
+            The minimum and maximum latitude and the minimum and maximum
+            longitude.
+
+        Returns
+        -------
+        np.ndarray
+            The positions of the points in the index.
+
+        """
+        lat_min, lat_max, lon_min, lon_max = bounds
+        first, last = self._keys(np.array([lat_min, lat_max]),
+                                 np.array([lon_min, lon_max]))
+        # one range of keys per row of the grid
+        rows: np.ndarray = np.arange(first // self.columns,
+                                     last // self.columns + 1)
+        starts: np.ndarray = np.searchsorted(
+            self.keys,
+            rows * self.columns + first % self.columns,
+            side="left")
+        stops: np.ndarray = np.searchsorted(
+            self.keys,
+            rows * self.columns + last % self.columns,
+            side="right")
+        lengths: np.ndarray = stops - starts
+        return np.arange(lengths.sum()) + \
+            np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+
+    def _labels_of(self, positions: np.ndarray) -> np.ndarray:
+        """
+        Parameters
+        ----------
+        positions : np.ndarray
+            The positions of the points in the index.
+
+        Returns
+        -------
+        np.ndarray
+            The index labels of the activities of the points, in the order of
+            the dataframe.
+
+        """
+        # marking is faster than sorting the many points of the same routes
+        found: np.ndarray = np.zeros(len(self.labels), dtype=bool)
+        found[self.activities[positions]] = True
+        return self.labels[found]
+
+    def within_box(self,
+                   bounds: tuple[float, float, float, float]) -> np.ndarray:
+        """
+        Find the activities with a point inside a bounding box.
+
+        Parameters
+        ----------
+        bounds : tuple[float, float, float, float]
+            The minimum and maximum latitude and the minimum and maximum
+            longitude.
+
+        Returns
+        -------
+        np.ndarray
+            The index labels of the activities.
+
+        """
+        lat_min, lat_max, lon_min, lon_max = bounds
+        candidates: np.ndarray = self._candidates(bounds)
+        points: np.ndarray = self.points[candidates]
+        inside: np.ndarray = (points[:, 0] >= lat_min) & \
+            (points[:, 0] <= lat_max) & \
+            (points[:, 1] >= lon_min) & \
+            (points[:, 1] <= lon_max)
+        return self._labels_of(candidates[inside])
+
+    def within_distance(self,
+                        lat: float,
+                        lon: float,
+                        distance: float) -> np.ndarray:
+        """
+        Find the activities with a point within a distance of a location.
+
+        Parameters
+        ----------
+        lat : float
+            The latitude of the location in degrees.
+        lon : float
+            The longitude of the location in degrees.
+        distance : float
+            The distance in kilometers.
+
+        Returns
+        -------
+        np.ndarray
+            The index labels of the activities.
+
+        """
+        # the bounding box of the circle
+        lat_span: float = math.degrees(distance / EARTH_RADIUS)
+        lon_span: float = lat_span / max(math.cos(math.radians(lat)), 1e-6)
+        candidates: np.ndarray = self._candidates((lat - lat_span,
+                                                   lat + lat_span,
+                                                   lon - lon_span,
+                                                   lon + lon_span))
+        points: np.ndarray = np.radians(self.points[candidates])
+        # the haversine distance to the location
+        lat, lon = math.radians(lat), math.radians(lon)
+        half: np.ndarray = np.sin((points[:, 0] - lat) / 2)**2 + \
+            math.cos(lat) * np.cos(points[:, 0]) * \
+            np.sin((points[:, 1] - lon) / 2)**2
+        near: np.ndarray = 2 * EARTH_RADIUS * \
+            np.arcsin(np.sqrt(np.minimum(half, 1))) <= distance
+        return self._labels_of(candidates[near])
+
+    def within_polygon(self,
+                       polygon: list[tuple[float, float]]) -> np.ndarray:
+        """
+        Find the activities with a point inside a polygon.
+
+        Parameters
+        ----------
+        polygon : list[tuple[float, float]]
+            The (lat, lon) vertices of the polygon, which is closed from the
+            last to the first vertex.
+
+        Returns
+        -------
+        np.ndarray
+            The index labels of the activities.
+
+        """
+        vertices: np.ndarray = np.asarray(polygon,
+                                          dtype=np.float64).reshape(-1, 2)
+        edges: np.ndarray = np.hstack([vertices,
+                                       np.roll(vertices, -1, axis=0)])
+        lat_min, lon_min = vertices.min(axis=0)
+        lat_max, lon_max = vertices.max(axis=0)
+        candidates: np.ndarray = self._candidates((lat_min, lat_max,
+                                                   lon_min, lon_max))
+        # the points are tested in the order of their latitude
+        candidates = candidates[np.argsort(self.points[candidates, 0],
+                                           kind="stable")]
+        inside: np.ndarray = _inside(self.points[candidates], edges)
+        return self._labels_of(candidates[inside])
+
+    def within_selection(self,
+                         points: list[tuple[float, float]],
+                         distance: float = backend.NEAR_DISTANCE,
+                         polygon: list[tuple[float, float]] | None = None
+                         ) -> np.ndarray:
+        """
+        Find the activities near the points selected on the map, around a
+        single clicked point, inside the outline of a lasso selection or in
+        the bounding box of the selected points. The map only reports the
+        selected points of a box selection, so the box of the points padded
+        by the distance stands in for it, and likewise for a lasso selection
+        without its outline.
+
+        Parameters
+        ----------
+        points : list[tuple[float, float]]
+            The (lat, lon) points.
+        distance : float, optional
+            The distance in kilometers around the selection. The default is
+            NEAR_DISTANCE.
+        polygon : list[tuple[float, float]] | None, optional
+            The (lat, lon) outline of a lasso selection. The default is None.
+
+        Returns
+        -------
+        np.ndarray
+            The index labels of the activities.
+
+        """
+        if polygon is not None and len(polygon) >= 3:
+            return self.within_polygon(polygon)
+        if len(points) == 1:
+            return self.within_distance(*points[0], distance)
+        lat_min, lon_min = np.min(points, axis=0)
+        lat_max, lon_max = np.max(points, axis=0)
+        # pad the bounds of the selected points by the distance
+        lat_span: float = math.degrees(distance / EARTH_RADIUS)
+        lon_span: float = lat_span / max(
+            math.cos(math.radians(max(abs(lat_min), abs(lat_max)))), 1e-6)
+        return self.within_box((lat_min - lat_span,
+                                lat_max + lat_span,
+                                lon_min - lon_span,
+                                lon_max + lon_span))
+
+
+def country_polygons(geojson: dict) -> list[tuple[str, tuple, np.ndarray]]:
+    """
+    Convert the country features to arrays of the edges of their polygons.
+
+    Parameters
+    ----------
+    geojson : dict
+        The GeoJSON feature collection of the countries.
+
+    Returns
+    -------
+    polygons : list[tuple[str, tuple, np.ndarray]]
+        The name, the bounds as the minimum and maximum latitude and the
+        minimum and maximum longitude, and the (lat, lon, lat, lon) edges of
+        all rings of each country.
+
+    """
+    polygons: list = []
+    for feature in geojson.get("features", []):
+        geometry: dict = feature.get("geometry") or {}
+        # a polygon is a list of rings, a multipolygon a list of polygons
+        rings: list = geometry.get("coordinates", [])
+        if geometry.get("type") == "MultiPolygon":
+            rings = [ring for polygon in rings for ring in polygon]
+        elif geometry.get("type") != "Polygon":
+            continue
+        edges: np.ndarray = np.concatenate(
+            [np.hstack([ring[:-1, ::-1], ring[1:, ::-1]])
+             for ring in map(lambda ring: np.asarray(ring,
+                                                     dtype=np.float64)[:, :2],
+                             rings) if len(ring) > 1]
+            or [np.empty((0, 4))]
+                                           )
+        if not len(edges):
+            continue
+        bounds: tuple = (edges[:, 0].min(), edges[:, 0].max(),
+                         edges[:, 1].min(), edges[:, 1].max())
+        polygons.append((feature.get("properties", {}).get("ADMIN"),
+                         bounds,
+                         edges))
+    return polygons
+
+
+def _inside(points: np.ndarray,
+            edges: np.ndarray) -> np.ndarray:
+    """
+    Test which points are inside the rings of a polygon with the even-odd
+    rule, counting the edges crossed by a ray from each point to the east.
+
+    Parameters
+    ----------
+    points : np.ndarray
+        The (lat, lon) points sorted by latitude.
+    edges : np.ndarray
+        The (lat, lon, lat, lon) edges of the rings.
+
+    Returns
+    -------
+    np.ndarray
+        Whether each point is inside.
+
+    """
+    low: np.ndarray = np.minimum(edges[:, 0], edges[:, 2])
+    high: np.ndarray = np.maximum(edges[:, 0], edges[:, 2])
+    # only the points within the latitudes of an edge can cross it, which are
+    # a contiguous range of the sorted points
+    starts: np.ndarray = np.searchsorted(points[:, 0], low, side="left")
+    lengths: np.ndarray = np.searchsorted(points[:, 0], high,
+                                          side="left") - starts
+    crossings: np.ndarray = np.zeros(len(points), dtype=np.int64)
+    # limit the memory by testing groups of edges
+    groups: np.ndarray = np.cumsum(lengths) // MAX_PAIRS
+    for group in np.unique(groups):
+        selected: np.ndarray = np.flatnonzero((groups == group) &
+                                              (lengths > 0))
+        edge: np.ndarray = np.repeat(selected, lengths[selected])
+        point: np.ndarray = np.arange(len(edge)) + np.repeat(
+            starts[selected] - np.cumsum(lengths[selected]) +
+            lengths[selected],
+            lengths[selected])
+        lat1, lon1, lat2, lon2 = edges[edge].T
+        # the longitude where the edge crosses the latitude of the point
+        crossing: np.ndarray = lon1 + (points[point, 0] - lat1) * \
+            (lon2 - lon1) / (lat2 - lat1)
+        crossings += np.bincount(point[points[point, 1] < crossing],
+                                 minlength=len(points))
+    return crossings % 2 == 1
+
+
+def locate_points(points: np.ndarray,
+                  polygons: list[tuple[str, tuple, np.ndarray]],
+                  precision: float = backend.BORDER_PRECISION) -> np.ndarray:
+    """
+    Find the country of each point.
+
+    Parameters
+    ----------
+    points : np.ndarray
+        The (lat, lon) points.
+    polygons : list[tuple[str, tuple, np.ndarray]]
+        The countries as returned by country_polygons.
+    precision : float, optional
+        The resolution in degrees to which the points are rounded, so the many
+        nearby points of the routes are tested once. The default is
+        BORDER_PRECISION.
+
+    Returns
+    -------
+    owners : np.ndarray
+        The position of the country in the polygons or -1 per point.
+
+    """
+    # number the rounded points by one integer, which is much faster to make
+    # unique than the pairs of coordinates
+    columns: int = int(round(360 / precision)) + 1
+    rounded: np.ndarray = np.round((points + [90, 180]) / precision
+                                   ).astype(np.int64)
+    cells, inverse = np.unique(rounded[:, 0] * columns + rounded[:, 1],
+                               return_inverse=True)
+    unique: np.ndarray = np.stack([cells // columns, cells % columns],
+                                  axis=1) * precision - [90, 180]
+    # sort the points by latitude to find the candidates by binary search
+    order: np.ndarray = np.argsort(unique[:, 0], kind="stable")
+    unique = unique[order]
+    owners: np.ndarray = np.full(len(unique), -1, dtype=np.int64)
+    for position, (_, bounds, edges) in enumerate(polygons):
+        lat_min, lat_max, lon_min, lon_max = bounds
+        first, last = np.searchsorted(unique[:, 0], [lat_min, lat_max],
+                                      side="left")
+        # the points in the bounds of the country without an owner yet
+        candidates: np.ndarray = first + np.flatnonzero(
+            (unique[first:last, 1] >= lon_min) &
+            (unique[first:last, 1] <= lon_max) &
+            (owners[first:last] < 0))
+        if not len(candidates):
+            continue
+        inside: np.ndarray = _inside(unique[candidates], edges)
+        owners[candidates[inside]] = position
+    # back to the order of the unique points and then of all points
+    located: np.ndarray = np.empty_like(owners)
+    located[order] = owners
+    return located[inverse.ravel()]
+
+
+def start_countries(data: pd.DataFrame,
+                    geojson: dict | None = None) -> pd.Series:
+    """
+    Attribute the start point of every activity to a country offline, instead
+    of a reverse lookup per activity.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        The dataframe containing the parsed activities.
+    geojson : dict | None, optional
+        The GeoJSON feature collection of the countries. The default is None,
+        which loads it from PATH_GEOJSON.
+
+    Returns
+    -------
+    countries : pd.Series
+        The country of the start point per activity, "undefined" if it lies
+        in no country and missing for activities without a start point.
+
+    """
+    if geojson is None:
+        geojson = backend.load_geojson(backend.PATH_GEOJSON)
+    polygons: list = country_polygons(geojson)
+    points: np.ndarray = data[["lat", "lon"]].to_numpy(dtype=np.float64,
+                                                       na_value=np.nan)
+    located: np.ndarray = ~np.isnan(points).any(axis=1)
+    owners: np.ndarray = locate_points(points[located], polygons) \
+        if located.any() and polygons else np.full(located.sum(), -1)
+    names: np.ndarray = np.array([name for name, _, _ in polygons]
+                                 + ["undefined"], dtype=object)
+    countries: pd.Series = pd.Series(None,
+                                     index=data.index,
+                                     name="country",
+                                     dtype=object)
+    countries[located] = names[owners]
+    return countries
+
+
+def visited_countries(data: pd.DataFrame,
+                      geojson: dict | None = None) -> pd.Series:
+    """
+    Attribute every point of the routes to a country to find all countries
+    an activity passes through.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        The dataframe containing the parsed activities.
+    geojson : dict | None, optional
+        The GeoJSON feature collection of the countries. The default is None,
+        which loads it from PATH_GEOJSON.
+
+    Returns
+    -------
+    countries : pd.Series
+        The tuple of the visited countries per activity, or of the country of
+        the start point for activities without a route.
+
+    """
+    if geojson is None:
+        geojson = backend.load_geojson(backend.PATH_GEOJSON)
+    polygons: list = country_polygons(geojson)
+    points, offsets = flatten_coords(data["coords"])
+    activities: np.ndarray = np.repeat(np.arange(len(data)),
+                                       np.diff(offsets))
+    owners: np.ndarray = locate_points(points, polygons) \
+        if len(points) and polygons else np.full(len(points), -1)
+    # the distinct pairs of activities and countries
+    pairs: np.ndarray = np.unique(activities[owners >= 0] * len(polygons) +
+                                  owners[owners >= 0])
+    names: list = [name for name, _, _ in polygons]
+    visited: list = [()] * len(data)
+    for activity, group in itertools.groupby(pairs.tolist(),
+                                             key=lambda pair:
+                                                 pair // len(polygons)):
+        visited[activity] = tuple(names[pair % len(polygons)]
+                                  for pair in group)
+    # fall back to the start country if no point lies in a country
+    countries: pd.Series = pd.Series(
+        [found or ((country,) if isinstance(country, str) else ())
+         for found, country in zip(visited, data["country"])],
+        index=data.index,
+        name="countries",
+        dtype=object)
+    return countries
+
+
+def heatmap_layer(data: pd.DataFrame,
+                  height: int,
+                  region: str | None = None) -> tuple[dict, dict, float]:
+    """
+    Rasterize the routes in a region to a density image layer for the map,
+    so the size of the figure does not grow with the amount of activities.
+    The image has a fixed resolution for the bounds of the region, zooming
+    into the map does not rasterize the viewport anew as the app is not told
+    about the zoom, so a country is chosen for more detail instead.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        The dataframe containing rows with a lat and a lon coordinate.
+    height : int
+        The height of the map in pixels.
+    region : str | None, optional
+        The country to rasterize the routes of. The default is None, which
+        rasterizes the routes of all activities.
+
+    Returns
+    -------
+    layer : dict
+        The layer for the mapbox layout.
+    center : dict
+        The center of the map.
+    zoom : float
+        The zoom level of the map.
+
+    """
+    points, offsets = flatten_coords(data["coords"])
+    if not len(points):
+        return {}, {"lat": 0, "lon": 0}, 1
+    # the bounds of the region, the routes crossing it are drawn as well
+    regional: pd.Series = data["country"] == region
+    bounds = route_bounds(flatten_coords(data.loc[regional, "coords"])[0]
+                          if region and regional.any() else points)
+    layer: dict = image_layer(colorize(rasterize(points, offsets, bounds)),
+                              bounds)
+    center, zoom = view_of(bounds, height)
+    return layer, center, zoom
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,639 @@
+# -*- coding: utf-8 -*-
+"""
+@author: QtyPython2020
+
+The server-wide store of the parsed datasets of all sessions.
+
+The session state only holds a handle to a dataset. The store keeps the most
+recently used datasets in memory under a global byte budget and spills the
+others to Arrow IPC files, which are memory mapped when the handle is requested
+again. The sessions end without notice, so the spilled files which were not
+used for a while, or the least recently used beyond a disk budget, are removed.
+"""
+# Standard library
+import collections
+import os
+import sys
+import threading
+import time
+import typing
+import uuid
+# Third party
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+# Local imports
+import backend
+
+# the memory of one decoded coordinate, a tuple of two floats
+BYTES_PER_POINT: int = sys.getsizeof((0., 0.)) + 2 * sys.getsizeof(0.)
+# the Arrow type of the coordinates as written by _coords_to_arrow
+COORDS_TYPE: pa.DataType = pa.list_(pa.list_(pa.float64(), 2))
+
+
+def dataset_size(dataframe: pd.DataFrame) -> int:
+    """
+    Estimate the memory of a dataset including the decoded coordinates, which
+    are not counted by the deep memory usage of pandas.
+
+    Parameters
+    ----------
+    dataframe : pd.DataFrame
+        The dataframe containing the parsed activities.
+
+    Returns
+    -------
+    size : int
+        The estimated amount of bytes.
+
+    """
+    size: int = int(dataframe.memory_usage(index=True, deep=True).sum())
+    if "coords" in dataframe.columns:
+        for coords in dataframe["coords"]:
+            # lists of tuples after parsing, arrays after loading from disk
+            if isinstance(coords, np.ndarray):
+                size += coords.nbytes
+            elif isinstance(coords, (list, tuple)):
+                size += len(coords) * BYTES_PER_POINT
+    return size
+
+
+def derived_size(derived: typing.Any, dataframe: pd.DataFrame) -> int:
+    """
+    Estimate the memory of a structure derived from a dataset by following its
+    containers and attributes. Every object is counted once and the dataset,
+    which is already counted by dataset_size, is not counted.
+
+    Parameters
+    ----------
+    derived : typing.Any
+        The derived structure.
+    dataframe : pd.DataFrame
+        The dataset the structure was derived from.
+
+    Returns
+    -------
+    size : int
+        The estimated amount of bytes.
+
+    """
+    size: int = 0
+    seen: set[int] = {id(dataframe)}
+    pending: list = [derived]
+    while pending:
+        if id(value := pending.pop()) in seen:
+            continue
+        seen.add(id(value))
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            size += int(np.sum(value.memory_usage(index=True, deep=True)))
+        elif isinstance(value, pd.Index):
+            size += value.memory_usage(deep=True)
+        elif isinstance(value, np.ndarray):
+            size += value.nbytes
+            if value.dtype == object:
+                pending.extend(value.ravel())
+        elif isinstance(value, (pa.Array, pa.ChunkedArray, pa.Table)):
+            size += value.nbytes
+        elif isinstance(value, dict):
+            size += sys.getsizeof(value)
+            pending.extend(value.keys())
+            pending.extend(value.values())
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            size += sys.getsizeof(value)
+            pending.extend(value)
+        # the indexes are plain objects holding arrays
+        elif hasattr(value, "__dict__") and not isinstance(value, type):
+            size += sys.getsizeof(value)
+            pending.extend(vars(value).values())
+        else:
+            size += sys.getsizeof(value)
+    return size
+
+
+def _coords_to_arrow(coords: pd.Series) -> pa.ListArray:
+    """
+    Store the ragged coordinates as one flat array of points and the offsets
+    of each activity into it.
+
+    Parameters
+    ----------
+    coords : pd.Series
+        The column with the list of (lat, lon) points or None per activity.
+
+    Returns
+    -------
+    pa.ListArray
+        The list of fixed size lists of two doubles per activity.
+
+    """
+    present: list[bool] = [len(row) > 0 if isinstance(row, (list,
+                                                            tuple,
+                                                            np.ndarray))
+                           else False
+                           for row in coords]
+    lengths: np.ndarray = np.array([len(row) if has else 0
+                                    for row, has in zip(coords, present)],
+                                   dtype=np.int32)
+    offsets: np.ndarray = np.concatenate([[0], np.cumsum(lengths)])
+    points: np.ndarray = np.concatenate(
+        [np.asarray(row, dtype=np.float64).reshape(-1, 2)
+         for row, has in zip(coords, present) if has]
+        or [np.empty((0, 2))]
+                                        )
+    # a missing offset at the start of a row marks the row as null
+    starts: pa.Array = pa.array(offsets,
+                                type=pa.int32(),
+                                mask=np.append(~np.array(present,
+                                                         dtype=bool),
+                                               False)
+                                )
+    return pa.ListArray.from_arrays(
+        starts,
+        pa.FixedSizeListArray.from_arrays(points.ravel(), 2)
+                                    )
+
+
+def _coords_from_arrow(column: pa.ChunkedArray) -> list:
+    """
+    Split the flat points back into one array of (lat, lon) points per
+    activity. The arrays are views on the loaded, possibly memory-mapped,
+    buffer so no points are copied.
+
+    Parameters
+    ----------
+    column : pa.ChunkedArray
+        The coordinates as written by _coords_to_arrow.
+
+    Returns
+    -------
+    coords : list
+        An array of shape (points, 2) or None per activity.
+
+    """
+    coords: list = []
+    for chunk in column.chunks:
+        offsets: np.ndarray = chunk.offsets.to_numpy()
+        points: np.ndarray = chunk.values.values.to_numpy(
+            zero_copy_only=True).reshape(-1, 2)
+        nulls: np.ndarray = chunk.is_null().to_numpy(zero_copy_only=False)
+        coords.extend(None if null else points[start:stop]
+                      for start, stop, null in zip(offsets[:-1],
+                                                   offsets[1:],
+                                                   nulls)
+                      )
+    return coords
+
+
+def save_dataset(dataframe: pd.DataFrame,
+                 path: str | None = None) -> bytes | None:
+    """
+    Write a dataset to an uncompressed Arrow IPC file, which can be memory
+    mapped when it is loaded.
+
+    Parameters
+    ----------
+    dataframe : pd.DataFrame
+        The dataframe containing the parsed activities.
+    path : str | None, optional
+        The filepath of the Arrow file. The default is None, which returns the
+        file as bytes instead.
+
+    Returns
+    -------
+    bytes | None
+        The contents of the file if no path is provided.
+
+    """
+    columns: list[str] = [column for column in dataframe.columns
+                          if column != "coords"]
+    table: pa.Table = pa.Table.from_pandas(dataframe.loc[:, columns],
+                                           preserve_index=False)
+    if "coords" in dataframe.columns:
+        table = table.append_column("coords",
+                                    _coords_to_arrow(dataframe["coords"]))
+    sink = pa.BufferOutputStream() if path is None else pa.OSFile(path, "wb")
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes() if path is None else None
+
+
+def load_dataset(source: str | bytes) -> pd.DataFrame:
+    """
+    Read a dataset from an Arrow IPC file. A file on disk is memory mapped.
+
+    Parameters
+    ----------
+    source : str | bytes
+        The filepath or the contents of the Arrow file.
+
+    Raises
+    ------
+    ValueError
+        If the source is not an Arrow file or its coordinates have another
+        type.
+
+    Returns
+    -------
+    dataframe : pd.DataFrame
+        The dataframe containing the parsed activities.
+
+    """
+    buffer = pa.memory_map(source, "r") if isinstance(source, str) \
+        else pa.BufferReader(source)
+    table: pa.Table = pa.ipc.open_file(buffer).read_all()
+    coords: pa.ChunkedArray | None = None
+    if "coords" in table.column_names:
+        coords = table.column("coords")
+        if coords.type != COORDS_TYPE:
+            raise ValueError(f"coords has the type {coords.type} instead of "
+                             f"{COORDS_TYPE}")
+        table = table.select([column for column in table.column_names
+                              if column != "coords"])
+    dataframe: pd.DataFrame = table.to_pandas()
+    if coords is not None:
+        dataframe["coords"] = _coords_from_arrow(coords)
+    return dataframe
+
+
+def validate_dataset(dataframe: pd.DataFrame,
+                     schema: dict = backend.STRAVA_SCHEMA) -> None:
+    """
+    Check that a loaded dataset has the columns of the parsed activities with
+    their declared dtypes, as a file from elsewhere can contain any table.
+
+    Parameters
+    ----------
+    dataframe : pd.DataFrame
+        The loaded dataset.
+    schema : dict, optional
+        The mapper of column names to dtypes. The default is STRAVA_SCHEMA.
+
+    Raises
+    ------
+    ValueError
+        If columns are missing or have other dtypes.
+
+    Returns
+    -------
+    None.
+
+    """
+    missing: list[str] = [column for column in schema
+                          if column not in dataframe.columns]
+    if missing:
+        raise ValueError(f"missing columns: {', '.join(missing)}")
+    mismatched: list[str] = [f"{column} is {dataframe[column].dtype} instead "
+                             f"of {dtype}"
+                             for column, dtype in schema.items()
+                             if str(dataframe[column].dtype) != dtype]
+    if mismatched:
+        raise ValueError(", ".join(mismatched))
+
+
+class DatasetStore:
+    """
+    A least recently used store of datasets with a global byte budget.
+
+    Datasets are immutable once stored, so a dataset that was spilled before is
+    only written to disk once and dropped from memory on later evictions. For
+    the same reason the structures derived from a dataset, like its indexes,
+    are built once and kept until the dataset leaves memory. Their bytes are
+    charged to the dataset, so they count towards the budget and are freed
+    with it.
+    """
+
+    def __init__(self,
+                 budget: int = backend.STORE_BUDGET,
+                 directory: str = backend.PATH_STORE,
+                 spill_age: float = backend.STORE_SPILL_AGE,
+                 spill_budget: int = backend.STORE_SPILL_BUDGET) -> None:
+        """
+        Parameters
+        ----------
+        budget : int, optional
+            The amount of bytes to keep in memory. The default is
+            STORE_BUDGET.
+        directory : str, optional
+            The directory for the spilled datasets. The default is PATH_STORE.
+        spill_age : float, optional
+            The seconds a spilled dataset is kept after its last use. The
+            default is STORE_SPILL_AGE.
+        spill_budget : int, optional
+            The amount of bytes of the spilled datasets on disk. The default
+            is STORE_SPILL_BUDGET.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.budget: int = budget
+        self.directory: str = directory
+        self.spill_age: float = spill_age
+        self.spill_budget: int = spill_budget
+        os.makedirs(directory, exist_ok=True)
+        # handles in order of use, the most recently used last
+        self._memory: collections.OrderedDict = collections.OrderedDict()
+        # the bytes of the dataset and of its derived structures per handle
+        self._sizes: dict[str, int] = {}
+        # the derived structure and its bytes per name per handle
+        self._derived: dict[str, dict[str, tuple[typing.Any, int]]] = {}
+        self._lock: threading.Lock = threading.Lock()
+        # the files left by a previous run of the server
+        with self._lock:
+            self._prune()
+
+    def _path(self, handle: str) -> str:
+        """
+        Parameters
+        ----------
+        handle : str
+            The handle of the dataset.
+
+        Returns
+        -------
+        str
+            The filepath of the spilled dataset.
+
+        """
+        return os.path.join(self.directory, f"{handle}.arrow")
+
+    def _prune(self) -> None:
+        """
+        Remove the spilled datasets which were not used within the spill age
+        and the least recently used ones beyond the spill budget, but always
+        keep the most recently used file. Must be called while holding the
+        lock.
+
+        Returns
+        -------
+        None.
+
+        """
+        # the time of the last use and the size per file, the oldest first
+        files: list[tuple[float, int, str]] = sorted(
+            (entry.stat().st_mtime, entry.stat().st_size, entry.path)
+            for entry in os.scandir(self.directory)
+            if entry.is_file() and entry.name.endswith(".arrow"))
+        expired: float = time.time() - self.spill_age
+        total: int = sum(size for _, size, _ in files)
+        for used, size, path in files[:-1]:
+            if used > expired and total <= self.spill_budget:
+                break
+            try:
+                os.remove(path)
+            # a file still mapped on some platforms is removed later
+            except OSError:
+                continue
+            total -= size
+        backend.METRICS.set("store_spilled_bytes", total)
+
+    def _evict(self) -> None:
+        """
+        Spill the least recently used datasets until the budget is met, but
+        always keep the most recently used dataset in memory. Must be called
+        while holding the lock.
+
+        Returns
+        -------
+        None.
+
+        """
+        evicted: bool = False
+        while len(self._memory) > 1 and self.in_memory() > self.budget:
+            handle, dataframe = self._memory.popitem(last=False)
+            if not os.path.exists(path := self._path(handle)):
+                save_dataset(dataframe, path)
+            # the age of a file counts from its last use
+            else:
+                os.utime(path)
+            self._sizes.pop(handle)
+            self._derived.pop(handle, None)
+            evicted = True
+        if evicted:
+            self._prune()
+        backend.METRICS.set("store_bytes", self.in_memory())
+
+    def in_memory(self) -> int:
+        """
+        Returns
+        -------
+        int
+            The amount of bytes of the datasets held in memory and of the
+            structures derived from them.
+
+        """
+        return sum(self._sizes.values())
+
+    def put(self, dataframe: pd.DataFrame) -> str:
+        """
+        Add a dataset to the store.
+
+        Parameters
+        ----------
+        dataframe : pd.DataFrame
+            The dataframe containing the parsed activities.
+
+        Returns
+        -------
+        handle : str
+            The handle to retrieve the dataset with.
+
+        """
+        handle: str = uuid.uuid4().hex
+        with self._lock:
+            self._memory[handle] = dataframe
+            self._sizes[handle] = dataset_size(dataframe)
+            self._evict()
+        return handle
+
+    def get(self, handle: str) -> pd.DataFrame | None:
+        """
+        Retrieve a dataset from memory or reload it from disk.
+
+        Parameters
+        ----------
+        handle : str
+            The handle returned when the dataset was added.
+
+        Returns
+        -------
+        pd.DataFrame | None
+            The dataset or None if the handle is unknown.
+
+        """
+        backend.METRICS.inc("cache_requests_total", cache="datasets")
+        with self._lock:
+            if handle in self._memory:
+                self._memory.move_to_end(handle)
+                return self._memory[handle]
+            backend.METRICS.inc("cache_misses_total", cache="datasets")
+            if not os.path.exists(path := self._path(handle)):
+                return None
+            # the file is now the most recently used one and is not pruned
+            os.utime(path)
+        # read outside of the lock so other sessions are not blocked
+        try:
+            dataframe: pd.DataFrame = load_dataset(path)
+        # removed by discard in the meantime
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            # another session reloaded the dataset in the meantime
+            if handle in self._memory:
+                self._memory.move_to_end(handle)
+                return self._memory[handle]
+            self._memory[handle] = dataframe
+            self._sizes[handle] = dataset_size(dataframe)
+            self._evict()
+        return dataframe
+
+    def derive(self,
+               handle: str,
+               name: str,
+               builder: typing.Callable[[pd.DataFrame], typing.Any]
+               ) -> typing.Any:
+        """
+        Retrieve a structure derived from a dataset, which is built the first
+        time it is requested.
+
+        Parameters
+        ----------
+        handle : str
+            The handle returned when the dataset was added.
+        name : str
+            The name of the derived structure.
+        builder : typing.Callable[[pd.DataFrame], typing.Any]
+            The function building the structure from the dataset.
+
+        Returns
+        -------
+        typing.Any
+            The derived structure or None if the handle is unknown.
+
+        """
+        backend.METRICS.inc("cache_requests_total", cache="derived")
+        with self._lock:
+            if name in self._derived.get(handle, {}):
+                return self._derived[handle][name][0]
+        backend.METRICS.inc("cache_misses_total", cache="derived")
+        if (dataframe := self.get(handle)) is None:
+            return None
+        # build outside of the lock so other sessions are not blocked
+        derived: typing.Any = builder(dataframe)
+        self.replace(handle, name, derived, dataframe)
+        return derived
+
+    def replace(self,
+                handle: str,
+                name: str,
+                derived: typing.Any,
+                dataframe: pd.DataFrame | None = None) -> None:
+        """
+        Store a structure derived from a dataset in memory, replacing the one
+        with the same name, and charge its bytes to the dataset. Nothing is
+        stored if the dataset is not in memory.
+
+        Parameters
+        ----------
+        handle : str
+            The handle returned when the dataset was added.
+        name : str
+            The name of the derived structure.
+        derived : typing.Any
+            The derived structure.
+        dataframe : pd.DataFrame | None, optional
+            The dataset the structure was derived from. The default is None,
+            which looks up the dataset in memory.
+
+        Returns
+        -------
+        None.
+
+        """
+        with self._lock:
+            if handle not in self._memory:
+                return
+            dataframe = self._memory[handle] if dataframe is None \
+                else dataframe
+        # measured outside of the lock as it visits every object
+        size: int = derived_size(derived, dataframe)
+        with self._lock:
+            # evicted in the meantime, the structure is dropped with it
+            if handle not in self._memory:
+                return
+            previous: tuple | None = self._derived.setdefault(handle, {})\
+                .get(name)
+            self._derived[handle][name] = (derived, size)
+            self._sizes[handle] += size - (previous[1] if previous else 0)
+            self._evict()
+
+    def export(self, handle: str) -> bytes:
+        """
+        Retrieve the contents of the Arrow file of a dataset, which is written
+        once if the dataset has not been spilled before.
+
+        Parameters
+        ----------
+        handle : str
+            The handle returned when the dataset was added.
+
+        Returns
+        -------
+        bytes
+            The contents of the Arrow file or empty bytes if the handle is
+            unknown.
+
+        """
+        with self._lock:
+            path: str = self._path(handle)
+            if not os.path.exists(path):
+                if handle not in self._memory:
+                    return b""
+                save_dataset(self._memory[handle], path)
+            else:
+                os.utime(path)
+        with open(path, "rb") as file:
+            contents: bytes = file.read()
+        return contents
+
+    def discard(self, handle: str) -> None:
+        """
+        Remove a dataset from memory and disk.
+
+        Parameters
+        ----------
+        handle : str
+            The handle returned when the dataset was added.
+
+        Returns
+        -------
+        None.
+
+        """
+        with self._lock:
+            self._memory.pop(handle, None)
+            self._sizes.pop(handle, None)
+            self._derived.pop(handle, None)
+            if os.path.exists(path := self._path(handle)):
+                os.remove(path)
+            backend.METRICS.set("store_bytes", self.in_memory())
+
+
+@st.cache_resource
+def get_store() -> DatasetStore:
+    """
+    Create the single store shared by all sessions of the server.
+
+    Returns
+    -------
+    DatasetStore
+        The dataset store.
+
+    """
+    return DatasetStore()
+
+
+if __name__ == "__main__":
+    pass
@@ -15,6 +15,27 @@ import backend
 COUNTRIES = backend.load_country_code_mapper(backend.PATH_CODES)
 
 
+class StravaError(RuntimeError):
+    """
+    The Strava API returned an error message instead of activities.
+    """
+
+    def __init__(self, response: dict) -> None:
+        """
+        Parameters
+        ----------
+        response : dict
+            The error message of the Strava API.
+
+        Returns
+        -------
+        None.
+
+        """
+        super().__init__(response.get("message", str(response)))
+        self.response: dict = response
+
+
 def get_access(authorization_code: str) -> tuple[str]:
     """
     Given the authorization code in the redirect link get the tokens and the
@@ -35,6 +56,8 @@ def get_access(authorization_code: str) -> tuple[str]:
         The combined first and last name of the athlete.
     created_at : str
         The Strava profile creation date.
+    athlete_id : int
+        The Strava id of the athlete.
     """
     response: dict = backend.post_request(backend.TOKEN_LINK,
                                           data={
@@ -57,7 +80,8 @@ def get_access(authorization_code: str) -> tuple[str]:
                                  )
     created_at: str = response.get("athlete",
                                    {}).get("created_at", "Not found")
-    return access_token, refresh_token, athlete_name, created_at
+    athlete_id: int = response.get("athlete", {}).get("id")
+    return access_token, refresh_token, athlete_name, created_at, athlete_id
 
 
 def refresh_access(refresh_token: str) -> tuple[str]:
@@ -80,6 +104,8 @@ def refresh_access(refresh_token: str) -> tuple[str]:
         The Strava refresh token.
     created_at : str
         The Strava profile creation date.
+    athlete_id : int
+        The Strava id of the athlete.
     """
     response: dict = backend.post_request(backend.TOKEN_LINK,
                                           data={
@@ -101,7 +127,8 @@ def refresh_access(refresh_token: str) -> tuple[str]:
                                   )
                                  )
     created_at: str = athlete.get("created_at", "Not found")
-    return access_token, refresh_token, athlete_name, created_at
+    athlete_id: int = athlete.get("id")
+    return access_token, refresh_token, athlete_name, created_at, athlete_id
 
 
 @st.cache_data
@@ -122,6 +149,8 @@ def nomimatim_lookup(lat: str, lon: str) -> dict:
         The Nominatim API response containing the country code.
 
     """
+    # only runs when the lookup is not cached
+    backend.METRICS.inc("cache_misses_total", cache="nominatim")
     response: dict = backend.get_request(backend.NOMINATIM_LINK,
                                          params={"lat": lat,
                                                  "lon": lon,
@@ -155,14 +184,60 @@ def locate_country(lat: str,
         The country name.
 
     """
-    response: dict = nomimatim_lookup(lat, lon)
+    backend.METRICS.inc("cache_requests_total", cache="nominatim")
+    with backend.stage("locate_country", rows=1):
+        response: dict = nomimatim_lookup(lat, lon)
     country_code: str = response.get("address", {}).get("country_code", "")
     country: str = COUNTRIES.get(country_code.upper(),
                                  "undefined")
     return country
 
 
-def parse(activities: list[dict]) -> pd.DataFrame:
+def enforce_schema(dataframe: pd.DataFrame,
+                   schema: dict = backend.STRAVA_SCHEMA) -> pd.DataFrame:
+    """
+    Cast the columns of the parsed activities to the declared dtypes. Columns
+    that are missing, for instance the coordinates when none of the activities
+    has a polyline, are added as empty columns.
+
+    Parameters
+    ----------
+    dataframe : pd.DataFrame
+        The dataframe containing the parsed activities.
+    schema : dict, optional
+        The mapper of column names to dtypes. The default is STRAVA_SCHEMA.
+
+    Returns
+    -------
+    dataframe : pd.DataFrame
+        The dataframe with the compact dtypes.
+
+    """
+    dataframe = dataframe.copy()
+    for column, dtype in schema.items():
+        # add the missing column filled with missing values
+        if column not in dataframe.columns:
+            dataframe[column] = None
+        # skip the columns that already have the right dtype
+        if str(dataframe[column].dtype) == dtype:
+            continue
+        if dtype.startswith("datetime64"):
+            # convert Python date objects to a native datetime column, which
+            # is aware of the time zone for the UTC dtype also when the column
+            # is empty or holds naive times
+            dataframe[column] = pd.to_datetime(dataframe[column],
+                                               utc=dtype.endswith("UTC]"))
+        elif dtype.startswith("timedelta64"):
+            # convert Python time objects to the duration since midnight
+            dataframe[column] = pd.to_timedelta(
+                dataframe[column].astype(str))
+        else:
+            dataframe[column] = dataframe[column].astype(dtype)
+    return dataframe
+
+
+def parse(activities: list[dict],
+          lookup: bool = True) -> pd.DataFrame:
     """
     Parse the Strava activities for use in the dashboard.
 
@@ -173,6 +248,10 @@ def parse(activities: list[dict]) -> pd.DataFrame:
     ----------
     activities : list[dict]
         List of API responses containing the activities.
+    lookup : bool, optional
+        Whether to look up the country of each activity with the Nominatim
+        API, otherwise the country is left empty to be attributed by the
+        caller. The default is True.
 
     Returns
     -------
@@ -216,9 +295,11 @@ def parse(activities: list[dict]) -> pd.DataFrame:
                              )
                         )
         # if there is a polyline for the activity add the individual
-        # coordinates to the activity and lookup the country name
-        if elements.get("polyline"):
+        # coordinates to the activity and lookup the country name, the
+        # activities from a bulk export already provide the coordinates
+        if elements.get("polyline") or activity.get("coords"):
             elements.update({"coords":
+                             activity.get("coords") or
                              polyline.decode(
                                  # make a raw string from the polyline
                                  expression=fr"{elements.get('polyline')}",
@@ -247,7 +328,7 @@ def parse(activities: list[dict]) -> pd.DataFrame:
                                                           elements.get("lon")]
                                                          )
                                                  )
-                                              )
+                                              ) if lookup else None
                              }
                             )
         parsed_activities.append(elements)
@@ -255,8 +336,14 @@ def parse(activities: list[dict]) -> pd.DataFrame:
     dataframe: pd.DataFrame = pd.DataFrame(parsed_activities)
     # add the label Strava to each activity
     dataframe["app"]: pd.Series = "Strava"
-    return dataframe
+    # enforce the compact dtypes
+    return enforce_schema(dataframe)
 
 
 if __name__ == "__main__":
-    pass
+    # the memory per activity of the records as pandas infers them, like
+    # parse builds them, and with the compact dtypes
+    demo: pd.DataFrame = pd.DataFrame(
+        backend.load_demo_data().to_dict("records"))
+    print(f"memory per activity: {backend.memory_per_row(demo):.0f} -> "
+          f"{backend.memory_per_row(enforce_schema(demo)):.0f} bytes")
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+@author: QtyPython2020
+
+Download the full resolution GPS streams of activities and cache them on disk.
+
+The streams are cached per activity id as arrays of the coordinates multiplied
+by 1e5 and stored as 32 bit integers, the same precision as the polylines of
+Strava. Activities without a GPS stream are cached as empty arrays so they are
+not requested again. The streams not used for a while, or the least recently
+used beyond a disk budget, are removed from the cache.
+"""
+# Standard library
+import collections
+import os
+import threading
+import time
+# Third party
+import numpy as np
+import pandas as pd
+import requests
+# Local imports
+import backend
+
+# the precision of the cached coordinates
+PRECISION: float = 1e5
+# the moments of the recent requests, shared by all sessions as the rate limit
+# of the Strava API applies to the app and not to the athlete
+_REQUESTS: collections.deque = collections.deque()
+_LOCK: threading.Lock = threading.Lock()
+
+
+def stream_path(activity_id: int) -> str:
+    """
+    Parameters
+    ----------
+    activity_id : int
+        The Strava activity id.
+
+    Returns
+    -------
+    str
+        The filepath of the cached stream.
+
+    """
+    return os.path.join(backend.PATH_STREAMS, f"{activity_id}.npy")
+
+
+def load_stream(activity_id: int) -> np.ndarray | None:
+    """
+    Load the cached stream of an activity.
+
+    Parameters
+    ----------
+    activity_id : int
+        The Strava activity id.
+
+    Returns
+    -------
+    np.ndarray | None
+        The (lat, lon) points or None if the stream is not cached.
+
+    """
+    if not os.path.exists(path := stream_path(activity_id)):
+        return None
+    # the age of a stream counts from its last use
+    os.utime(path)
+    return np.load(path) / PRECISION
+
+
+def save_stream(activity_id: int,
+                points: list[list[float]]) -> np.ndarray:
+    """
+    Cache the stream of an activity.
+
+    Parameters
+    ----------
+    activity_id : int
+        The Strava activity id.
+    points : list[list[float]]
+        The (lat, lon) points.
+
+    Returns
+    -------
+    np.ndarray
+        The (lat, lon) points at the cached precision.
+
+    """
+    os.makedirs(backend.PATH_STREAMS, exist_ok=True)
+    quantized: np.ndarray = np.round(np.asarray(points,
+                                                dtype=np.float64
+                                                ).reshape(-1, 2)
+                                     * PRECISION).astype(np.int32)
+    # write to a temporary file first so no half written file is read
+    temporary: str = f"{stream_path(activity_id)}.{threading.get_ident()}"
+    with open(temporary, "wb") as file:
+        np.save(file, quantized)
+    os.replace(temporary, stream_path(activity_id))
+    return quantized / PRECISION
+
+
+def prune_streams(age: float = backend.STREAMS_CACHE_AGE,
+                  budget: int = backend.STREAMS_CACHE_BYTES) -> None:
+    """
+    Remove the cached streams which were not used within the age and the
+    least recently used ones beyond the budget.
+
+    Parameters
+    ----------
+    age : float, optional
+        The seconds a stream is kept after its last use. The default is
+        STREAMS_CACHE_AGE.
+    budget : int, optional
+        The amount of bytes of the cached streams. The default is
+        STREAMS_CACHE_BYTES.
+
+    Returns
+    -------
+    None.
+
+    """
+    if not os.path.isdir(backend.PATH_STREAMS):
+        return
+    # the time of the last use and the size per stream, the oldest first
+    files: list[tuple[float, int, str]] = sorted(
+        (entry.stat().st_mtime, entry.stat().st_size, entry.path)
+        for entry in os.scandir(backend.PATH_STREAMS)
+        if entry.is_file() and entry.name.endswith(".npy"))
+    expired: float = time.time() - age
+    total: int = sum(size for _, size, _ in files)
+    for used, size, path in files:
+        if used > expired and total <= budget:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+
+
+def acquire_request(limit: int = backend.STREAMS_RATE_LIMIT,
+                    window: int = backend.STREAMS_RATE_WINDOW) -> bool:
+    """
+    Claim one request within the rate limit of the Strava API.
+
+    Parameters
+    ----------
+    limit : int, optional
+        The amount of requests per window. The default is STREAMS_RATE_LIMIT.
+    window : int, optional
+        The length of the window in seconds. The default is
+        STREAMS_RATE_WINDOW.
+
+    Returns
+    -------
+    bool
+        Whether the request can be sent.
+
+    """
+    now: float = time.monotonic()
+    with _LOCK:
+        # forget the requests that left the window
+        while _REQUESTS and _REQUESTS[0] <= now - window:
+            _REQUESTS.popleft()
+        if len(_REQUESTS) >= limit:
+            return False
+        _REQUESTS.append(now)
+    return True
+
+
+def get_stream(activity_id: int,
+               access_token: str) -> np.ndarray | None:
+    """
+    Request the GPS stream of an activity and cache it.
+
+    Parameters
+    ----------
+    activity_id : int
+        The Strava activity id.
+    access_token : str
+        The Strava access token.
+
+    Returns
+    -------
+    np.ndarray | None
+        The (lat, lon) points or None if the rate limit is reached or the
+        request failed.
+
+    """
+    if not acquire_request():
+        return None
+    # the retries of the rate limits and server errors are exhausted or the
+    # connection failed, the stream is requested again later
+    try:
+        response: dict = backend.get_request(
+            url=backend.STREAMS_LINK.format(activity_id),
+            headers={"Authorization": f"Bearer {access_token}"},
+            params={"keys": "latlng",
+                    "key_by_type": "true"}
+                                             )
+    except requests.exceptions.RequestException:
+        return None
+    # an activity without GPS has no stream, which is cached as well
+    if "404" in response:
+        return save_stream(activity_id, [])
+    if "latlng" not in response:
+        return None
+    return save_stream(activity_id,
+                       response.get("latlng", {}).get("data", []))
+
+
+def apply_streams(dataframe: pd.DataFrame,
+                  streams: dict[int, np.ndarray]) -> pd.DataFrame:
+    """
+    Replace the coordinates of the summary polylines with the full resolution
+    streams.
+
+    Parameters
+    ----------
+    dataframe : pd.DataFrame
+        The dataframe containing the parsed activities.
+    streams : dict[int, np.ndarray]
+        The (lat, lon) points per activity id.
+
+    Returns
+    -------
+    dataframe : pd.DataFrame
+        A copy of the dataframe with the replaced coordinates.
+
+    """
+    dataframe = dataframe.copy()
+    dataframe["coords"] = [streams[activity_id]
+                           if len(streams.get(activity_id, ())) else coords
+                           for activity_id, coords in zip(dataframe["id"],
+                                                          dataframe["coords"])
+                           ]
+    return dataframe
+
+
+if __name__ == "__main__":
+    pass
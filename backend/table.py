@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+@author: QtyPython2020
+
+The table of activities, which is sent to the browser one page at a time.
+
+The links to Strava are built and the sortable columns are sorted once per
+dataset. A page is then sliced from the sorted positions of the rows which
+pass the selection, so only the visible rows are serialized.
+"""
+# Third party
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+# Local imports
+import backend
+
+
+class ActivityTable:
+    """
+    The rows of the table of activities with the sorted positions per column.
+    """
+
+    def __init__(self,
+                 data: pd.DataFrame,
+                 columns: list[str] = backend.DISPLAY_COLS,
+                 sortable: list[str] = backend.TABLE_SORT_COLS) -> None:
+        """
+        Parameters
+        ----------
+        data : pd.DataFrame
+            The dataframe containing the parsed activities.
+        columns : list[str], optional
+            The columns of the table. The default is DISPLAY_COLS.
+        sortable : list[str], optional
+            The columns the table can be sorted by. The default is
+            TABLE_SORT_COLS.
+
+        Returns
+        -------
+        None.
+
+        """
+        frame: pd.DataFrame = data.loc[:, columns]
+        # the input of the 'view on Strava' column, joined as Arrow strings
+        # which are also the format the table is sent in
+        ids: pa.Array = pc.cast(pa.array(frame["id"].to_numpy()), pa.string())
+        frame["id"] = pd.Series(pc.binary_join_element_wise(
+            backend.ACTIVITIES_URL, ids, ""),
+                                index=frame.index,
+                                dtype=pd.ArrowDtype(pa.string()))
+        self.frame: pd.DataFrame = frame
+        # the positions of the rows in ascending order with the empty values
+        # last, and the amount of values which are not empty
+        self._orders: dict[str, np.ndarray] = {
+            column: self._order(frame[column]) for column in sortable}
+        self._valid: dict[str, int] = {
+            column: int(frame[column].notna().sum()) for column in sortable}
+
+    @staticmethod
+    def _order(column: pd.Series) -> np.ndarray:
+        """
+        Parameters
+        ----------
+        column : pd.Series
+            A column of the table.
+
+        Returns
+        -------
+        np.ndarray
+            The positions of the rows sorted by the column, ignoring the case
+            of the text.
+
+        """
+        values: pd.Series = column.reset_index(drop=True)
+        if values.dtype == object:
+            values = values.str.lower()
+        return values.sort_values(kind="stable",
+                                  na_position="last").index.to_numpy()
+
+    def __len__(self) -> int:
+        """
+        Returns
+        -------
+        int
+            The amount of activities.
+
+        """
+        return self.frame.shape[0]
+
+    def select(self,
+               column: str,
+               descending: bool = False,
+               rows: pd.Index | np.ndarray = None) -> np.ndarray:
+        """
+        Parameters
+        ----------
+        column : str
+            The column to sort by.
+        descending : bool, optional
+            Whether to sort from the largest value. The default is False.
+        rows : pd.Index | np.ndarray, optional
+            The index labels of the rows to keep. The default is None for all
+            rows.
+
+        Returns
+        -------
+        positions : np.ndarray
+            The positions of the kept rows in the sorted order, with the empty
+            values last.
+
+        """
+        positions: np.ndarray = self._orders[column]
+        if descending:
+            valid: int = self._valid[column]
+            positions = np.concatenate([positions[:valid][::-1],
+                                        positions[valid:]])
+        if rows is not None:
+            keep: np.ndarray = self.frame.index.isin(rows)
+            positions = positions[keep[positions]]
+        return positions
+
+    def page(self,
+             positions: np.ndarray,
+             page: int = 0,
+             size: int = backend.TABLE_PAGE_ROWS) -> pd.DataFrame:
+        """
+        Parameters
+        ----------
+        positions : np.ndarray
+            The positions of the rows in the order to show them.
+        page : int, optional
+            The number of the page, starting from zero. The default is 0.
+        size : int, optional
+            The amount of rows per page. The default is TABLE_PAGE_ROWS.
+
+        Returns
+        -------
+        pd.DataFrame
+            The rows of the page.
+
+        """
+        return self.frame.iloc[positions[page * size:(page + 1) * size]]
+
+
+if __name__ == "__main__":
+    pass
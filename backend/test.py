@@ -3,9 +3,18 @@
 @author: QtyPython2020
 
 Load example data for demonstration purposes.
+
+Run this module from the root of the repository to regenerate the pre-parsed
+sample data after changing the parsing or the schema:
+    python -m backend.test
 """
-# Third party
+# Standard library
 import json
+import os
+# Third party
+import pandas as pd
+# Local imports
+import backend
 
 
 def load_test_data() -> list[dict]:
@@ -21,5 +30,22 @@ def load_test_data() -> list[dict]:
     return data
 
 
+def load_demo_data() -> pd.DataFrame:
+    """
+    Load the pre-parsed sample data, or parse the sample data if the
+    pre-parsed file is not available.
+
+    Returns
+    -------
+    pd.DataFrame
+        The dataframe containing the parsed activities.
+
+    """
+    if os.path.exists(backend.PATH_DEMO):
+        return backend.load_dataset(backend.PATH_DEMO)
+    return backend.parse(load_test_data())
+
+
 if __name__ == "__main__":
-    pass
+    backend.save_dataset(backend.parse(load_test_data()),
+                         backend.PATH_DEMO)
@@ -2,125 +2,102 @@
 """
 @author: QtyPython2020
 
-The two threadpools used in the app and the worker functions.
+The jobs run on the executors shared by the sessions and their tasks.
 """
 
 # Standard library
 import concurrent.futures as c_futures
-import queue
-import threading
-import time
+import itertools
+import logging
 import typing
 # Third party
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
-import streamlit as st
 # Local imports
 import backend
 
+LOGGER: logging.Logger = logging.getLogger(__name__)
 
-def get_activities_page(queue_in: queue.Queue,
-                        queue_out: queue.Queue,
-                        barrier: threading.Barrier,
-                        access_token: str) -> None:
+
+def get_activities_page(access_token: str,
+                        request_page_num: int) -> list[dict] | dict:
     """
-    Function for worker group 1 to retreive one page at a time until the
-    response length is zero or the input is None.
+    Task to retreive one page of activities.
 
     Parameters
     ----------
-    queue_in : queue.Queue
-        The queue providing the request_page_num.
-    queue_out : queue.Queue
-        The queue receiving the retrieved page.
-    barrier : threading.Barrier
-        Barrier object to make all workers wait to complete execution.
     access_token : str
         The Strava access token.
+    request_page_num : int
+        The number of the page, starting from one.
 
     Returns
     -------
-    None.
+    list[dict] | dict
+        The activities of the page, an empty list after the last page, or a
+        dict with an error message.
 
     """
-    # loop forever until shutdown signal is given
-    while True:
-        # read item from queue
-        request_page_num: typing.Union[int | None] = queue_in.get()
-        # prepare header and param
-        header: dict = {"Authorization": f"Bearer {access_token}"}
-        param: dict = {"per_page": 50,
-                       "page": request_page_num}
-        # send get request for the desired page
-        response: typing.Union[list[dict] | dict] = backend.get_request(
-            url=backend.ACTIVITIES_LINK,
-            headers=header,
-            params=param
-                                                                        )
-        # check for shutdown
-        if request_page_num is None or len(response) == 0:
-            # put signal back on queue
-            queue_in.put(None)
-            # wait on the barrier for all other workers
-            barrier.wait()
-            # send signal on output queue
-            queue_out.put(None)
-            # stop processing
-            break
-        # push result onto queue
-        queue_out.put(response)
+    # prepare header and param
+    header: dict = {"Authorization": f"Bearer {access_token}"}
+    param: dict = {"per_page": 50,
+                   "page": request_page_num}
+    # send get request for the desired page
+    response: typing.Union[list[dict] | dict] = \
+        backend.get_request(url=backend.ACTIVITIES_LINK,
+                            headers=header,
+                            params=param)
+    if isinstance(response, list):
+        backend.METRICS.inc("strava_pages_total")
+    return response
 
 
-def parse_page(queue_in: queue.Queue,
-               queue_out: queue.Queue,
-               barrier: threading.Barrier) -> None:
+def parse_page(data: list[dict]) -> pd.DataFrame:
     """
-    Function for worker group 2 to parse one page at a time until the input is
-    None or a dict which signals a propagated error message.
+    Task to parse one retrieved page.
 
     Parameters
     ----------
-    queue_in : queue.Queue
-        The queue providing the retrieved data.
-    queue_out : queue.Queue
-        The queue receiving the parsed data.
-    barrier : threading.Barrier
-        Barrier object to make all workers wait to complete execution.
+    data : list[dict]
+        The activities of the page.
 
     Returns
     -------
-    None
-        DESCRIPTION.
+    pd.DataFrame
+        The parsed activities.
 
     """
-    # loop forever until shutdown signal is given
-    while True:
-        # read item from queue
-        data: typing.Union[list[dict] | dict | None] = queue_in.get()
-        # check for shutdown
-        if data is None or isinstance(data, dict):
-            # put signal back on queue
-            queue_in.put(None)
-            # wait on the barrier for all other workers
-            barrier.wait()
-            # send signal on output queue
-            queue_out.put(data if isinstance(data, dict) else None)
-            # stop processing
-            break
-        # parse the retrieved data
-        parsed_data: pd.DataFrame = backend.parse(data)
-        # push result onto queue
-        queue_out.put(parsed_data)
+    with backend.stage("parse", rows=len(data)):
+        return backend.parse(data)
 
 
-def thread_get_and_parse(token: str) -> pd.DataFrame:
+def thread_get_and_parse(token: str,
+                         in_flight: int = backend.PAGES_IN_FLIGHT,
+                         on_page: typing.Callable[[pd.DataFrame], None] = None
+                         ) -> pd.DataFrame:
     """
-    Use threading to speed up sending get requests and parse the responses.
+    Use the shared executors to send get requests for several pages at a
+    time and to parse each page as soon as it is retrieved.
 
     Parameters
     ----------
     token : str
         Strava access token.
+    in_flight : int, optional
+        The amount of pages requested at the same time. The default is
+        PAGES_IN_FLIGHT.
+    on_page : typing.Callable[[pd.DataFrame], None], optional
+        Called with the parsed activities of each page, in the order of the
+        pages, as soon as the page and the pages before it are parsed. The
+        default is None.
+
+    Raises
+    ------
+    Saturated
+        If one of the executors does not admit the job.
+    StravaError
+        If a page was an error message instead of activities.
 
     Returns
     -------
@@ -128,73 +105,238 @@ def thread_get_and_parse(token: str) -> pd.DataFrame:
         Table of all the retrieved activities.
 
     """
-    #
-    results: list = []
+    requests: backend.SharedExecutor = backend.get_executor("io")
+    parsers: backend.SharedExecutor = backend.get_executor("cpu")
+    requests.admit()
+    parsers.admit()
+    # the pages requested and the pages parsed, by their number
+    requested: dict[c_futures.Future, int] = {}
+    parsed: dict[int, c_futures.Future] = {}
+    errors: list[dict] = []
     page_num: int = 1
-    worker_group_1: int = 5
-    worker_group_2: int = 10
-    total: int = worker_group_1 + worker_group_2
-    # create the shared queues
-    task1_queue_in: queue.Queue = queue.Queue()
-    task1_queue_out: queue.Queue = queue.Queue()
-    task2_queue_out: queue.Queue = queue.Queue()
-    # create the barriers
-    barrier1: threading.Barrier = threading.Barrier(worker_group_1)
-    barrier2: threading.Barrier = threading.Barrier(worker_group_2)
-    # create the thread pool
-    with c_futures.ThreadPoolExecutor(max_workers=total) as threadpool:
-        # issue get_activities_page to first group of workers
-        _ = [threadpool.submit(backend.get_activities_page,
-                               task1_queue_in,
-                               task1_queue_out,
-                               barrier1,
-                               token)
-             for _ in range(worker_group_1)]
-        # issue parse_page to second group of workers
-        _ = [threadpool.submit(backend.parse_page,
-                               task1_queue_out,
-                               task2_queue_out,
-                               barrier2)
-             for _ in range(worker_group_2)]
-        # add ScriptRunContext to threads
-        for thread in threadpool._threads:
-            st.runtime.scriptrunner.add_script_run_ctx(thread)
-        # push work into first group
-        while True:
-            # get result from selected page number
-            task1_queue_in.put(page_num)
-            page_num += 1
-            # wait to give other workers time to provide response
-            time.sleep(1)
-            if None in task1_queue_in.queue:
-                # signal that there is no more work
-                task1_queue_in.put(None)
-                break
-        # consume results
-        while True:
-            # retrieve data
-            data: typing.Union[None | dict | pd.DataFrame] =\
-                task2_queue_out.get()
-            # check for the end of work
-            if data is None:
-                # stop processing
-                break
-            # <>
-            results.append(pd.DataFrame.from_dict(data,
-                                                  orient="index")
-                           if isinstance(data, dict) else data)
+    published: int = 1
+    last_page: bool = False
+    for page_num in range(1, in_flight + 1):
+        requested[requests.submit(backend.get_activities_page,
+                                  token,
+                                  page_num)] = page_num
+    while True:
+        # the parsed pages which are not published yet are waited for as well
+        waiting: list[c_futures.Future] = [
+            future for number, future in parsed.items()
+            if on_page is not None and number >= published
+            and not future.done()]
+        if not requested and not waiting:
+            break
+        done, _ = c_futures.wait(list(requested) + waiting,
+                                 return_when=c_futures.FIRST_COMPLETED)
+        for future in done:
+            if future not in requested:
+                continue
+            number: int = requested.pop(future)
+            response: list[dict] | dict = future.result()
+            # an error message or an empty page ends the requests
+            if isinstance(response, dict):
+                errors.append(response)
+                last_page = True
+            elif len(response) == 0:
+                last_page = True
+            else:
+                parsed[number] = parsers.submit(backend.parse_page, response)
+            # keep the same amount of pages in flight
+            if not last_page:
+                page_num += 1
+                requested[requests.submit(backend.get_activities_page,
+                                          token,
+                                          page_num)] = page_num
+        # publish the pages parsed in order, the most recent activities first
+        while on_page is not None and published in parsed and \
+                parsed[published].done():
+            on_page(parsed[published].result())
+            published += 1
+    # an error message has none of the columns of the activities
+    if errors:
+        raise backend.StravaError(errors[0])
+    # consume results
+    results: list = [parsed[number].result()
+                     for number in sorted(parsed)]
     total: pd.DataFrame = pd.DataFrame(columns=backend.STRAVA_COLS)\
         if not results else pd.concat(results,
                                       ignore_index=True)
+    # restore the categories which are lost when concatenating the pages
+    total = backend.enforce_schema(total)
     total.sort_values("timestamp",
                       inplace=True)
     return total
 
 
+def thread_read_archive(archive: typing.Union[bytes | str],
+                        workers: int = 1) -> pd.DataFrame:
+    """
+    Use the shared executor to read the track files of a Strava bulk export
+    and parse the activities in it. The countries are attributed offline by
+    the start points, the start times are in UTC as the export has no time
+    zone.
+
+    The track files are scanned with regular expressions and struct in Python,
+    which holds the GIL. More tasks therefore do not read the archive faster
+    but take the workers of the shared executor from the figures of the other
+    sessions, so by default one task reads all track files.
+
+    Parameters
+    ----------
+    archive : typing.Union[bytes | str]
+        The contents or the filepath of the ZIP archive.
+    workers : int, optional
+        The amount of tasks, each reading a share of the track files. The
+        default is 1.
+
+    Raises
+    ------
+    Saturated
+        If the executor does not admit the job.
+
+    Returns
+    -------
+    pd.DataFrame
+        Table of all the activities in the archive.
+
+    """
+    readers: backend.SharedExecutor = backend.get_executor("cpu")
+    readers.admit()
+    with backend.open_archive(archive) as opened:
+        rows: list[dict] = backend.read_activities_csv(opened)
+    if not rows:
+        return backend.enforce_schema(
+            pd.DataFrame(columns=backend.STRAVA_COLS))
+    filenames: list[str] = [row.get("Filename", "") for row in rows]
+    # split the files in one contiguous share per task
+    share: int = -(-len(filenames) // workers)
+    futures: list = [readers.submit(backend.read_tracks,
+                                    archive,
+                                    filenames[start:start + share],
+                                    backend.MAX_ROUTE_POINTS)
+                     for start in range(0, len(filenames), share)]
+    tracks: list = [track
+                    for future in futures
+                    for track in future.result()]
+    activities: list[dict] = [backend.to_activity(row, points)
+                              for row, points in zip(rows, tracks)]
+    total: pd.DataFrame = backend.parse(activities, lookup=False)
+    total["country"] = backend.start_countries(total).astype(
+        backend.STRAVA_SCHEMA["country"])
+    total.sort_values("timestamp",
+                      inplace=True)
+    return total
+
+
+def thread_get_streams(token: str,
+                       activity_ids: list[int],
+                       workers: int = backend.STREAMS_WORKERS
+                       ) -> dict[int, np.ndarray]:
+    """
+    Use the shared executor to download the GPS streams of the activities
+    which are not cached yet, with a bounded amount of concurrent requests.
+
+    Parameters
+    ----------
+    token : str
+        Strava access token.
+    activity_ids : list[int]
+        The ids of the activities.
+    workers : int, optional
+        The maximum amount of concurrent requests. The default is
+        STREAMS_WORKERS.
+
+    Raises
+    ------
+    Saturated
+        If the executor does not admit the job.
+
+    Returns
+    -------
+    streams : dict[int, np.ndarray]
+        The (lat, lon) points per activity id, without the activities whose
+        stream could not be retrieved within the rate limit.
+
+    """
+    streams: dict = {activity_id: stream
+                     for activity_id in activity_ids
+                     if (stream := backend.load_stream(activity_id))
+                     is not None}
+    cached: int = len(streams)
+    missing: typing.Iterator[int] = iter([activity_id
+                                          for activity_id in activity_ids
+                                          if activity_id not in streams])
+    requests: backend.SharedExecutor = backend.get_executor("io")
+    futures: dict = {}
+    # a next request is submitted when one of the requests is done
+    for activity_id in itertools.islice(missing, workers):
+        if not futures:
+            requests.admit()
+        futures[requests.submit(backend.get_stream,
+                                activity_id,
+                                token)] = activity_id
+    while futures:
+        done, _ = c_futures.wait(futures,
+                                 return_when=c_futures.FIRST_COMPLETED)
+        for future in done:
+            if (stream := future.result()) is not None:
+                streams[futures[future]] = stream
+            del futures[future]
+            for activity_id in itertools.islice(missing, 1):
+                futures[requests.submit(backend.get_stream,
+                                        activity_id,
+                                        token)] = activity_id
+    # the cache only grows when streams are downloaded
+    if len(streams) > cached:
+        backend.prune_streams()
+    return streams
+
+
+def timed_figure(chart: str,
+                 func: typing.Callable,
+                 **kwargs: typing.Any) -> tuple[go.Figure, dict]:
+    """
+    Function for the workers creating the figures, to time each figure as a
+    stage.
+
+    Parameters
+    ----------
+    chart : str
+        The name of the figure.
+    func : typing.Callable
+        The preprocessing function of the figure.
+    **kwargs : typing.Any
+        Key word arguments of the function.
+
+    Returns
+    -------
+    figure : go.Figure
+        The plotly figure.
+    measured : dict
+        The wall and CPU seconds and the rows of the figure.
+
+    """
+    with backend.stage(chart,
+                       rows=kwargs.get("original").shape[0]) as measured:
+        figure: go.Figure = func(**kwargs)
+    return figure, measured
+
+
 def thread_create_figures(df: pd.DataFrame,
-                          creation: str) -> list[go.Figure]:
+                          creation: str,
+                          map_options: dict = None,
+                          spec: bool = False,
+                          seconds: float = backend.RENDER_SECONDS,
+                          size: int = backend.RENDER_BYTES,
+                          charts: typing.Iterable[str] = None,
+                          measure: bool = False
+                          ) -> list[go.Figure]:
     """
-    Use threading to speed up creating the figures.
+    Use the shared executor to create the figures, at the level of detail
+    planned for each figure to stay within the budget. The levels are planned
+    for all figures, also when only some of them are created.
 
     Parameters
     ----------
@@ -202,42 +344,106 @@ def thread_create_figures(df: pd.DataFrame,
         Table of all the retrieved activities.
     creation : str
         Input for the vertical line in the days plot.
+    map_options : dict, optional
+        Key word arguments for the locations plot. The default is None.
+    spec : bool, optional
+        Whether to build the figures as plain specs, skipping plotly express
+        and the validation. The default is False.
+    seconds : float, optional
+        The time to build all figures. The default is RENDER_SECONDS.
+    size : int, optional
+        The bytes of all figures. The default is RENDER_BYTES.
+    charts : typing.Iterable[str], optional
+        The names of the figures to create, from timeline, days, locations,
+        types and hours. The default is None for all figures.
+    measure : bool, optional
+        Whether to time the conversion of each figure to JSON as a stage of
+        the rerun, with its planned level and its bytes. The default is False.
+
+    Raises
+    ------
+    Saturated
+        If the executor does not admit the job.
 
     Returns
     -------
     figures : list[go.Figure]
-        List of all the plotly figures.
+        List of the plotly figures in the order of the names.
 
     """
-    with c_futures.ThreadPoolExecutor() as threadpool:
-        figures: list = []
-        futures: list = [threadpool.submit(backend.timeline,
-                                           **{"original": df,
-                                              "plot_height":
-                                                  backend.TOP_ROW_HEIGHT,
-                                              "creation": creation
-                                              }
-                                           )
-                         ]
-        for func, height in zip([backend.days,
-                                 backend.locations,
-                                 backend.types,
-                                 backend.hours
-                                 ],
-                                [backend.BOTTOM_ROW_HEIGHT//3-50,
-                                 backend.BOTTOM_ROW_HEIGHT,
-                                 backend.BOTTOM_ROW_HEIGHT//1.5,
-                                 backend.BOTTOM_ROW_HEIGHT//1.5
-                                 ]
-                                ):
-            futures.append(threadpool.submit(func,
-                                             **{"original": df,
-                                                "plot_height": height
-                                                }
-                                             )
-                           )
-        for future in futures:
-            figures.append(future.result())
+    map_options = map_options or {}
+    # a heatmap chosen by the user is kept whatever the budget
+    plan: dict[str, dict] = backend.plan_figures(
+        backend.dataset_stats(df, map_options.get("routes")),
+        seconds,
+        size,
+        fixed={"locations": "aggregated"}
+        if map_options.get("heatmap") else None)
+    functions: dict[str, tuple[typing.Callable, int, dict]] = {
+        "timeline": (backend.timeline,
+                     backend.TOP_ROW_HEIGHT,
+                     {"creation": creation}),
+        "days": (backend.days,
+                 backend.BOTTOM_ROW_HEIGHT//3-50,
+                 {}),
+        "locations": (backend.locations,
+                      backend.BOTTOM_ROW_HEIGHT,
+                      map_options),
+        "types": (backend.types,
+                  backend.BOTTOM_ROW_HEIGHT//1.5,
+                  {}),
+        "hours": (backend.hours,
+                  backend.BOTTOM_ROW_HEIGHT//1.5,
+                  {})
+        }
+    charts: dict[str, tuple[typing.Callable, int, dict]] = {
+        chart: functions[chart] for chart in (charts or functions)}
+    builders: backend.SharedExecutor = backend.get_executor("cpu")
+    builders.admit()
+    futures: list = [builders.submit(timed_figure,
+                                     chart,
+                                     func,
+                                     **{"original": df,
+                                        "plot_height": height,
+                                        "spec": spec
+                                        },
+                                     **{**options,
+                                        **plan[chart]["options"]}
+                                     )
+                     for chart, (func, height, options) in charts.items()]
+    figures: list[go.Figure] = []
+    # log the planned level of each figure with the estimated and the actual
+    # costs, which are also kept in the metrics to check the estimates
+    for chart, future in zip(charts, futures):
+        figure, measured = future.result()
+        figures.append(figure)
+        level: str = plan[chart]["level"]
+        backend.METRICS.observe("figure_seconds",
+                                measured["wall"],
+                                chart=chart,
+                                level=level)
+        backend.METRICS.observe("figure_estimated_seconds",
+                                plan[chart]["seconds"],
+                                chart=chart,
+                                level=level)
+        backend.METRICS.set("figure_estimated_bytes",
+                            plan[chart]["bytes"],
+                            chart=chart,
+                            level=level)
+        LOGGER.info("%s: %s, estimated %.2f s %.0f bytes, built in %.2f s",
+                    chart,
+                    level,
+                    plan[chart]["seconds"],
+                    plan[chart]["bytes"],
+                    measured["wall"])
+    # converting a figure to JSON costs about as much as building it, so the
+    # payloads are only measured on demand, one at a time as plotly loads its
+    # JSON engine on the first conversion
+    if measure:
+        for chart, figure in zip(charts, figures):
+            with backend.stage(f"{chart} payload "
+                               f"({plan[chart]['level']})") as payload:
+                payload["size"] = backend.payload_size(figure)
     return figures
 
 
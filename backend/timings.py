@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+@author: QtyPython2020
+
+Time the stages of a rerun, from retrieving the data to drawing the figures.
+
+The timings of a rerun are collected in a RerunTimings, which is set as the
+collector of the rerun with record_rerun. A fragment rerunning on its own gets
+a collector of its own. Every stage measures its wall time
+and the CPU time of its thread and adds them to the collector of the rerun it
+runs in, also from the worker threads that are started with the context of the
+rerun. Outside a rerun the stages are measured but not collected. The wall time
+and the rows of every stage are also added to the metrics of the process.
+"""
+# Standard library
+import contextlib
+import contextvars
+import threading
+import time
+import typing
+# Third party
+import pandas as pd
+# Local imports
+import backend
+
+
+class Timing(typing.NamedTuple):
+    """
+    The measurements of one stage.
+    """
+    stage: str
+    wall: float
+    cpu: float
+    rows: int | None
+    size: int | None
+
+
+class RerunTimings:
+    """
+    The timings of the stages of one rerun, added from any thread.
+    """
+
+    def __init__(self, name: str = "rerun") -> None:
+        """
+        Parameters
+        ----------
+        name : str, optional
+            The name of the rerun, the fragment for a fragment rerunning on
+            its own. The default is "rerun".
+
+        Returns
+        -------
+        None.
+
+        """
+        self.name: str = name
+        self.started: pd.Timestamp = pd.Timestamp.now()
+        self.timings: list[Timing] = []
+        self._lock: threading.Lock = threading.Lock()
+
+    def add(self, timing: Timing) -> None:
+        """
+        Parameters
+        ----------
+        timing : Timing
+            The measurements of a stage.
+
+        Returns
+        -------
+        None.
+
+        """
+        with self._lock:
+            self.timings.append(timing)
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Sum the measurements of the stages with the same name.
+
+        Returns
+        -------
+        pd.DataFrame
+            The calls, the wall and CPU seconds, the rows and the bytes per
+            stage in the order the stages started.
+
+        """
+        with self._lock:
+            frame: pd.DataFrame = pd.DataFrame(self.timings,
+                                               columns=Timing._fields)
+        return frame.groupby("stage", sort=False).agg(
+            calls=("wall", "size"),
+            wall=("wall", "sum"),
+            cpu=("cpu", "sum"),
+            # keep the stages without rows or bytes empty
+            rows=("rows", lambda column: column.sum(min_count=1)),
+            size=("size", lambda column: column.sum(min_count=1))
+                                                      )
+
+
+# the collector of the rerun running in the current context
+_RERUN: contextvars.ContextVar = contextvars.ContextVar("rerun",
+                                                        default=None)
+
+
+def record_rerun(timings: RerunTimings) -> None:
+    """
+    Collect the stages of the current context and of the threads started with
+    a copy of it.
+
+    Parameters
+    ----------
+    timings : RerunTimings
+        The collector of the rerun.
+
+    Returns
+    -------
+    None.
+
+    """
+    _RERUN.set(timings)
+
+
+@contextlib.contextmanager
+def stage(name: str,
+          rows: int = None,
+          size: int = None) -> typing.Iterator[dict]:
+    """
+    Measure a stage of the rerun.
+
+    Parameters
+    ----------
+    name : str
+        The name of the stage.
+    rows : int, optional
+        The amount of rows handled. The default is None.
+    size : int, optional
+        The amount of bytes produced. The default is None.
+
+    Yields
+    ------
+    measured : dict
+        The rows and the size, which can be set within the stage, and the
+        wall and CPU seconds after the stage.
+
+    """
+    measured: dict = {"rows": rows, "size": size}
+    wall: float = time.perf_counter()
+    cpu: float = time.thread_time()
+    try:
+        yield measured
+    finally:
+        measured["wall"] = time.perf_counter() - wall
+        measured["cpu"] = time.thread_time() - cpu
+        backend.METRICS.observe("stage_seconds",
+                                measured["wall"],
+                                stage=name)
+        if measured["rows"] is not None:
+            backend.METRICS.inc("stage_rows_total",
+                                measured["rows"],
+                                stage=name)
+        if (timings := _RERUN.get()) is not None:
+            timings.add(Timing(name,
+                               measured["wall"],
+                               measured["cpu"],
+                               measured["rows"],
+                               measured["size"]))
+
+
+def history_frame(history: typing.Iterable[RerunTimings]) -> pd.DataFrame:
+    """
+    Parameters
+    ----------
+    history : typing.Iterable[RerunTimings]
+        The collectors of the previous reruns.
+
+    Returns
+    -------
+    pd.DataFrame
+        The wall seconds per stage per rerun by the start and the name of the
+        rerun.
+
+    """
+    history = list(history)
+    return pd.DataFrame([timings.summary()["wall"] for timings in history],
+                        index=[f"{timings.started:%H:%M:%S} {timings.name}"
+                               for timings in history])
+
+
+if __name__ == "__main__":
+    pass
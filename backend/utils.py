@@ -7,10 +7,45 @@ Helper functions for the activity mapper app.
 # Standard library
 import base64
 import collections
+import functools
+import time
+import urllib.parse
 # Third party
 import json
+import pandas as pd
 import requests
 import urllib3
+# Local imports
+import backend
+
+
+def count_request(url: str,
+                  status: int,
+                  seconds: float) -> None:
+    """
+    Add a request to the metrics of the process.
+
+    Parameters
+    ----------
+    url : str
+        The requested url.
+    status : int
+        The status code of the response.
+    seconds : float
+        The time until the response, including the retries.
+
+    Returns
+    -------
+    None.
+
+    """
+    host: str = urllib.parse.urlsplit(url).hostname or ""
+    backend.METRICS.inc("http_requests_total",
+                        host=host,
+                        status=str(status))
+    backend.METRICS.observe("http_request_seconds",
+                            seconds,
+                            host=host)
 
 
 def post_request(url: str,
@@ -35,9 +70,11 @@ def post_request(url: str,
 
     """
     result: dict = {}
+    started: float = time.perf_counter()
     response: requests.Response = requests.post(url=url,
                                                 data=data,
                                                 timeout=timeout)
+    count_request(url, response.status_code, time.perf_counter() - started)
     if response.ok:
         result: dict = response.json()
     else:
@@ -78,10 +115,12 @@ def get_request(url: str,
                           )
     adapter = requests.adapters.HTTPAdapter(max_retries=retry)
     session.mount("https://", adapter)
+    started: float = time.perf_counter()
     response: requests.Response = session.get(url=url,
                                               params=params,
                                               headers=headers,
                                               timeout=timeout)
+    count_request(url, response.status_code, time.perf_counter() - started)
     if response.ok:
         result: dict = response.json()
     else:
@@ -166,9 +205,11 @@ def load_country_code_mapper(path: str) -> dict:
     return mapper
 
 
+@functools.lru_cache(maxsize=None)
 def load_image(path: str) -> str:
     """
-    Load an image into a string representation for use in markdown.
+    Load an image into a string representation for use in markdown, which is
+    encoded once per image.
 
     Parameters
     ----------
@@ -218,6 +259,29 @@ def load_geojson(path: str) -> dict:
     return json_file
 
 
+def memory_per_row(dataframe: pd.DataFrame) -> float:
+    """
+    Calculate the average memory footprint of one row of a dataframe,
+    including the contents of object columns.
+
+    Parameters
+    ----------
+    dataframe : pd.DataFrame
+        The dataframe to measure.
+
+    Returns
+    -------
+    size: float
+        The amount of bytes per row or zero for an empty dataframe.
+
+    """
+    if dataframe.empty:
+        return 0.
+    size: float = dataframe.memory_usage(index=True,
+                                         deep=True).sum() / dataframe.shape[0]
+    return size
+
+
 def min2ang(time: int) -> float:
     """
     Calculate the angle of the time in minutes for the polar plot.
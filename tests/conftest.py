@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+"""
+@author: QtyPython2020
+
+The backend reads its files relative to the root of the repository.
+"""
+# Standard library
+import os
+import sys
+
+ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(ROOT)
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
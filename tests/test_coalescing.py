@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+@author: QtyPython2020
+
+Tests of the downloads shared by the sessions of an athlete.
+"""
+# Standard library
+import threading
+import time
+# Local imports
+import backend
+from tests.test_threadpools import fake_api
+
+
+def wait(load: backend.ProgressiveLoad, seconds: float = 10) -> None:
+    """
+    Wait until the download is done.
+    """
+    deadline: float = time.monotonic() + seconds
+    while not load.done() and time.monotonic() < deadline:
+        time.sleep(.01)
+    assert load.done()
+
+
+def test_failed_load_is_not_shared(monkeypatch):
+    monkeypatch.setattr(backend, "get_request",
+                        fake_api({1: {"message": "Rate Limit Exceeded"}}))
+    load = backend.coalesced_load(-1, "token")
+    wait(load)
+    assert isinstance(load.exception(), backend.StravaError)
+    again = backend.coalesced_load(-1, "token")
+    assert again is not load
+    wait(again)
+
+
+class Job:
+    """
+    A result which finishes in the background.
+    """
+
+    def __init__(self) -> None:
+        self.finished: float | None = None
+
+
+def test_running_result_is_shared_until_the_ttl_after_it_finished():
+    coalescer = backend.Coalescer("test", 60, lambda job: job.finished)
+    job = coalescer.run("key", Job)
+    assert coalescer.run("key", Job) is job
+    # finished just now, reused within the ttl
+    job.finished = time.monotonic()
+    assert coalescer.run("key", Job) is job
+    # finished longer ago than the ttl
+    job.finished = time.monotonic() - 61
+    assert coalescer.run("key", Job) is not job
+
+
+def test_result_expires_after_the_ttl():
+    coalescer = backend.Coalescer("test", 0)
+    first = coalescer.run("key", object)
+    assert coalescer.run("key", object) is not first
+    coalescer.ttl = 60
+    second = coalescer.run("key", object)
+    assert coalescer.run("key", object) is second
+
+
+def test_concurrent_callers_share_one_call():
+    coalescer = backend.Coalescer("test", 60)
+    calls: list[int] = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow(value: int) -> int:
+        calls.append(value)
+        started.set()
+        release.wait(5)
+        return value * 2
+    results: list[int] = []
+    leader = threading.Thread(target=lambda: results.append(
+        coalescer.run("key", slow, 21)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(
+        coalescer.run("key", slow, 0))) for _ in range(3)]
+    for follower in followers:
+        follower.start()
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+    assert calls == [21]
+    assert results == [42] * 4
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+@author: QtyPython2020
+
+Tests of the executors shared by the sessions.
+"""
+# Standard library
+import threading
+# Third party
+import pytest
+# Local imports
+import backend
+
+
+def test_admit_rejects_jobs_once_the_capacity_is_waiting():
+    executor = backend.SharedExecutor("test-admit", 1, 2)
+    started = threading.Event()
+    release = threading.Event()
+
+    def busy() -> None:
+        started.set()
+        release.wait(5)
+    # the worker is busy, the next tasks wait
+    futures = [executor.submit(busy)]
+    started.wait(5)
+    futures += [executor.submit(release.wait, 5) for _ in range(2)]
+    try:
+        with pytest.raises(backend.Saturated) as saturated:
+            executor.admit()
+        assert saturated.value.waiting == 2
+    finally:
+        release.set()
+    for future in futures:
+        future.result(timeout=5)
+    executor.admit()
+
+
+def test_tasks_return_their_results_and_errors():
+    executor = backend.get_executor("cpu")
+    assert executor.submit(sum, [1, 2, 3]).result(timeout=5) == 6
+    with pytest.raises(ZeroDivisionError):
+        executor.submit(divmod, 1, 0).result(timeout=5)
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""
+@author: QtyPython2020
+
+Tests of the figures built as plain specs.
+"""
+# Third party
+import numpy as np
+import pandas as pd
+# Local imports
+import backend
+
+
+def test_timeline_highlights_are_placed_on_their_week():
+    demo = backend.load_demo_data()
+    figure = backend.timeline(original=demo,
+                              plot_height=300,
+                              creation=pd.Timestamp("2024-01-01").strftime(
+                                  backend.DT_FORMAT),
+                              spec=True)
+    weeks = {pd.Timestamp(x) for trace in figure.to_dict()["data"]
+             for x in np.asarray(trace.get("x", []))}
+    highlighted = backend.highlight(figure, "timeline", demo.iloc[-5:])
+    trace = highlighted.to_dict()["data"][-1]
+    assert {pd.Timestamp(x) for x in trace["x"]} <= weeks
+    assert list(trace["customdata"]) == \
+        demo["date"].iloc[-5:].astype(str).tolist()
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+@author: QtyPython2020
+
+Tests of the planned level of detail of the figures.
+"""
+# Standard library
+import math
+# Local imports
+import backend
+
+
+def stats(activities: int,
+          vertices: int = 0,
+          countries: int = 1) -> dict[str, int]:
+    """
+    The statistics of a dataset.
+    """
+    return {"activities": activities,
+            "vertices": vertices,
+            "countries": countries}
+
+
+def test_small_dataset_is_raw():
+    plan = backend.plan_figures(stats(100, 10_000))
+    assert {chart: item["level"] for chart, item in plan.items()} == \
+        dict.fromkeys(plan, "raw")
+
+
+def test_raw_level_keeps_the_thresholds_of_the_figures():
+    plan = backend.plan_figures(stats(100), math.inf, math.inf)
+    assert plan["hours"]["options"] == {}
+    assert plan["timeline"]["options"] == {}
+
+
+def test_many_activities_are_binned_whatever_the_budget():
+    plan = backend.plan_figures(stats(20_000), math.inf, math.inf)
+    assert plan["hours"]["level"] == "aggregated"
+    assert plan["timeline"]["level"] == "aggregated"
+
+
+def test_large_map_is_lowered_to_fit_the_budget():
+    plan = backend.plan_figures(stats(500, 2_000_000), 1, 2_000_000)
+    assert plan["locations"]["level"] in ("simplified", "aggregated")
+    assert sum(item["bytes"] for item in plan.values()) <= 2_000_000
+
+
+def test_level_chosen_by_the_user_is_kept():
+    plan = backend.plan_figures(stats(500, 2_000_000), 1, 2_000_000,
+                                fixed={"locations": "raw"})
+    assert plan["locations"]["level"] == "raw"
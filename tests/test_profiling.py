@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""
+@author: QtyPython2020
+
+Tests of the profiles of a rerun.
+"""
+# Standard library
+import time
+# Local imports
+import backend
+
+
+def test_url_asks_for_a_profile_only_if_allowed(monkeypatch):
+    monkeypatch.delenv("PROFILE_RERUN", raising=False)
+    assert backend.profiling_requested({"profile": "cpu"}, False) == set()
+    assert backend.profiling_requested({"profile": "cpu"}, True) == {"cpu"}
+    monkeypatch.setenv("PROFILE_RERUN", "all")
+    assert backend.profiling_requested({}, False) == {"cpu", "memory"}
+
+
+def spin(seconds: float) -> None:
+    """
+    Use the CPU for some time.
+    """
+    end: float = time.thread_time() + seconds
+    while time.thread_time() < end:
+        pass
+
+
+def test_tasks_on_the_executor_workers_are_sampled():
+    executor = backend.get_executor("cpu")
+    # the workers exist before the profile starts
+    executor.submit(int).result()
+    profiler = backend.SamplingProfiler(.001)
+    profiler.start()
+    try:
+        executor.submit(spin, .2).result()
+    finally:
+        profiler.stop()
+    assert any("spin" in stack for stack in profiler.samples)
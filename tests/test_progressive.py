@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+@author: QtyPython2020
+
+Tests of the activities published while they are downloaded.
+"""
+# Standard library
+import threading
+import time
+# Local imports
+import backend
+from tests.test_coalescing import wait
+from tests.test_threadpools import fake_api
+
+
+def test_partial_grows_with_the_published_pages(monkeypatch):
+    activities: list[dict] = backend.load_test_data()
+    get_request = fake_api({1: activities, 2: activities[:3]})
+    release = threading.Event()
+
+    def delayed(url, headers=None, params=None, timeout=60):
+        # the second page arrives when the test allows it
+        if (params or {}).get("page", 1) > 1:
+            release.wait(10)
+        return get_request(url, headers, params, timeout)
+    monkeypatch.setattr(backend, "get_request", delayed)
+    load = backend.ProgressiveLoad("token")
+    try:
+        deadline: float = time.monotonic() + 10
+        while not load.published() and time.monotonic() < deadline:
+            time.sleep(.01)
+        first = load.partial()
+        assert first.shape[0] == len(activities)
+        assert load.partial() is first
+    finally:
+        release.set()
+    wait(load)
+    data = load.partial()
+    assert data.shape[0] == len(activities) + 3
+    assert data["timestamp"].is_monotonic_increasing
+    assert data.index.is_unique
+    assert all(str(data[column].dtype) == dtype
+               for column, dtype in backend.STRAVA_SCHEMA.items())
+    assert data.shape[0] == load.result().shape[0]
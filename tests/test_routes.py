@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""
+@author: QtyPython2020
+
+Tests of the grouping of repeated routes.
+"""
+# Third party
+import numpy as np
+import pandas as pd
+# Local imports
+import backend
+
+
+def route(lat: float,
+          lon: float,
+          length: int = 200,
+          offset: float = 0.) -> list[tuple[float, float]]:
+    """
+    A straight route to the north east.
+    """
+    steps: np.ndarray = np.linspace(0, .05, length)
+    return list(zip(lat + steps + offset, lon + steps))
+
+
+def test_repeated_routes_are_grouped():
+    data = pd.DataFrame({"coords": [route(50., 8.),
+                                    route(52., 9.),
+                                    route(50., 8., 180, offset=1e-5),
+                                    None]},
+                        index=[4, 5, 6, 7])
+    groups = backend.frequent_routes(data)
+    assert groups.tolist() == [4, 5, 4, 7]
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+@author: QtyPython2020
+
+Tests of the spatial helpers of the maps.
+"""
+# Third party
+import pandas as pd
+# Local imports
+import backend
+
+
+def square(name: str,
+           lat: float,
+           lon: float,
+           size: float = 1.) -> dict:
+    """
+    A country in the shape of a square, from its south west corner.
+    """
+    ring: list = [[lon, lat], [lon + size, lat], [lon + size, lat + size],
+                  [lon, lat + size], [lon, lat]]
+    return {"type": "Feature",
+            "properties": {"ADMIN": name},
+            "geometry": {"type": "Polygon", "coordinates": [ring]}}
+
+
+GEOJSON: dict = {"type": "FeatureCollection",
+                 "features": [square("Atlantis", 10, 10),
+                              square("Lemuria", 10, 11)]}
+
+
+def test_start_countries_are_attributed_offline():
+    data = pd.DataFrame({"lat": [10.5, 10.5, 50., None],
+                         "lon": [10.5, 11.5, 50., None]},
+                        index=[3, 1, 2, 0])
+    countries = backend.start_countries(data, GEOJSON)
+    assert countries.index.tolist() == [3, 1, 2, 0]
+    assert countries.tolist()[:3] == ["Atlantis", "Lemuria", "undefined"]
+    assert pd.isna(countries[0])
+
+
+def test_parse_without_lookup_skips_the_nominatim_api(monkeypatch):
+    def get_request(url, **kwargs):
+        raise AssertionError(f"{url} was requested")
+    monkeypatch.setattr(backend, "get_request", get_request)
+    data = backend.parse(backend.load_test_data(), lookup=False)
+    assert data["country"].isna().all()
+
+
+def activities(*routes: list[tuple[float, float]]) -> pd.DataFrame:
+    """
+    Activities starting at the first point of their route.
+    """
+    return pd.DataFrame({"coords": list(routes),
+                         "lat": [route[0][0] for route in routes],
+                         "lon": [route[0][1] for route in routes]},
+                        index=[10 * (number + 1)
+                               for number in range(len(routes))])
+
+
+def test_lasso_selects_the_activities_inside_its_outline():
+    index = backend.SpatialIndex(activities([(50.1, 8.1), (50.2, 8.2)],
+                                            [(50.9, 8.5), (50.9, 8.6)],
+                                            [(50.3, 8.3)]))
+    # a triangle whose bounding box contains all the activities
+    triangle = [(50., 8.), (50., 9.), (51., 8.)]
+    assert index.within_selection([(50.1, 8.1)],
+                                  polygon=triangle).tolist() == [10, 30]
+    assert sorted(index.within_selection([(50., 8.), (51., 9.)],
+                                         distance=0)) == [10, 20, 30]
+
+
+def test_click_selects_the_activities_within_the_distance():
+    index = backend.SpatialIndex(activities([(50., 8.), (50., 8.5)],
+                                            [(52., 8.)]))
+    assert index.within_selection([(50., 8.5)], distance=1).tolist() == [10]
+    assert index.within_box((51.5, 52.5, 7.5, 8.5)).tolist() == [20]
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+@author: QtyPython2020
+
+Tests of the saved datasets and of the dataset store.
+"""
+# Standard library
+import os
+# Third party
+import pandas as pd
+import pyarrow as pa
+import pytest
+# Local imports
+import backend
+
+
+def test_saved_dataset_is_valid():
+    saved = backend.load_dataset(backend.save_dataset(
+        backend.load_demo_data()))
+    backend.validate_dataset(saved)
+
+
+def test_dataset_without_the_columns_is_invalid():
+    with pytest.raises(ValueError, match="missing columns"):
+        backend.validate_dataset(backend.load_dataset(backend.save_dataset(
+            pd.DataFrame({"name": ["Morning Run"]}))))
+
+
+def test_dataset_with_other_dtypes_is_invalid():
+    saved = backend.load_demo_data().astype({"hour": "float64"})
+    with pytest.raises(ValueError, match="hour is float64"):
+        backend.validate_dataset(saved)
+
+
+def arrow_file(table: pa.Table) -> bytes:
+    """
+    The contents of the Arrow file of a table.
+    """
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+@pytest.mark.parametrize("contents", [
+    b"not an arrow file",
+    arrow_file(pa.table({"name": ["Morning Run"], "coords": ["52.1,4.8"]}))
+    ])
+def test_other_files_are_not_loaded(contents):
+    with pytest.raises(ValueError):
+        backend.load_dataset(contents)
+
+
+def test_spilled_datasets_are_pruned_by_age_and_size(tmp_path):
+    demo = backend.load_demo_data()
+    store = backend.DatasetStore(budget=0, directory=str(tmp_path))
+    handles = [store.put(demo) for _ in range(3)]
+    # the first two datasets are spilled
+    assert len(list(tmp_path.glob("*.arrow"))) == 2
+    # a reused file is kept, the one unused for too long is removed
+    os.utime(tmp_path / f"{handles[0]}.arrow", (0, 0))
+    store.spill_age = 3600
+    store.put(demo)
+    assert store.get(handles[0]) is None
+    assert store.get(handles[1]) is not None
+    # beyond the budget only the most recently used file is kept
+    store.spill_budget = 0
+    store.put(demo)
+    assert len(list(tmp_path.glob("*.arrow"))) == 1
+
+
+def test_derived_structures_count_towards_the_budget(tmp_path):
+    demo = backend.load_demo_data()
+    size = backend.dataset_size(demo)
+    store = backend.DatasetStore(budget=2 * size, directory=str(tmp_path))
+    first = store.put(demo)
+    index = store.derive(first, "index", backend.FilterIndex)
+    charged = store.in_memory() - size
+    assert charged == backend.derived_size(index, demo) > 0
+    # a replaced structure is charged once
+    store.replace(first, "index", index)
+    assert store.in_memory() == size + charged
+    # the budget now spills the first dataset with its derived structure
+    store.budget = 2 * size + charged // 2
+    second = store.put(demo)
+    store.derive(second, "index", backend.FilterIndex)
+    assert store.in_memory() == size + charged
+    assert store.derive(first, "index", lambda data: None) is None
+
+
+def test_spilled_datasets_are_reloaded_once(tmp_path):
+    demo = backend.load_demo_data()
+    store = backend.DatasetStore(budget=0, directory=str(tmp_path))
+    handle = store.put(demo)
+    store.put(demo)
+    reloaded = store.get(handle)
+    assert reloaded is not None
+    assert store.get(handle) is reloaded
+    store.discard(handle)
+    assert store.get(handle) is None
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+@author: QtyPython2020
+
+Tests of the parsing of the Strava activities.
+"""
+# Third party
+import pandas as pd
+# Local imports
+import backend
+
+
+def test_enforce_schema_casts_and_adds_the_columns():
+    # the records as parse builds them, with Python dates and times
+    demo = backend.load_demo_data()
+    parsed = pd.DataFrame(demo.drop(columns="coords").to_dict("records"))
+    parsed["date"] = parsed["date"].dt.date
+    parsed["time"] = [(pd.Timestamp(0) + delta).time()
+                      for delta in parsed["time"]]
+    data = backend.enforce_schema(parsed)
+    assert {column: str(dtype) for column, dtype in data.dtypes.items()
+            if column in backend.STRAVA_SCHEMA} == backend.STRAVA_SCHEMA
+    # the missing columns are empty
+    assert data["coords"].isna().all()
+    assert data["time"].equals(demo["time"])
+    # the input is not changed
+    assert parsed["hour"].dtype == "int64"
+
+
+def test_enforce_schema_keeps_the_declared_dtypes():
+    data = backend.enforce_schema(backend.load_demo_data())
+    assert backend.enforce_schema(data).equals(data)
+
+
+def test_enforce_schema_of_an_empty_frame():
+    data = backend.enforce_schema(pd.DataFrame(columns=backend.STRAVA_COLS))
+    assert {column: str(dtype) for column, dtype in data.dtypes.items()} \
+        == backend.STRAVA_SCHEMA
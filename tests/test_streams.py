@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+@author: QtyPython2020
+
+Tests of the cached GPS streams.
+"""
+# Standard library
+import os
+# Third party
+import requests
+# Local imports
+import backend
+
+
+def test_streams_are_pruned_by_age_and_size(monkeypatch, tmp_path):
+    monkeypatch.setattr(backend, "PATH_STREAMS", str(tmp_path))
+    for activity_id in range(3):
+        backend.save_stream(activity_id, [[52.1, 4.8], [52.2, 4.9]])
+    os.utime(backend.stream_path(0), (0, 0))
+    backend.prune_streams(age=3600)
+    assert backend.load_stream(0) is None
+    assert backend.load_stream(1) is not None
+    backend.prune_streams(budget=0)
+    assert not list(tmp_path.glob("*.npy"))
+
+
+def test_cached_streams_are_not_requested(monkeypatch, tmp_path):
+    monkeypatch.setattr(backend, "PATH_STREAMS", str(tmp_path))
+    backend.save_stream(7, [[52.1, 4.8]])
+
+    def get_request(url, **kwargs):
+        raise AssertionError(f"{url} was requested")
+    monkeypatch.setattr(backend, "get_request", get_request)
+    streams = backend.thread_get_streams("token", [7])
+    assert streams[7].tolist() == [[52.1, 4.8]]
+
+
+def test_failed_requests_skip_the_stream(monkeypatch, tmp_path):
+    monkeypatch.setattr(backend, "PATH_STREAMS", str(tmp_path))
+    backend.save_stream(7, [[52.1, 4.8]])
+
+    def get_request(url, **kwargs):
+        if url.endswith("/8/streams"):
+            raise requests.exceptions.RetryError("too many 429 responses")
+        raise requests.exceptions.ConnectionError("no connection")
+    monkeypatch.setattr(backend, "get_request", get_request)
+    assert backend.get_stream(8, "token") is None
+    streams = backend.thread_get_streams("token", [7, 8, 9])
+    assert list(streams) == [7]
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+@author: QtyPython2020
+
+Tests of the jobs run on the shared executors.
+"""
+# Standard library
+import logging
+# Third party
+import pytest
+# Local imports
+import backend
+
+
+def fake_api(pages: dict[int, list[dict] | dict]):
+    """
+    Parameters
+    ----------
+    pages : dict[int, list[dict] | dict]
+        The response per page number, an empty page for the other numbers.
+
+    Returns
+    -------
+    typing.Callable
+        A replacement of get_request, without the country lookups.
+
+    """
+    def get_request(url, headers=None, params=None, timeout=60):
+        if "page" not in (params or {}):
+            return {}
+        return pages.get(params["page"], [])
+    return get_request
+
+
+def test_get_and_parse_concatenates_the_pages(monkeypatch):
+    activities: list[dict] = backend.load_test_data()
+    monkeypatch.setattr(backend, "get_request",
+                        fake_api({1: activities, 2: activities}))
+    data = backend.thread_get_and_parse("token")
+    assert data.shape[0] == 2 * len(activities)
+    assert set(backend.STRAVA_COLS) <= set(data.columns)
+    assert data["timestamp"].is_monotonic_increasing
+
+
+@pytest.mark.parametrize("pages", [
+    {1: backend.load_test_data(), 2: {"message": "Rate Limit Exceeded"}},
+    {1: {"message": "Authorization Error"}}
+    ])
+def test_get_and_parse_raises_an_error_page(monkeypatch, pages):
+    monkeypatch.setattr(backend, "get_request", fake_api(pages))
+    with pytest.raises(backend.StravaError):
+        backend.thread_get_and_parse("token")
+
+
+@pytest.mark.parametrize("measure", [False, True])
+def test_payloads_are_only_measured_on_demand(measure):
+    timings = backend.RerunTimings()
+    backend.record_rerun(timings)
+    try:
+        figures = backend.thread_create_figures(backend.load_demo_data(),
+                                                "2024-01-01",
+                                                charts=("types", "hours"),
+                                                measure=measure)
+    finally:
+        backend.record_rerun(None)
+    stages = timings.summary()
+    assert len(figures) == 2
+    payloads = stages[stages.index.str.contains("payload")]
+    assert len(payloads) == (2 if measure else 0)
+    assert (payloads["size"] > 0).all()
+
+
+def test_planned_levels_and_timings_are_logged(caplog):
+    with caplog.at_level(logging.INFO, logger="backend.threadpools"):
+        backend.thread_create_figures(backend.load_demo_data(),
+                                      "2024-01-01",
+                                      charts=("types", "hours"))
+    lines = [record.getMessage() for record in caplog.records]
+    assert [line.split(":")[0] for line in lines] == ["types", "hours"]
+    assert all("estimated" in line and "built in" in line for line in lines)
+    exposition = backend.METRICS.exposition()
+    assert 'figure_seconds_count{chart="types",level="raw"}' in exposition
+    assert 'figure_estimated_bytes{chart="hours",level="raw"}' in exposition
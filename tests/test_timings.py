@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""
+@author: QtyPython2020
+
+Tests of the timings of the stages of a rerun.
+"""
+# Local imports
+import backend
+
+
+def test_stages_are_collected_by_the_recorded_rerun():
+    rerun = backend.RerunTimings()
+    fragment = backend.RerunTimings("timeline_row")
+    try:
+        backend.record_rerun(rerun)
+        with backend.stage("parse", rows=10):
+            pass
+        backend.record_rerun(fragment)
+        with backend.stage("timeline"):
+            pass
+    finally:
+        backend.record_rerun(None)
+    assert rerun.summary().index.tolist() == ["parse"]
+    assert fragment.summary().index.tolist() == ["timeline"]
+    history = backend.history_frame([rerun, fragment])
+    assert [label.split()[-1] for label in history.index] == \
+        ["rerun", "timeline_row"]